@@ -0,0 +1,32 @@
+"""add payment reconciliation indexes
+
+Revision ID: add_payment_reconciliation_idx
+Revises: add_tiss_patients_clean
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = 'add_payment_reconciliation_idx'
+down_revision = 'add_tiss_patients_clean'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Conciliação bancária: candidatos por status/vencimento/valor
+    op.create_index(
+        'ix_payment_installments_reconciliation', 'payment_installments',
+        ['status', 'due_date', 'total_amount'], unique=False
+    )
+    op.create_index(
+        'ix_accounts_receivable_reconciliation', 'accounts_receivable',
+        ['status', 'due_date', 'remaining_amount', 'patient_id'], unique=False
+    )
+
+    # Deduplicação de créditos importados (FITID)
+    op.create_index(op.f('ix_payment_transactions_nsu'), 'payment_transactions', ['nsu'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_payment_transactions_nsu'), table_name='payment_transactions')
+    op.drop_index('ix_accounts_receivable_reconciliation', table_name='accounts_receivable')
+    op.drop_index('ix_payment_installments_reconciliation', table_name='payment_installments')
@@ -0,0 +1,54 @@
+"""add professional fee monthly summaries
+
+Revision ID: add_fee_monthly_summaries
+Revises: add_payment_reconciliation_idx
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'add_fee_monthly_summaries'
+down_revision = 'add_payment_reconciliation_idx'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'professional_fee_monthly_summaries',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('healthcare_professional_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('reference_year', sa.Integer(), nullable=False),
+        sa.Column('reference_month', sa.Integer(), nullable=False),
+        sa.Column('total_fees', sa.Integer(), nullable=True),
+        sa.Column('total_appointments', sa.Integer(), nullable=True),
+        sa.Column('total_revenue', sa.Numeric(12, 2), nullable=True),
+        sa.Column('total_gross', sa.Numeric(12, 2), nullable=True),
+        sa.Column('total_net', sa.Numeric(12, 2), nullable=True),
+        sa.Column('total_deductions', sa.Numeric(12, 2), nullable=True),
+        sa.Column('pending_amount', sa.Numeric(12, 2), nullable=True),
+        sa.Column('paid_amount', sa.Numeric(12, 2), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'healthcare_professional_id', 'reference_year', 'reference_month',
+            name='uq_professional_fee_monthly_summary'
+        )
+    )
+    op.create_index(
+        op.f('ix_professional_fee_monthly_summaries_healthcare_professional_id'),
+        'professional_fee_monthly_summaries', ['healthcare_professional_id'], unique=False
+    )
+    op.create_index(
+        'ix_professional_fee_monthly_summaries_period',
+        'professional_fee_monthly_summaries', ['reference_year', 'reference_month'], unique=False
+    )
+
+def downgrade():
+    op.drop_index('ix_professional_fee_monthly_summaries_period', table_name='professional_fee_monthly_summaries')
+    op.drop_index(
+        op.f('ix_professional_fee_monthly_summaries_healthcare_professional_id'),
+        table_name='professional_fee_monthly_summaries'
+    )
+    op.drop_table('professional_fee_monthly_summaries')
@@ -0,0 +1,40 @@
+"""add unique code index to tiss_tabelas_referencia
+
+Revision ID: add_tiss_tabela_codigo_uq
+Revises: add_fee_monthly_summaries
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_tiss_tabela_codigo_uq'
+down_revision = 'add_fee_monthly_summaries'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Duplicatas antigas: mantém o registro mais recente de cada código
+    op.execute("""
+        UPDATE tiss_tabelas_referencia t
+        SET deleted_at = now()
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY organization_id, tipo_tabela, codigo
+                ORDER BY created_at DESC, id
+            ) AS posicao
+            FROM tiss_tabelas_referencia
+            WHERE deleted_at IS NULL
+        ) d
+        WHERE t.id = d.id AND d.posicao > 1
+    """)
+
+    op.create_index(
+        'uq_tiss_tabelas_referencia_codigo', 'tiss_tabelas_referencia',
+        ['organization_id', 'tipo_tabela', 'codigo'],
+        unique=True,
+        postgresql_where=sa.text('deleted_at IS NULL')
+    )
+
+def downgrade():
+    op.drop_index('uq_tiss_tabelas_referencia_codigo', table_name='tiss_tabelas_referencia')
@@ -0,0 +1,63 @@
+"""add tiss_faturamento_resumo and TISS lookup indexes
+
+Revision ID: add_tiss_faturamento_resumo
+Revises: add_tiss_tabela_codigo_uq
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'add_tiss_faturamento_resumo'
+down_revision = 'add_tiss_tabela_codigo_uq'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Navegação lote -> guias -> procedimentos
+    op.create_index(
+        'ix_tiss_lotes_competencia', 'tiss_lotes',
+        ['organization_id', 'operadora_id', 'competencia'], unique=False
+    )
+    op.create_index(op.f('ix_tiss_guias_lote_id'), 'tiss_guias', ['lote_id'], unique=False)
+    op.create_index(op.f('ix_tiss_procedimentos_guia_id'), 'tiss_procedimentos', ['guia_id'], unique=False)
+
+    op.create_table(
+        'tiss_faturamento_resumo',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('organization_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('operadora_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('competencia', sa.String(length=7), nullable=False),
+        sa.Column('ano', sa.Integer(), nullable=False),
+        sa.Column('mes', sa.Integer(), nullable=False),
+        sa.Column('codigo_procedimento', sa.String(length=20), nullable=False),
+        sa.Column('profissional', sa.String(length=200), nullable=False),
+        sa.Column('descricao_procedimento', sa.String(length=500), nullable=True),
+        sa.Column('quantidade_procedimentos', sa.Integer(), nullable=True),
+        sa.Column('quantidade_glosados', sa.Integer(), nullable=True),
+        sa.Column('valor_informado', sa.Float(), nullable=True),
+        sa.Column('valor_glosa', sa.Float(), nullable=True),
+        sa.Column('valor_aceito', sa.Float(), nullable=True),
+        sa.Column('quantidade_pagos', sa.Integer(), nullable=True),
+        sa.Column('dias_ate_pagamento', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id']),
+        sa.ForeignKeyConstraint(['operadora_id'], ['tiss_operadoras.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'organization_id', 'operadora_id', 'competencia', 'codigo_procedimento', 'profissional',
+            name='uq_tiss_faturamento_resumo'
+        )
+    )
+    op.create_index(
+        'ix_tiss_faturamento_resumo_periodo', 'tiss_faturamento_resumo',
+        ['organization_id', 'ano', 'mes'], unique=False
+    )
+
+def downgrade():
+    op.drop_index('ix_tiss_faturamento_resumo_periodo', table_name='tiss_faturamento_resumo')
+    op.drop_table('tiss_faturamento_resumo')
+    op.drop_index(op.f('ix_tiss_procedimentos_guia_id'), table_name='tiss_procedimentos')
+    op.drop_index(op.f('ix_tiss_guias_lote_id'), table_name='tiss_guias')
+    op.drop_index('ix_tiss_lotes_competencia', table_name='tiss_lotes')
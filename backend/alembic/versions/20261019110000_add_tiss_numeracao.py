@@ -0,0 +1,32 @@
+"""add tiss_numeracao counters
+
+Revision ID: add_tiss_numeracao
+Revises: add_tiss_faturamento_resumo
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'add_tiss_numeracao'
+down_revision = 'add_tiss_faturamento_resumo'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Contadores são criados sob demanda a partir do maior número existente
+    op.create_table(
+        'tiss_numeracao',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('organization_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('escopo', sa.String(length=10), nullable=False),
+        sa.Column('ultimo_numero', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('organization_id', 'tipo', 'escopo', name='uq_tiss_numeracao')
+    )
+
+def downgrade():
+    op.drop_table('tiss_numeracao')
@@ -0,0 +1,29 @@
+"""add appointment_id to tiss_guias
+
+Revision ID: add_tiss_guias_appointment
+Revises: add_tiss_numeracao
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'add_tiss_guias_appointment'
+down_revision = 'add_tiss_numeracao'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Vínculo guia -> agendamento (evita faturar o mesmo atendimento duas vezes)
+    op.add_column('tiss_guias', sa.Column('appointment_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        'fk_tiss_guias_appointment_id', 'tiss_guias', 'appointments',
+        ['appointment_id'], ['id']
+    )
+    op.create_index(op.f('ix_tiss_guias_appointment_id'), 'tiss_guias', ['appointment_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_tiss_guias_appointment_id'), table_name='tiss_guias')
+    op.drop_constraint('fk_tiss_guias_appointment_id', 'tiss_guias', type_='foreignkey')
+    op.drop_column('tiss_guias', 'appointment_id')
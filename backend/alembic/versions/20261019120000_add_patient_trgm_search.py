@@ -0,0 +1,45 @@
+"""add trigram search indexes to patients
+
+Revision ID: add_patient_trgm_search
+Revises: add_tiss_guias_appointment
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = 'add_patient_trgm_search'
+down_revision = 'add_tiss_guias_appointment'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # unaccent() é STABLE; índices exigem função IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """)
+
+    # Busca de pacientes: nome sem acento e CPF/telefone só com dígitos
+    op.execute("""
+        CREATE INDEX ix_patients_full_name_trgm ON patients
+        USING gin (lower(immutable_unaccent(full_name)) gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX ix_patients_cpf_digits_trgm ON patients
+        USING gin (regexp_replace(cpf, '\\D', '', 'g') gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX ix_patients_phone_digits_trgm ON patients
+        USING gin (regexp_replace(phone, '\\D', '', 'g') gin_trgm_ops)
+    """)
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_patients_phone_digits_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_patients_cpf_digits_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_patients_full_name_trgm")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
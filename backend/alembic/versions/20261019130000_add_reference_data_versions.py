@@ -0,0 +1,27 @@
+"""add reference_data_versions counters
+
+Revision ID: add_reference_data_versions
+Revises: add_patient_trgm_search
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_reference_data_versions'
+down_revision = 'add_patient_trgm_search'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Linhas são criadas na primeira alteração de cada tabela (versão 1)
+    op.create_table(
+        'reference_data_versions',
+        sa.Column('table_name', sa.String(length=100), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+
+def downgrade():
+    op.drop_table('reference_data_versions')
@@ -0,0 +1,45 @@
+"""unique active guia per appointment
+
+Revision ID: add_tiss_guias_appointment_uq
+Revises: add_reference_data_versions
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_tiss_guias_appointment_uq'
+down_revision = 'add_reference_data_versions'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Guias já podem ter sido enviadas à operadora: duplicatas não são
+    # removidas automaticamente, precisam ser revisadas antes
+    duplicados = op.get_bind().execute(sa.text("""
+        SELECT count(*) FROM (
+            SELECT appointment_id
+            FROM tiss_guias
+            WHERE appointment_id IS NOT NULL AND deleted_at IS NULL
+            GROUP BY appointment_id
+            HAVING count(*) > 1
+        ) d
+    """)).scalar()
+    if duplicados:
+        raise RuntimeError(
+            f"{duplicados} agendamentos com mais de uma guia ativa em tiss_guias; "
+            "exclua (deleted_at) as guias duplicadas e rode a migration novamente"
+        )
+
+    # Um agendamento só pode ser faturado em uma guia ativa
+    op.drop_index('ix_tiss_guias_appointment_id', table_name='tiss_guias')
+    op.create_index(
+        'uq_tiss_guias_appointment_id', 'tiss_guias',
+        ['appointment_id'],
+        unique=True,
+        postgresql_where=sa.text('appointment_id IS NOT NULL AND deleted_at IS NULL')
+    )
+
+def downgrade():
+    op.drop_index('uq_tiss_guias_appointment_id', table_name='tiss_guias')
+    op.create_index('ix_tiss_guias_appointment_id', 'tiss_guias', ['appointment_id'], unique=False)
@@ -0,0 +1,28 @@
+"""normalize users.last_login to ISO text
+
+Revision ID: normalize_users_last_login
+Revises: add_tiss_guias_appointment_uq
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = 'normalize_users_last_login'
+down_revision = 'add_tiss_guias_appointment_uq'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # last_login é texto: login_json e o Google gravavam datetime, que o
+    # PostgreSQL converte como "2026-10-19 12:00:00", e o login gravava
+    # isoformat ("2026-10-19T12:00:00"). Comparações de texto (admin_stats)
+    # só funcionam com um formato
+    op.execute("""
+        UPDATE users
+        SET last_login = replace(last_login, ' ', 'T')
+        WHERE last_login LIKE '____-__-__ %'
+    """)
+
+def downgrade():
+    # Formato ISO é válido para as duas versões do código
+    pass
@@ -2,12 +2,13 @@
 Rotas de Contas a Receber
 Gestão Financeira Completa
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, func
+from sqlalchemy import desc, and_, func, insert
 from typing import Optional, List
 from datetime import datetime, timedelta
 from decimal import Decimal
+import uuid
 
 from app.core.database import get_db
 from app.models.financial import (
@@ -21,10 +22,14 @@ from app.schemas.financial import (
     PaymentTransactionCreate, PaymentTransactionResponse,
     ConfirmPaymentRequest, RefundPaymentRequest, CancelAccountRequest,
     FinancialSummary, PaymentMethodSummary, DailyRevenue, MonthlyRevenue,
-    PaymentStatusEnum, PaymentMethodEnum
+    PaymentStatusEnum, PaymentMethodEnum,
+    BulkPaymentRequest, PaymentBatchResult
 )
 from app.services.financial_service import financial_service
+from app.services.payment_import_service import payment_import_service
 
+# Ainda não montado em main.py: importa schemas que não existem em
+# app.schemas.financial (AccountReceivableListResponse, PaymentTransactionCreate...)
 router = APIRouter(prefix="/api/v1/financial/receivables", tags=["Contas a Receber"])
 
 
@@ -89,15 +94,17 @@ def create_account_receivable(account_data: AccountReceivableCreate, db: Session
             first_due_date=account_data.due_date
         )
         
-        for inst_data in installments_data:
-            installment = PaymentInstallment(
-                account_receivable_id=account.id,
-                installment_number=inst_data['installment_number'],
-                original_amount=inst_data['original_amount'],
-                total_amount=inst_data['total_amount'],
-                due_date=inst_data['due_date']
-            )
-            db.add(installment)
+        # Insert único para todas as parcelas
+        db.execute(insert(PaymentInstallment), [
+            {
+                "account_receivable_id": account.id,
+                "installment_number": inst_data['installment_number'],
+                "original_amount": inst_data['original_amount'],
+                "total_amount": inst_data['total_amount'],
+                "due_date": inst_data['due_date']
+            }
+            for inst_data in installments_data
+        ])
     
     db.commit()
     db.refresh(account)
@@ -323,10 +330,10 @@ def list_installments(account_id: str, db: Session = Depends(get_db)):
 def create_payment_transaction(payment_data: PaymentTransactionCreate, db: Session = Depends(get_db)):
     """Registra pagamento"""
     
-    # Busca conta
+    # Busca conta (FOR UPDATE: mesmo lock da importação em lote)
     account = db.query(AccountReceivable).filter(
         AccountReceivable.id == payment_data.account_receivable_id
-    ).first()
+    ).with_for_update().first()
     
     if not account:
         raise HTTPException(
@@ -390,6 +397,73 @@ def create_payment_transaction(payment_data: PaymentTransactionCreate, db: Sessi
     return transaction
 
 
+@router.post("/payments/bulk", response_model=PaymentBatchResult)
+def create_payment_transactions_bulk(bulk_data: BulkPaymentRequest, db: Session = Depends(get_db)):
+    """Registra pagamentos em lote (inserts em massa, um commit por bloco)"""
+    
+    payments = []
+    errors = []
+    
+    for line, payment in enumerate(bulk_data.payments, start=1):
+        try:
+            payments.append({
+                "line": line,
+                "account_receivable_id": uuid.UUID(payment.account_receivable_id),
+                "installment_id": uuid.UUID(payment.installment_id) if payment.installment_id else None,
+                "amount": payment.amount,
+                "payment_method": PaymentMethodType(payment.payment_method),
+                "payment_date": payment.payment_date,
+                "nsu": payment.nsu,
+                "notes": payment.notes
+            })
+        except ValueError as e:
+            errors.append({"line": line, "detail": f"Dados inválidos: {str(e)}"})
+    
+    result = payment_import_service.register_payments(db, payments)
+    result["total_rows"] += len(errors)
+    result["errors"] = (errors + result["errors"])[:100]
+    
+    return result
+
+
+@router.post("/payments/import", response_model=PaymentBatchResult)
+def import_bank_statement(
+    file: UploadFile = File(...),
+    payment_method: str = Query("transfer"),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa extrato bancário (CSV ou OFX) e concilia com parcelas em aberto
+    
+    O arquivo é lido em streaming; créditos são casados por valor,
+    vencimento e paciente (CPF, quando presente no CSV).
+    """
+    
+    try:
+        method = PaymentMethodType(payment_method)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Forma de pagamento inválida: {payment_method}"
+        )
+    
+    filename = (file.filename or "").lower()
+    if filename.endswith('.ofx'):
+        rows = payment_import_service.parse_ofx(file.file)
+    elif filename.endswith('.csv'):
+        rows = payment_import_service.parse_csv(file.file)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Arquivo deve ser CSV ou OFX"
+        )
+    
+    result = payment_import_service.import_statement(db, rows, payment_method=method)
+    result["errors"] = result["errors"][:100]
+    
+    return result
+
+
 @router.get("/payments", response_model=List[PaymentTransactionResponse])
 def list_payment_transactions(
     skip: int = Query(0, ge=0),
@@ -443,10 +517,10 @@ def refund_payment(
             detail="Transação já estornada"
         )
     
-    # Busca conta
+    # Busca conta (FOR UPDATE: mesmo lock da importação em lote)
     account = db.query(AccountReceivable).filter(
         AccountReceivable.id == transaction.account_receivable_id
-    ).first()
+    ).with_for_update().first()
     
     # Estorna transação
     transaction.is_refunded = True
@@ -8,6 +8,7 @@ from sqlalchemy import and_, func
 from typing import Optional, List
 from datetime import datetime, date, timedelta
 from app.core.database import get_db
+from app.core.fast_json import colunas, linhas_para_dicts, resposta_lista
 from app.models.appointment import Appointment, AppointmentWaitlist, ProfessionalSchedule
 from app.models.patient import Patient
 from app.schemas.appointment import (
@@ -88,7 +89,8 @@ def list_appointments(
     - date_from/date_to: filtra por período
     """
     
-    query = db.query(Appointment)
+    # Só as colunas de AppointmentListResponse, serializadas sem model por linha
+    query = db.query(*colunas(Appointment, AppointmentListResponse))
     
     # Aplicar filtros
     if status_filter:
@@ -110,7 +112,7 @@ def list_appointments(
     query = query.order_by(Appointment.scheduled_date)
     
     appointments = query.offset(skip).limit(limit).all()
-    return appointments
+    return resposta_lista(linhas_para_dicts(appointments))
 
 
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
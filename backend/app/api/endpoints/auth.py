@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
@@ -12,12 +14,15 @@ import httpx
 from app.core.config import settings
 from app.core.security import (
     verify_password,
+    verify_password_async,
     get_password_hash,
+    get_password_hash_async,
+    password_needs_rehash,
     create_access_token,
     get_current_user,
     get_current_active_user
 )
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.services.email_service import email_service
 from app.models.user import User
 from app.schemas.auth import (
@@ -72,7 +77,7 @@ async def register(
     new_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         email_verified=False,
         is_active=True,
         is_superuser=False
@@ -88,12 +93,12 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login com email e senha"""
     
     # Buscar usuário
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     
     if not user or not user.hashed_password:
         raise HTTPException(
@@ -103,7 +108,7 @@ async def login(
         )
     
     # Verificar senha
-    if not verify_password(form_data.password, user.hashed_password):
+    if not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -117,9 +122,13 @@ async def login(
             detail="Inactive user"
         )
     
-    # Atualizar last_login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Custo do bcrypt mudou (BCRYPT_ROUNDS): refaz o hash com a senha recebida
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(form_data.password)
+    
+    # Atualizar last_login (coluna texto: asyncpg não converte datetime para varchar)
+    user.last_login = datetime.utcnow().isoformat()
+    await db.commit()
     
     # Criar token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -152,7 +161,7 @@ async def login_json(
         )
     
     # Verificar senha
-    if not verify_password(login_data.password, user.hashed_password):
+    if not await verify_password_async(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -165,8 +174,12 @@ async def login_json(
             detail="Inactive user"
         )
     
-    # Atualizar last_login
-    user.last_login = datetime.utcnow()
+    # Custo do bcrypt mudou (BCRYPT_ROUNDS): refaz o hash com a senha recebida
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(login_data.password)
+    
+    # Atualizar last_login (ISO, como em login: admin_stats compara como texto)
+    user.last_login = datetime.utcnow().isoformat()
     db.commit()
     
     # Criar token
@@ -232,7 +245,7 @@ async def google_callback(
             user.google_refresh_token = token.get('refresh_token')
             user.picture = picture
             user.email_verified = email_verified
-            user.last_login = datetime.utcnow()
+            user.last_login = datetime.utcnow().isoformat()
             user.is_active = True
         else:
             # Criar novo usuário
@@ -246,7 +259,7 @@ async def google_callback(
                 email_verified=email_verified,
                 is_active=True,
                 is_superuser=False,
-                last_login=datetime.utcnow()
+                last_login=datetime.utcnow().isoformat()
             )
             db.add(user)
         
@@ -10,7 +10,8 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 from calendar import month_name
 
-from app.core.database import get_db
+from app.core.database import get_read_db
+from app.core.fast_json import resposta_lista
 from app.models.financial import (
     AccountReceivable, AccountPayable,
     PaymentTransaction, PayableTransaction,
@@ -32,7 +33,7 @@ router = APIRouter(prefix="/api/v1/financial/cash-flow", tags=["Fluxo de Caixa"]
 # ============================================
 
 @router.get("/dashboard", response_model=CashFlowDashboard)
-def get_cash_flow_dashboard(db: Session = Depends(get_db)):
+def get_cash_flow_dashboard(db: Session = Depends(get_read_db)):
     """Dashboard principal de fluxo de caixa"""
     
     today = datetime.utcnow().date()
@@ -111,7 +112,7 @@ def get_cash_flow_dashboard(db: Session = Depends(get_db)):
 def get_cash_flow_period(
     start_date: date = Query(..., description="Data inicial"),
     end_date: date = Query(..., description="Data final"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Fluxo de caixa de um período específico"""
     
@@ -162,42 +163,46 @@ def get_cash_flow_period(
 @router.get("/daily", response_model=List[DailyCashFlow])
 def get_daily_cash_flow(
     days: int = Query(7, ge=1, le=90, description="Número de dias"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Fluxo de caixa diário dos últimos N dias"""
     
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=days)
     
+    period_start = datetime.combine(start_date, datetime.min.time())
+    period_end = datetime.combine(end_date, datetime.max.time())
+    
+    # Totais por dia em uma consulta para receitas e outra para despesas
+    income_day = func.date(AccountReceivable.payment_date)
+    incomes = dict(db.query(income_day, func.sum(AccountReceivable.paid_amount)).filter(
+        AccountReceivable.payment_date >= period_start,
+        AccountReceivable.payment_date <= period_end,
+        AccountReceivable.is_deleted == False
+    ).group_by(income_day).all())
+    
+    expense_day = func.date(AccountPayable.payment_date)
+    expenses = dict(db.query(expense_day, func.sum(AccountPayable.paid_amount)).filter(
+        AccountPayable.payment_date >= period_start,
+        AccountPayable.payment_date <= period_end,
+        AccountPayable.is_deleted == False
+    ).group_by(expense_day).all())
+    
     daily_flows = []
     
     for i in range(days + 1):
         current_date = start_date + timedelta(days=i)
-        date_start = datetime.combine(current_date, datetime.min.time())
-        date_end = datetime.combine(current_date, datetime.max.time())
-        
-        # Receitas do dia
-        income = db.query(func.sum(AccountReceivable.paid_amount)).filter(
-            AccountReceivable.payment_date >= date_start,
-            AccountReceivable.payment_date <= date_end,
-            AccountReceivable.is_deleted == False
-        ).scalar() or Decimal(0)
+        income = incomes.get(current_date) or Decimal(0)
+        expense = expenses.get(current_date) or Decimal(0)
         
-        # Despesas do dia
-        expense = db.query(func.sum(AccountPayable.paid_amount)).filter(
-            AccountPayable.payment_date >= date_start,
-            AccountPayable.payment_date <= date_end,
-            AccountPayable.is_deleted == False
-        ).scalar() or Decimal(0)
-        
-        daily_flows.append(DailyCashFlow(
-            date=current_date,
-            income=income,
-            expense=expense,
-            balance=income - expense
-        ))
-    
-    return daily_flows
+        daily_flows.append({
+            "date": current_date,
+            "income": income,
+            "expense": expense,
+            "balance": income - expense
+        })
+    
+    return resposta_lista(daily_flows)
 
 
 # ============================================
@@ -207,7 +212,7 @@ def get_daily_cash_flow(
 @router.get("/monthly", response_model=List[MonthlyCashFlow])
 def get_monthly_cash_flow(
     months: int = Query(6, ge=1, le=24, description="Número de meses"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Fluxo de caixa mensal dos últimos N meses"""
     
@@ -270,7 +275,7 @@ def get_monthly_cash_flow(
 def get_expenses_by_category(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Despesas agrupadas por categoria"""
     
@@ -318,7 +323,7 @@ def get_expenses_by_category(
 @router.get("/projection", response_model=List[CashFlowProjection])
 def get_cash_flow_projection(
     days: int = Query(30, ge=1, le=90, description="Dias para projetar"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Projeção de fluxo de caixa futuro"""
     
@@ -372,7 +377,7 @@ def get_cash_flow_projection(
 # ============================================
 
 @router.get("/alerts", response_model=List[CashFlowAlert])
-def get_cash_flow_alerts(db: Session = Depends(get_db)):
+def get_cash_flow_alerts(db: Session = Depends(get_read_db)):
     """Alertas de fluxo de caixa"""
     
     alerts = []
@@ -6,6 +6,7 @@ from uuid import UUID
 from datetime import datetime
 
 from app.core.database import get_db
+from app.core.fast_json import resposta_lista
 from app.models.chat import ChatChannel, ChatMessage, ChatParticipant, ChatReadStatus, ChannelType, MessageType
 from app.models.user import User
 from app.schemas.chat import (
@@ -13,18 +14,21 @@ from app.schemas.chat import (
     ChatMessageCreate, ChatMessageUpdate, ChatMessageResponse,
     ChatParticipantAdd, ChatParticipantResponse, UserInfo
 )
-from app.core.security import get_current_user
+from app.core.security import require_module
 from app.core.websocket_manager import manager
 
 router = APIRouter()
 
+# Rotas HTTP do chat exigem o módulo "chat" em allowed_modules (admins têm todos)
+acesso_chat = require_module("chat")
+
 # ==================== CHANNELS ====================
 
 @router.post("/channels", response_model=ChatChannelResponse)
 def create_channel(
     channel_data: ChatChannelCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Criar novo canal de chat"""
     
@@ -81,7 +85,7 @@ def list_channels(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Listar canais do usuário"""
     
@@ -156,7 +160,7 @@ def list_channels(
 def get_channel(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Obter detalhes de um canal"""
     
@@ -217,7 +221,7 @@ def update_channel(
     channel_id: UUID,
     channel_data: ChatChannelUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Atualizar canal"""
     
@@ -267,7 +271,7 @@ def update_channel(
 def delete_channel(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Deletar canal (soft delete)"""
     
@@ -304,7 +308,7 @@ def delete_channel(
 async def send_message(
     message_data: ChatMessageCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Enviar mensagem"""
     
@@ -369,7 +373,7 @@ def get_messages(
     skip: int = 0,
     limit: int = 50,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Obter mensagens de um canal"""
     
@@ -384,45 +388,57 @@ def get_messages(
     if not is_participant:
         raise HTTPException(status_code=403, detail="Você não é participante deste canal")
     
-    messages = db.query(ChatMessage).options(
-        joinedload(ChatMessage.sender),
-        joinedload(ChatMessage.read_status)
+    # Colunas da mensagem e do remetente em um SELECT; leituras em outro
+    messages = db.query(
+        ChatMessage.id,
+        ChatMessage.channel_id,
+        ChatMessage.sender_id,
+        ChatMessage.message_type,
+        ChatMessage.content,
+        ChatMessage.file_url,
+        ChatMessage.is_edited,
+        ChatMessage.edited_at,
+        ChatMessage.created_at,
+        User.full_name,
+        User.email
+    ).join(
+        User, User.id == ChatMessage.sender_id
     ).filter(
         ChatMessage.channel_id == channel_id
     ).order_by(ChatMessage.created_at.desc()).offset(skip).limit(limit).all()
     
-    result = []
-    for msg in messages:
-        sender_info = UserInfo(
-            id=msg.sender.id,
-            full_name=msg.sender.full_name,
-            email=msg.sender.email
-        )
-        
-        read_by = [rs.user_id for rs in msg.read_status]
-        
-        result.append(ChatMessageResponse(
-            id=msg.id,
-            channel_id=msg.channel_id,
-            sender_id=msg.sender_id,
-            sender=sender_info,
-            message_type=msg.message_type,
-            content=msg.content,
-            file_url=msg.file_url,
-            is_edited=msg.is_edited,
-            edited_at=msg.edited_at,
-            created_at=msg.created_at,
-            read_by=read_by
-        ))
+    read_by = {msg.id: [] for msg in messages}
+    if read_by:
+        for message_id, user_id in db.query(ChatReadStatus.message_id, ChatReadStatus.user_id).filter(
+            ChatReadStatus.message_id.in_(list(read_by))
+        ):
+            read_by[message_id].append(user_id)
     
-    return list(reversed(result))  # Retornar em ordem cronológica
+    result = [
+        {
+            "id": msg.id,
+            "channel_id": msg.channel_id,
+            "sender_id": msg.sender_id,
+            "sender": {"id": msg.sender_id, "full_name": msg.full_name, "email": msg.email},
+            "message_type": msg.message_type,
+            "content": msg.content,
+            "file_url": msg.file_url,
+            "is_edited": msg.is_edited,
+            "edited_at": msg.edited_at,
+            "created_at": msg.created_at,
+            "read_by": read_by[msg.id]
+        }
+        for msg in reversed(messages)  # Retornar em ordem cronológica
+    ]
+    
+    return resposta_lista(result)
 
 @router.put("/messages/{message_id}", response_model=ChatMessageResponse)
 async def update_message(
     message_id: UUID,
     message_data: ChatMessageUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Editar mensagem"""
     
@@ -476,7 +492,7 @@ async def update_message(
 async def delete_message(
     message_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Deletar mensagem"""
     
@@ -508,7 +524,7 @@ async def delete_message(
 async def mark_as_read(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Marcar canal como lido"""
     
@@ -534,7 +550,7 @@ def add_participant(
     channel_id: UUID,
     participant_data: ChatParticipantAdd,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Adicionar participante ao canal"""
     
@@ -593,7 +609,7 @@ def add_participant(
 def list_participants(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Listar participantes do canal"""
     
@@ -637,7 +653,7 @@ def remove_participant(
     channel_id: UUID,
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Remover participante do canal"""
     
@@ -714,7 +730,7 @@ async def websocket_endpoint(
 def delete_channel(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Excluir canal (apenas criador ou admin)"""
     
@@ -740,7 +756,7 @@ def add_participant(
     channel_id: UUID,
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Adicionar participante ao canal"""
     
@@ -790,7 +806,7 @@ def remove_participant(
     channel_id: UUID,
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Remover participante do canal"""
     
@@ -834,7 +850,7 @@ def remove_participant(
 def list_participants(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Listar participantes do canal"""
     
@@ -860,7 +876,7 @@ def list_participants(
 def list_channel_files(
     channel_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(acesso_chat)
 ):
     """Listar todos os arquivos de um canal"""
     
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract, case
 from datetime import datetime, timedelta, date
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.models.user import User
 from app.models.patient import Patient
 from app.models.appointment import Appointment
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("/dashboard-admin")
 def get_admin_dashboard(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Dashboard completo para administradores da clínica"""
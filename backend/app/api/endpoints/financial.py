@@ -2,14 +2,16 @@
 Endpoints de Gestão Financeira
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, select
 from typing import List, Optional
+from uuid import UUID
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.database import get_async_db, get_db
+from app.core.security import get_current_user, get_current_user_async
 from app.models.user import User
 from app.models.patient import Patient
 from app.models.financial import AccountReceivable, PaymentStatus, PaymentMethodType
@@ -103,47 +105,53 @@ async def create_receivable(
 @router.get("/receivables", response_model=List[AccountReceivableResponse])
 async def list_receivables(
     status: Optional[str] = None,
-    patient_id: Optional[str] = None,
+    patient_id: Optional[UUID] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Listar contas a receber"""
     
-    query = db.query(AccountReceivable).filter(
+    # Nomes de paciente e profissional no mesmo SELECT
+    query = select(
+        AccountReceivable, Patient.full_name, User.full_name
+    ).outerjoin(
+        Patient, Patient.id == AccountReceivable.patient_id
+    ).outerjoin(
+        User, User.id == AccountReceivable.healthcare_professional_id
+    ).where(
         AccountReceivable.is_deleted == False
     )
     
     if status:
-        query = query.filter(AccountReceivable.status == status)
+        query = query.where(AccountReceivable.status == status)
     
     if patient_id:
-        query = query.filter(AccountReceivable.patient_id == patient_id)
+        query = query.where(AccountReceivable.patient_id == patient_id)
     
     if start_date:
-        query = query.filter(AccountReceivable.due_date >= start_date)
+        query = query.where(AccountReceivable.due_date >= start_date)
     
     if end_date:
-        query = query.filter(AccountReceivable.due_date <= end_date)
+        query = query.where(AccountReceivable.due_date <= end_date)
     
-    receivables = query.order_by(AccountReceivable.due_date.desc()).offset(skip).limit(limit).all()
+    rows = await db.execute(
+        query.order_by(AccountReceivable.due_date.desc()).offset(skip).limit(limit)
+    )
     
     result = []
-    for r in receivables:
-        patient = db.query(Patient).filter(Patient.id == r.patient_id).first()
-        professional = db.query(User).filter(User.id == r.healthcare_professional_id).first() if r.healthcare_professional_id else None
-        
+    for r, patient_name, professional_name in rows:
         result.append(AccountReceivableResponse(
             id=r.id,
             invoice_number=r.invoice_number,
             description=r.description,
             patient_id=r.patient_id,
-            patient_name=patient.full_name if patient else None,
+            patient_name=patient_name,
             healthcare_professional_id=r.healthcare_professional_id,
-            professional_name=professional.full_name if professional else None,
+            professional_name=professional_name,
             original_amount=r.original_amount,
             discount_amount=r.discount_amount,
             interest_amount=r.interest_amount,
@@ -5,6 +5,7 @@ from uuid import UUID
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.reference_cache import referencia_versionada
 from app.models.user import User
 from app.models.job_title import JobTitle
 from app.schemas.job_title import JobTitleCreate, JobTitleUpdate, JobTitleResponse
@@ -19,7 +20,8 @@ def list_job_titles(
     is_healthcare_professional: bool = None,
     is_active: bool = True,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cache_headers: dict = Depends(referencia_versionada("job_titles"))
 ):
     """Listar todos os cargos com filtros opcionais"""
     query = db.query(JobTitle)
@@ -39,7 +41,8 @@ def list_job_titles(
 @router.get("/departments", response_model=List[str])
 def list_departments(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cache_headers: dict = Depends(referencia_versionada("job_titles"))
 ):
     """Listar todos os departamentos únicos"""
     departments = db.query(JobTitle.department).distinct().order_by(JobTitle.department).all()
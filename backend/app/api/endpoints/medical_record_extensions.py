@@ -10,6 +10,7 @@ from datetime import datetime
 import json
 
 from app.core.database import get_db
+from app.core.reference_cache import referencia_versionada
 from app.models.medical_record_template import MedicalRecordTemplate, ExamResult, PhotoEvolution
 from app.models.patient import Patient
 from app.schemas.medical_record_extension import (
@@ -89,7 +90,10 @@ def delete_template(template_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/specialties")
-def list_specialties(db: Session = Depends(get_db)):
+def list_specialties(
+    db: Session = Depends(get_db),
+    cache_headers: dict = Depends(referencia_versionada("medical_record_templates"))
+):
     """Lista especialidades disponíveis"""
     specialties = db.query(MedicalRecordTemplate.specialty).distinct().all()
     return {"specialties": [s[0] for s in specialties]}
@@ -329,7 +333,11 @@ def compare_photos(comparison_request: PhotoComparisonRequest, db: Session = Dep
 
 
 @router.get("/photo-evolution/body-parts")
-def list_body_parts(patient_id: Optional[str] = None, db: Session = Depends(get_db)):
+def list_body_parts(
+    patient_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    cache_headers: dict = Depends(referencia_versionada("photo_evolutions"))
+):
     """Lista partes do corpo fotografadas"""
     query = db.query(PhotoEvolution.body_part).distinct()
     if patient_id:
@@ -4,6 +4,8 @@ from typing import List
 from app.core.database import get_db
 from app.models.user import User
 from app.core.security import get_current_user
+from app.core.reference_cache import CabecalhosReferencia, referencia_versionada
+from app.services.medication_search_service import medication_search_service
 from pydantic import BaseModel
 from uuid import UUID
 
@@ -25,21 +27,17 @@ def search_medications(
     q: str = Query(..., min_length=2, description="Termo de busca (mínimo 2 caracteres)"),
     limit: int = Query(10, ge=1, le=50, description="Limite de resultados"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cache_headers: CabecalhosReferencia = Depends(referencia_versionada("medications"))
 ):
     """
-    Busca medicamentos por nome comercial ou princípio ativo
+    Busca medicamentos por nome comercial ou princípio ativo (autocomplete)
     - Mínimo 2 caracteres
     - Retorna até 10 resultados por padrão
-    - Busca case-insensitive
+    - Sem diferenciar maiúsculas nem acentos; tolera erros de digitação
+    - Ordem: nome começando pelo termo, princípio ativo, palavra, trecho;
+      mais prescritos primeiro
     """
-    from app.models.medication import Medication
-    
-    search_term = f"%{q.lower()}%"
-    
-    medications = db.query(Medication).filter(
-        (Medication.commercial_name.ilike(search_term)) |
-        (Medication.active_ingredient.ilike(search_term))
-    ).limit(limit).all()
-    
-    return medications
+    return medication_search_service.buscar(
+        db, q, limit, versao_tabela=cache_headers.versoes["medications"]
+    )
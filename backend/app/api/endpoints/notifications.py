@@ -3,12 +3,14 @@ Endpoints de Notificações
 Webhook para confirmação de consultas via WhatsApp
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.models.appointment import Appointment
 from app.models.patient import Patient
 from app.models.notification import Notification, NotificationType, NotificationStatus
@@ -19,7 +21,7 @@ logger = logging.getLogger(__name__)
 notification_service = NotificationService()
 
 @router.post("/webhook/twilio")
-async def twilio_webhook(request: Request, db: Session = Depends(get_db)):
+async def twilio_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Webhook para receber respostas do Twilio (WhatsApp/SMS)
     Quando paciente responde SIM ou NÃO, este endpoint processa
@@ -38,27 +40,29 @@ async def twilio_webhook(request: Request, db: Session = Depends(get_db)):
         phone = from_number.replace('whatsapp:', '').strip()
         
         # Buscar paciente pelo telefone
-        patient = db.query(Patient).filter(Patient.phone == phone).first()
+        patient = await db.scalar(select(Patient).where(Patient.phone == phone).limit(1))
         
         if not patient:
             logger.warning(f"⚠️ Paciente não encontrado para telefone {phone}")
             return {"status": "ok", "message": "Paciente não encontrado"}
         
         # Buscar última notificação pendente de confirmação
-        notification = db.query(Notification).filter(
-            Notification.recipient_phone == phone,
-            Notification.template_used.in_(['lembrete_24h', 'lembrete_1h']),
-            Notification.status == NotificationStatus.SENT
-        ).order_by(Notification.sent_at.desc()).first()
+        notification = await db.scalar(
+            select(Notification).where(
+                Notification.recipient_phone == phone,
+                Notification.template_used.in_(['lembrete_24h', 'lembrete_1h']),
+                Notification.status == NotificationStatus.SENT
+            ).order_by(Notification.sent_at.desc()).limit(1)
+        )
         
         if not notification or not notification.appointment_id:
             logger.warning(f"⚠️ Nenhuma notificação pendente para {patient.full_name}")
             return {"status": "ok", "message": "Sem notificação pendente"}
         
         # Buscar consulta
-        appointment = db.query(Appointment).filter(
-            Appointment.id == notification.appointment_id
-        ).first()
+        appointment = await db.scalar(
+            select(Appointment).where(Appointment.id == notification.appointment_id)
+        )
         
         if not appointment:
             logger.warning(f"⚠️ Consulta não encontrada")
@@ -68,7 +72,7 @@ async def twilio_webhook(request: Request, db: Session = Depends(get_db)):
         if 'SIM' in body or 'YES' in body or 'OK' in body or 'CONFIRMAR' in body:
             # CONFIRMAR consulta
             appointment.status = 'confirmed'
-            db.commit()
+            await db.commit()
             
             # Enviar mensagem de confirmação
             confirmation_msg = NotificationTemplates.confirmacao_recebida(
@@ -96,14 +100,14 @@ async def twilio_webhook(request: Request, db: Session = Depends(get_db)):
             )
             
             db.add(confirmation_notification)
-            db.commit()
+            await db.commit()
             
             logger.info(f"✅ Consulta confirmada por {patient.full_name}")
         
         elif 'NAO' in body or 'NÃO' in body or 'NO' in body or 'CANCELAR' in body:
             # CANCELAR consulta
             appointment.status = 'cancelled'
-            db.commit()
+            await db.commit()
             
             # Enviar mensagem de cancelamento
             cancellation_msg = NotificationTemplates.cancelamento_recebido(
@@ -131,7 +135,7 @@ async def twilio_webhook(request: Request, db: Session = Depends(get_db)):
             )
             
             db.add(cancellation_notification)
-            db.commit()
+            await db.commit()
             
             logger.info(f"❌ Consulta cancelada por {patient.full_name}")
         
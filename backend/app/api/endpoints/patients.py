@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
 from typing import List, Optional
 from uuid import UUID
 from datetime import date, datetime
+import re
+import unicodedata
 
 from app.core.database import get_db
+from app.core.fast_json import linhas_para_dicts, resposta_lista
 from app.models.patient import Patient
 from app.models.user import User
 from app.models.organization import Organization
@@ -13,6 +17,20 @@ from pydantic import BaseModel, Field
 
 router = APIRouter()
 
+
+# Mesmas expressões dos índices GIN (pg_trgm) criados na migration
+# add_patient_trgm_search: precisam bater exatamente para o índice ser usado
+def _nome_normalizado(coluna):
+    return func.lower(func.immutable_unaccent(coluna))
+
+def _somente_digitos(coluna):
+    return func.regexp_replace(coluna, r'\D', '', 'g')
+
+def _normalizar_busca(texto: str) -> str:
+    """Minúsculas e sem acentos (mesmo resultado de lower(unaccent()))"""
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower().strip()
+
 class PatientCreate(BaseModel):
     full_name: str = Field(..., min_length=1, max_length=255)
     cpf: Optional[str] = None
@@ -87,7 +105,14 @@ def list_patients(
     - search: Buscar por nome, CPF ou telefone
     """
     
-    query = db.query(Patient)
+    # Colunas de PatientResponse e nome da organização no mesmo SELECT
+    # (uma consulta por página, sem carregar entidades Patient)
+    query = db.query(*[
+        Organization.name.label(campo) if campo == "organization_name" else getattr(Patient, campo)
+        for campo in PatientResponse.model_fields
+    ]).outerjoin(
+        Organization, Organization.id == Patient.organization_id
+    )
     
     # Filtro por organização (opcional)
     if organization_id:
@@ -97,43 +122,36 @@ def list_patients(
     if is_active is not None:
         query = query.filter(Patient.is_active == is_active)
     
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Patient.full_name.ilike(search_filter)) |
-            (Patient.cpf.ilike(search_filter)) |
-            (Patient.phone.ilike(search_filter))
-        )
-    
-    patients = query.order_by(Patient.full_name).offset(skip).limit(limit).all()
+    order_by = [Patient.full_name]
     
-    # Adicionar nome da organização
-    result = []
-    for patient in patients:
-        org = db.query(Organization).filter(Organization.id == patient.organization_id).first()
-        result.append(PatientResponse(
-            id=patient.id,
-            organization_id=patient.organization_id,
-            organization_name=org.name if org else None,
-            full_name=patient.full_name,
-            cpf=patient.cpf,
-            rg=patient.rg,
-            birth_date=patient.birth_date.isoformat() if patient.birth_date else None,
-            gender=patient.gender,
-            phone=patient.phone,
-            email=patient.email,
-            address=patient.address,
-            city=patient.city,
-            state=patient.state,
-            zip_code=patient.zip_code,
-            blood_type=patient.blood_type,
-            allergies=patient.allergies,
-            observations=patient.observations,
-            is_active=patient.is_active,
-            created_at=patient.created_at.isoformat() if isinstance(patient.created_at, datetime) else patient.created_at
-        ))
-    
-    return result
+    if search:
+        # Nome: trecho sem acento (LIKE) ou parecido (operador % do pg_trgm),
+        # ordenado pela similaridade; CPF/telefone: só os dígitos
+        termo = _normalizar_busca(search)
+        digitos = re.sub(r'\D', '', search)
+        nome = _nome_normalizado(Patient.full_name)
+        
+        condicoes = [
+            nome.like(f"%{termo}%"),
+            nome.op('%')(termo)
+        ]
+        if len(digitos) >= 3:
+            condicoes.append(_somente_digitos(Patient.cpf).like(f"%{digitos}%"))
+            condicoes.append(_somente_digitos(Patient.phone).like(f"%{digitos}%"))
+        
+        query = query.filter(or_(*condicoes))
+        order_by = [func.similarity(nome, termo).desc(), Patient.full_name]
+    
+    rows = query.order_by(*order_by).offset(skip).limit(limit).all()
+    
+    result = linhas_para_dicts(rows)
+    for patient in result:
+        if patient["birth_date"]:
+            patient["birth_date"] = patient["birth_date"].isoformat()
+        if isinstance(patient["created_at"], datetime):
+            patient["created_at"] = patient["created_at"].isoformat()
+    
+    return resposta_lista(result)
 
 @router.post("/", response_model=PatientResponse)
 def create_patient(
@@ -4,9 +4,11 @@ from typing import List
 from uuid import UUID
 
 from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_permission
+from app.core.reference_cache import referencia_versionada
 from app.models.user import User
 from app.models.permission import Permission, UserPermission
+from app.services.permission_service import permission_service
 from app.schemas.permission import (
     PermissionResponse,
     UserPermissionCreate,
@@ -17,7 +19,10 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[PermissionResponse])
-def list_all_permissions(db: Session = Depends(get_db)):
+def list_all_permissions(
+    db: Session = Depends(get_db),
+    cache_headers: dict = Depends(referencia_versionada("permissions", publico=True))
+):
     """Lista todas as permissões disponíveis no sistema"""
     permissions = db.query(Permission).order_by(Permission.module, Permission.action).all()
     return permissions
@@ -29,27 +34,8 @@ def get_my_permissions(
     current_user: User = Depends(get_current_user)
 ):
     """Retorna lista de nomes de permissões do usuário atual"""
-    
-    # Super admin tem todas as permissões
-    if current_user.role == 'super_admin':
-        all_perms = db.query(Permission.name).all()
-        return [p[0] for p in all_perms]
-    
-    # Admin tem todas menos manage_users
-    if current_user.role == 'admin':
-        all_perms = db.query(Permission.name).filter(
-            Permission.name != 'manage_users'
-        ).all()
-        return [p[0] for p in all_perms]
-    
-    # Usuários básicos: buscar permissões específicas
-    user_perms = db.query(Permission.name).join(
-        UserPermission, UserPermission.permission_id == Permission.id
-    ).filter(
-        UserPermission.user_id == current_user.id
-    ).all()
-    
-    return [p[0] for p in user_perms]
+    # Super admin: todas; admin: todas menos manage_users; demais: user_permissions
+    return permission_service.listar_permissoes(db, current_user)
 
 
 @router.get("/my-modules", response_model=List[str])
@@ -58,29 +44,8 @@ def get_my_modules(
     current_user: User = Depends(get_current_user)
 ):
     """Retorna lista de módulos que o usuário tem acesso"""
-    
-    # Super admin e admin têm acesso a todos
-    if current_user.role in ['super_admin', 'admin']:
-        return [
-            "dashboard", "pacientes", "agenda", "prontuarios", 
-            "prescricoes", "cfm", "relatorios", "chat"
-        ]
-    
-    # Usuários básicos: retornar allowed_modules
-    if current_user.allowed_modules:
-        modules = current_user.allowed_modules
-        
-        # Se for string (formato PostgreSQL ARRAY {a,b,c}), converter para lista
-        if isinstance(modules, str):
-            # Remover { } e dividir por vírgula
-            modules = modules.strip('{}').split(',')
-            # Limpar espaços
-            modules = [m.strip() for m in modules if m.strip()]
-        
-        return modules
-    
-    # Se não tiver módulos definidos, retornar vazio
-    return []
+    # Super admin e admin: todos; demais: allowed_modules
+    return permission_service.listar_modulos(db, current_user)
 
 
 @router.get("/user/{user_id}", response_model=UserPermissionsDetail)
@@ -103,9 +68,10 @@ def get_user_permissions(user_id: UUID, db: Session = Depends(get_db)):
 def assign_permissions_to_user(
     user_id: UUID,
     permissions_data: UserPermissionCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("manage_users"))
 ):
-    """Atribui permissões a um usuário"""
+    """Atribui permissões a um usuário (exige manage_users)"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
@@ -132,8 +98,12 @@ def assign_permissions_to_user(
 
 
 @router.delete("/user/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_all_permissions(user_id: UUID, db: Session = Depends(get_db)):
-    """Remove todas as permissões de um usuário"""
+def remove_all_permissions(
+    user_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("manage_users"))
+):
+    """Remove todas as permissões de um usuário (exige manage_users)"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
@@ -11,9 +11,11 @@ from decimal import Decimal
 from calendar import monthrange
 
 from app.core.database import get_db
+from app.core.security import get_current_user
+from app.models.user import User
 from app.models.financial import (
     ProfessionalFeeConfiguration, ProfessionalFee, ProfessionalFeeItem,
-    AccountReceivable, PaymentStatus, ProfessionalFeeType
+    ProfessionalFeeMonthlySummary, AccountReceivable, PaymentStatus, ProfessionalFeeType
 )
 from app.schemas.financial import (
     ProfessionalFeeConfigurationCreate, ProfessionalFeeConfigurationUpdate,
@@ -22,10 +24,17 @@ from app.schemas.financial import (
     ProfessionalFeeItemResponse,
     GenerateFeeRequest, PayFeeRequest,
     ProfessionalFeeSummary, MonthlyFeeSummary,
+    GenerateFeeBatchRequest, GenerateFeeBatchResponse,
+    GeneratedFeeSummary, SkippedFeeProfessional,
     MONTH_NAMES
 )
 from app.services.financial_service import financial_service
+from app.services.fee_summary_service import fee_summary_service
+from app.services.professional_fee_service import professional_fee_service
 
+# Ainda não montado em main.py: importa schemas que não existem em
+# app.schemas.financial (ProfessionalFeeConfigurationCreate...). A geração
+# fica em professional_fee_service e o consolidado em fee_summary_service.
 router = APIRouter(prefix="/api/v1/financial/professional-fees", tags=["Repasse Profissionais"])
 
 
@@ -175,128 +184,68 @@ def generate_professional_fee(generate_data: GenerateFeeRequest, db: Session = D
             detail="Profissional não possui configuração de repasse ativa"
         )
     
-    # Verifica se já existe repasse para este período
-    existing = db.query(ProfessionalFee).filter(
-        ProfessionalFee.healthcare_professional_id == generate_data.healthcare_professional_id,
-        ProfessionalFee.reference_month == generate_data.reference_month,
-        ProfessionalFee.reference_year == generate_data.reference_year,
-        ProfessionalFee.is_deleted == False
-    ).first()
+    fee_ids, skipped = professional_fee_service.generate_for_period(
+        db,
+        generate_data.reference_year,
+        generate_data.reference_month,
+        professional_ids=[config.healthcare_professional_id]
+    )
     
-    if existing:
+    if not fee_ids:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Já existe repasse gerado para este período"
+            detail=skipped.get(config.healthcare_professional_id, "Não foi possível gerar o repasse")
         )
     
-    # Define período
-    period_start = datetime(generate_data.reference_year, generate_data.reference_month, 1)
-    last_day = monthrange(generate_data.reference_year, generate_data.reference_month)[1]
-    period_end = datetime(generate_data.reference_year, generate_data.reference_month, last_day, 23, 59, 59)
-    
-    # Busca contas pagas no período
-    receivables = db.query(AccountReceivable).filter(
-        AccountReceivable.healthcare_professional_id == generate_data.healthcare_professional_id,
-        AccountReceivable.payment_date >= period_start,
-        AccountReceivable.payment_date <= period_end,
-        AccountReceivable.status == PaymentStatus.PAID.value,
-        AccountReceivable.is_deleted == False
-    ).all()
+    db.commit()
     
-    if not receivables:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Não há atendimentos pagos no período selecionado"
-        )
+    fee = db.query(ProfessionalFee).filter(ProfessionalFee.id == fee_ids[0]).first()
     
-    # Calcula valores
-    gross_amount = Decimal(0)
-    total_revenue = Decimal(0)
-    total_appointments = len(receivables)
-    
-    fee_items = []
-    
-    for receivable in receivables:
-        total_revenue += receivable.paid_amount
-        
-        # Calcula repasse baseado na configuração
-        if config.fee_type == ProfessionalFeeType.PERCENTAGE.value:
-            fee_amount = receivable.paid_amount * (config.percentage / 100)
-        else:  # FIXED
-            fee_amount = config.fixed_amount
-        
-        gross_amount += fee_amount
-        
-        # Cria item
-        fee_items.append({
-            'account_receivable_id': receivable.id,
-            'appointment_id': receivable.appointment_id,
-            'description': receivable.description,
-            'service_amount': receivable.paid_amount,
-            'fee_amount': fee_amount,
-            'service_date': receivable.payment_date
-        })
-    
-    # Calcula retenções
-    inss_amount = Decimal(0)
-    ir_amount = Decimal(0)
-    iss_amount = Decimal(0)
-    
-    if config.apply_inss:
-        inss_amount = gross_amount * (config.inss_rate / 100)
-    
-    if config.apply_ir:
-        ir_amount = gross_amount * (config.ir_rate / 100)
-    
-    if config.apply_iss:
-        iss_amount = gross_amount * (config.iss_rate / 100)
-    
-    # Valor líquido
-    net_amount = gross_amount - inss_amount - ir_amount - iss_amount - config.other_deductions
-    
-    # Verifica valor mínimo
-    if config.minimum_amount and net_amount < config.minimum_amount:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Valor líquido ({net_amount}) é menor que o valor mínimo configurado ({config.minimum_amount})"
-        )
+    return fee
+
+
+@router.post("/generate/batch", response_model=GenerateFeeBatchResponse, status_code=status.HTTP_201_CREATED)
+def generate_professional_fees_batch(
+    generate_data: GenerateFeeBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Gera repasses do mês para todos os profissionais da organização"""
+    
+    fee_ids, skipped = professional_fee_service.generate_for_period(
+        db,
+        generate_data.reference_year,
+        generate_data.reference_month,
+        professional_ids=generate_data.professional_ids,
+        organization_id=current_user.organization_id
+    )
     
-    # Gera número do repasse
-    fee_number = financial_service.generate_invoice_number(prefix="REP")
+    db.commit()
     
-    # Cria repasse
-    fee = ProfessionalFee(
-        fee_number=fee_number,
-        healthcare_professional_id=generate_data.healthcare_professional_id,
+    fees = db.query(ProfessionalFee).filter(ProfessionalFee.id.in_(fee_ids)).all() if fee_ids else []
+    
+    return GenerateFeeBatchResponse(
         reference_month=generate_data.reference_month,
         reference_year=generate_data.reference_year,
-        period_start=period_start,
-        period_end=period_end,
-        gross_amount=gross_amount,
-        inss_amount=inss_amount,
-        ir_amount=ir_amount,
-        iss_amount=iss_amount,
-        other_deductions=config.other_deductions,
-        net_amount=net_amount,
-        total_appointments=total_appointments,
-        total_revenue=total_revenue
+        generated=len(fees),
+        fees=[
+            GeneratedFeeSummary(
+                id=str(fee.id),
+                fee_number=fee.fee_number,
+                healthcare_professional_id=str(fee.healthcare_professional_id),
+                gross_amount=fee.gross_amount,
+                net_amount=fee.net_amount,
+                total_appointments=fee.total_appointments,
+                total_revenue=fee.total_revenue
+            )
+            for fee in fees
+        ],
+        skipped=[
+            SkippedFeeProfessional(healthcare_professional_id=str(professional_id), reason=reason)
+            for professional_id, reason in skipped.items()
+        ]
     )
-    
-    db.add(fee)
-    db.flush()  # Para obter o ID
-    
-    # Cria itens
-    for item_data in fee_items:
-        item = ProfessionalFeeItem(
-            professional_fee_id=fee.id,
-            **item_data
-        )
-        db.add(item)
-    
-    db.commit()
-    db.refresh(fee)
-    
-    return fee
 
 
 # ============================================
@@ -386,6 +335,9 @@ def delete_professional_fee(fee_id: str, db: Session = Depends(get_db)):
     
     fee.is_deleted = True
     fee.deleted_at = datetime.utcnow()
+    db.flush()
+    
+    fee_summary_service.refresh_fee(db, fee)
     
     db.commit()
     
@@ -424,6 +376,9 @@ def pay_professional_fee(pay_data: PayFeeRequest, db: Session = Depends(get_db))
     
     if pay_data.notes:
         fee.notes = f"{fee.notes or ''}\n{pay_data.notes}"
+    db.flush()
+    
+    fee_summary_service.refresh_fee(db, fee)
     
     db.commit()
     
@@ -440,41 +395,32 @@ def get_professional_summary(
     year: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Resumo de repasses de um profissional"""
-    
-    query = db.query(ProfessionalFee).filter(
-        ProfessionalFee.healthcare_professional_id == professional_id,
-        ProfessionalFee.is_deleted == False
+    """Resumo de repasses de um profissional (lido do consolidado mensal)"""
+    
+    query = db.query(
+        func.coalesce(func.sum(ProfessionalFeeMonthlySummary.total_fees), 0).label('total_fees'),
+        func.coalesce(func.sum(ProfessionalFeeMonthlySummary.total_gross), 0).label('total_gross'),
+        func.coalesce(func.sum(ProfessionalFeeMonthlySummary.total_net), 0).label('total_net'),
+        func.coalesce(func.sum(ProfessionalFeeMonthlySummary.total_deductions), 0).label('total_deductions'),
+        func.coalesce(func.sum(ProfessionalFeeMonthlySummary.pending_amount), 0).label('pending_amount'),
+        func.coalesce(func.sum(ProfessionalFeeMonthlySummary.paid_amount), 0).label('paid_amount')
+    ).filter(
+        ProfessionalFeeMonthlySummary.healthcare_professional_id == professional_id
     )
     
     if year:
-        query = query.filter(ProfessionalFee.reference_year == year)
-    
-    fees = query.all()
+        query = query.filter(ProfessionalFeeMonthlySummary.reference_year == year)
     
-    total_fees = len(fees)
-    total_gross = sum(fee.gross_amount for fee in fees)
-    total_net = sum(fee.net_amount for fee in fees)
-    total_deductions = total_gross - total_net
-    
-    pending_amount = sum(
-        fee.net_amount for fee in fees 
-        if fee.status != PaymentStatus.PAID.value
-    )
-    
-    paid_amount = sum(
-        fee.net_amount for fee in fees 
-        if fee.status == PaymentStatus.PAID.value
-    )
+    totals = query.one()
     
     return ProfessionalFeeSummary(
         professional_id=professional_id,
-        total_fees=total_fees,
-        total_gross=total_gross,
-        total_net=total_net,
-        total_deductions=total_deductions,
-        pending_amount=pending_amount,
-        paid_amount=paid_amount
+        total_fees=totals.total_fees,
+        total_gross=totals.total_gross,
+        total_net=totals.total_net,
+        total_deductions=totals.total_deductions,
+        pending_amount=totals.pending_amount,
+        paid_amount=totals.paid_amount
     )
 
 
@@ -483,33 +429,46 @@ def get_monthly_summary(
     year: int = Query(..., ge=2020, le=2100),
     db: Session = Depends(get_db)
 ):
-    """Resumo mensal de repasses"""
-    
-    summaries = []
-    
-    for month in range(1, 13):
-        fees = db.query(ProfessionalFee).filter(
-            ProfessionalFee.reference_year == year,
-            ProfessionalFee.reference_month == month,
-            ProfessionalFee.is_deleted == False
-        ).all()
-        
-        if fees:
-            total_professionals = len(set(fee.healthcare_professional_id for fee in fees))
-            total_fees = len(fees)
-            total_gross = sum(fee.gross_amount for fee in fees)
-            total_net = sum(fee.net_amount for fee in fees)
-            total_deductions = total_gross - total_net
-            
-            summaries.append(MonthlyFeeSummary(
-                year=year,
-                month=month,
-                month_name=MONTH_NAMES[month],
-                total_professionals=total_professionals,
-                total_fees=total_fees,
-                total_gross=total_gross,
-                total_net=total_net,
-                total_deductions=total_deductions
-            ))
-    
-    return summaries
+    """Resumo mensal de repasses (lido do consolidado mensal)"""
+    
+    rows = db.query(
+        ProfessionalFeeMonthlySummary.reference_month,
+        func.count(ProfessionalFeeMonthlySummary.healthcare_professional_id).label('total_professionals'),
+        func.sum(ProfessionalFeeMonthlySummary.total_fees).label('total_fees'),
+        func.sum(ProfessionalFeeMonthlySummary.total_gross).label('total_gross'),
+        func.sum(ProfessionalFeeMonthlySummary.total_net).label('total_net'),
+        func.sum(ProfessionalFeeMonthlySummary.total_deductions).label('total_deductions')
+    ).filter(
+        ProfessionalFeeMonthlySummary.reference_year == year
+    ).group_by(
+        ProfessionalFeeMonthlySummary.reference_month
+    ).order_by(
+        ProfessionalFeeMonthlySummary.reference_month
+    ).all()
+    
+    return [
+        MonthlyFeeSummary(
+            year=year,
+            month=row.reference_month,
+            month_name=MONTH_NAMES[row.reference_month],
+            total_professionals=row.total_professionals,
+            total_fees=row.total_fees,
+            total_gross=row.total_gross,
+            total_net=row.total_net,
+            total_deductions=row.total_deductions
+        )
+        for row in rows
+    ]
+
+
+@router.post("/reports/rebuild")
+def rebuild_fee_summaries(
+    year: Optional[int] = Query(None, ge=2020, le=2100),
+    db: Session = Depends(get_db)
+):
+    """Reconstrói o consolidado mensal de repasses a partir dos repasses"""
+    
+    rows = fee_summary_service.rebuild(db, year)
+    db.commit()
+    
+    return {"message": "Consolidado de repasses reconstruído", "success": True, "rows": rows}
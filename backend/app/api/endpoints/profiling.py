@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.profiling import request_profiler
+from app.core.security import get_current_user
+from app.models.user import User
+
+router = APIRouter()
+
+
+def _somente_super_admin(current_user: User):
+    if current_user.role != 'super_admin':
+        raise HTTPException(status_code=403, detail="Acesso negado. Apenas Super Admin.")
+
+
+@router.get("/")
+def get_profiling(current_user: User = Depends(get_current_user)):
+    """Estado do profiling e agregados por rota (mais statements primeiro)"""
+    _somente_super_admin(current_user)
+    return {
+        "ativo": request_profiler.ativo,
+        "rotas": request_profiler.agregados()
+    }
+
+
+@router.put("/")
+def set_profiling(ativo: bool, current_user: User = Depends(get_current_user)):
+    """Liga ou desliga o profiling neste processo (sem reiniciar)"""
+    _somente_super_admin(current_user)
+    if ativo:
+        request_profiler.ativar()
+    else:
+        request_profiler.desativar()
+    return {"ativo": request_profiler.ativo}
+
+
+@router.delete("/")
+def reset_profiling(current_user: User = Depends(get_current_user)):
+    """Zera os agregados por rota"""
+    _somente_super_admin(current_user)
+    request_profiler.limpar()
+    return {"message": "Agregados zerados"}
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func, extract, select
 from datetime import datetime, timedelta
 from typing import Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_read_db, get_read_db
 from app.models.appointment import Appointment
 from app.models.patient import Patient
 from app.models.medical_record import MedicalRecord
@@ -16,7 +17,7 @@ router = APIRouter()
 async def get_dashboard_overview(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Métricas gerais do dashboard"""
     
@@ -25,28 +26,36 @@ async def get_dashboard_overview(
     if not end_date:
         end_date = datetime.now().strftime("%Y-%m-%d")
     
-    total_patients = db.query(func.count(Patient.id)).filter(
+    # asyncpg não converte texto para timestamp: colunas DateTime recebem datetime
+    # (patients.created_at é texto ISO e continua comparado como texto)
+    try:
+        inicio = datetime.fromisoformat(start_date)
+        fim = datetime.fromisoformat(end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Data inválida (use AAAA-MM-DD)")
+    
+    total_patients = await db.scalar(select(func.count(Patient.id)).where(
         Patient.created_at >= start_date,
         Patient.created_at <= end_date
-    ).scalar() or 0
+    )) or 0
     
-    consultas_previstas = db.query(func.count(Appointment.id)).filter(
-        Appointment.scheduled_date >= start_date,
-        Appointment.scheduled_date <= end_date
-    ).scalar() or 0
+    consultas_previstas = await db.scalar(select(func.count(Appointment.id)).where(
+        Appointment.scheduled_date >= inicio,
+        Appointment.scheduled_date <= fim
+    )) or 0
     
-    consultas_realizadas = db.query(func.count(Appointment.id)).filter(
-        Appointment.scheduled_date >= start_date,
-        Appointment.scheduled_date <= end_date,
+    consultas_realizadas = await db.scalar(select(func.count(Appointment.id)).where(
+        Appointment.scheduled_date >= inicio,
+        Appointment.scheduled_date <= fim,
         Appointment.status == "completed"
-    ).scalar() or 0
+    )) or 0
     
-    total_prontuarios = db.query(func.count(MedicalRecord.id)).filter(
-        MedicalRecord.created_at >= start_date,
-        MedicalRecord.created_at <= end_date
-    ).scalar() or 0
+    total_prontuarios = await db.scalar(select(func.count(MedicalRecord.id)).where(
+        MedicalRecord.created_at >= inicio,
+        MedicalRecord.created_at <= fim
+    )) or 0
     
-    total_pacientes_geral = db.query(func.count(Patient.id)).scalar() or 0
+    total_pacientes_geral = await db.scalar(select(func.count(Patient.id))) or 0
     
     taxa_realizacao = round((consultas_realizadas / consultas_previstas * 100), 2) if consultas_previstas > 0 else 0
     
@@ -67,7 +76,7 @@ async def get_dashboard_overview(
 
 
 @router.get("/patients-by-month")
-async def get_patients_by_month(db: Session = Depends(get_db)):
+async def get_patients_by_month(db: Session = Depends(get_read_db)):
     """Novos pacientes por mês (últimos 6 meses)"""
     
     six_months_ago = datetime.now() - timedelta(days=180)
@@ -98,7 +107,7 @@ async def get_patients_by_month(db: Session = Depends(get_db)):
 async def get_appointments_by_status(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Agendamentos por status"""
     
@@ -136,7 +145,7 @@ async def get_appointments_by_status(
 
 
 @router.get("/patients-activity")
-async def get_patients_activity(db: Session = Depends(get_db)):
+async def get_patients_activity(db: Session = Depends(get_read_db)):
     """Pacientes ativos vs inativos"""
     
     active = db.query(func.count(Patient.id)).filter(
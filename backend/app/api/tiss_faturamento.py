@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from sqlalchemy import func, tuple_
+from typing import List
+from uuid import UUID
+
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.models.user import User
+from app.models.tiss import TISSFaturamentoResumo, TISSOperadora
+from app.schemas.tiss import AgrupamentoAnaliseEnum, TISSAnaliseFaturamentoItem
+from app.services.tiss_faturamento_service import tiss_faturamento_service
+
+router = APIRouter(prefix="/tiss/faturamento", tags=["TISS - Análise de Faturamento"])
+
+
+@router.get("/analise", response_model=List[TISSAnaliseFaturamentoItem])
+def analise_faturamento(
+    agrupar_por: AgrupamentoAnaliseEnum = AgrupamentoAnaliseEnum.OPERADORA,
+    ano_inicio: int = None,
+    mes_inicio: int = 1,
+    ano_fim: int = None,
+    mes_fim: int = 12,
+    operadora_id: UUID = None,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Taxa de glosa, valor aceito e prazo médio de pagamento
+
+    Lê o resumo consolidado (tiss_faturamento_resumo), agrupado por
+    operadora, procedimento ou profissional. Considera lotes já fechados.
+    """
+    resumo = TISSFaturamentoResumo
+
+    if agrupar_por == AgrupamentoAnaliseEnum.OPERADORA:
+        chave = resumo.operadora_id
+        nome = func.max(TISSOperadora.razao_social)
+    elif agrupar_por == AgrupamentoAnaliseEnum.PROCEDIMENTO:
+        chave = resumo.codigo_procedimento
+        nome = func.max(resumo.descricao_procedimento)
+    else:
+        chave = resumo.profissional
+        nome = func.max(resumo.profissional)
+
+    valor_informado = func.sum(resumo.valor_informado)
+
+    query = db.query(
+        chave.label("chave"),
+        nome.label("nome"),
+        func.sum(resumo.quantidade_procedimentos).label("quantidade_procedimentos"),
+        func.sum(resumo.quantidade_glosados).label("quantidade_glosados"),
+        valor_informado.label("valor_informado"),
+        func.sum(resumo.valor_glosa).label("valor_glosa"),
+        func.sum(resumo.valor_aceito).label("valor_aceito"),
+        func.sum(resumo.quantidade_pagos).label("quantidade_pagos"),
+        func.sum(resumo.dias_ate_pagamento).label("dias_ate_pagamento")
+    ).filter(
+        resumo.organization_id == current_user.organization_id
+    )
+
+    if agrupar_por == AgrupamentoAnaliseEnum.OPERADORA:
+        query = query.join(TISSOperadora, TISSOperadora.id == resumo.operadora_id)
+
+    # Comparação de (ano, mes) usa o índice do período
+    if ano_inicio:
+        query = query.filter(tuple_(resumo.ano, resumo.mes) >= tuple_(ano_inicio, mes_inicio))
+    if ano_fim:
+        query = query.filter(tuple_(resumo.ano, resumo.mes) <= tuple_(ano_fim, mes_fim))
+    if operadora_id:
+        query = query.filter(resumo.operadora_id == operadora_id)
+
+    resultados = query.group_by(chave).order_by(valor_informado.desc()).limit(limit).all()
+
+    return [
+        TISSAnaliseFaturamentoItem(
+            chave=str(r.chave),
+            nome=r.nome or "Não informado",
+            quantidade_procedimentos=r.quantidade_procedimentos or 0,
+            quantidade_glosados=r.quantidade_glosados or 0,
+            valor_informado=float(r.valor_informado or 0),
+            valor_glosa=float(r.valor_glosa or 0),
+            valor_aceito=float(r.valor_aceito or 0),
+            taxa_glosa=round(float(r.valor_glosa or 0) / float(r.valor_informado) * 100, 2)
+            if r.valor_informado else 0.0,
+            prazo_medio_pagamento_dias=round(float(r.dias_ate_pagamento) / r.quantidade_pagos, 1)
+            if r.quantidade_pagos else None
+        )
+        for r in resultados
+    ]
+
+
+@router.post("/reconstruir")
+def reconstruir_resumo_faturamento(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Reconstrói o resumo de faturamento da organização a partir dos lotes"""
+    try:
+        total = tiss_faturamento_service.reconstruir(db, current_user.organization_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao reconstruir resumo: {str(e)}"
+        )
+
+    return {"message": "Resumo de faturamento reconstruído", "total_linhas": total}
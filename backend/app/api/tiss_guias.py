@@ -1,21 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from typing import List
 from uuid import UUID
 from datetime import datetime
+import uuid
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.tiss import TISSGuia, TISSLote, TISSProcedimento
 from app.models.patient import Patient
+from app.models.appointment import Appointment, AppointmentStatus
 from app.schemas.tiss import (
     TISSGuiaCreate,
     TISSGuiaUpdate,
     TISSGuiaResponse,
     TISSGuiaListResponse,
-    TISSGuiaComProcedimentos
+    TISSGuiaComProcedimentos,
+    TISSGuiasEmLoteRequest,
+    TISSGuiasEmLoteResponse
 )
+from app.services.tiss_numeracao_service import tiss_numeracao_service
 
 router = APIRouter(prefix="/tiss/guias", tags=["TISS - Guias"])
 
@@ -23,17 +30,9 @@ router = APIRouter(prefix="/tiss/guias", tags=["TISS - Guias"])
 def gerar_numero_guia(db: Session, organization_id: UUID) -> str:
     """Gerar número sequencial da guia"""
     # Formato: GUIA-AAAA-XXXXXX (Ex: GUIA-2024-000001)
+    # Contador do ano com lock de linha (sem COUNT e sem colisão)
     ano_atual = datetime.utcnow().year
-    
-    # Contar guias do ano
-    count = db.query(TISSGuia).filter(
-        TISSGuia.organization_id == organization_id,
-        TISSGuia.numero_guia_prestador.like(f"GUIA-{ano_atual}-%"),
-        TISSGuia.deleted_at.is_(None)
-    ).count()
-    
-    sequencial = str(count + 1).zfill(6)
-    return f"GUIA-{ano_atual}-{sequencial}"
+    return tiss_numeracao_service.numeros_guia(db, organization_id, ano_atual)[0]
 
 
 @router.post("/", response_model=TISSGuiaResponse, status_code=status.HTTP_201_CREATED)
@@ -93,6 +92,203 @@ def criar_guia(
     return db_guia
 
 
+@router.post("/em-lote", response_model=TISSGuiasEmLoteResponse, status_code=status.HTTP_201_CREATED)
+def criar_guias_em_lote(
+    request: TISSGuiasEmLoteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Criar guias (com procedimentos) a partir de agendamentos concluídos
+    
+    Entram os agendamentos concluídos de pacientes da operadora do lote
+    que ainda não têm guia. Tudo é gravado em uma única transação, com
+    INSERTs em massa e uma faixa de números de guia reservada de uma vez.
+    """
+    lote = db.query(TISSLote).filter(
+        TISSLote.id == request.lote_id,
+        TISSLote.organization_id == current_user.organization_id,
+        TISSLote.deleted_at.is_(None)
+    ).first()
+    
+    if not lote:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lote não encontrado"
+        )
+    
+    if lote.status != "rascunho":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Não é possível adicionar guias a um lote que não está em rascunho"
+        )
+    
+    if not request.appointment_ids and not (request.data_inicio and request.data_fim):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe appointment_ids ou o período (data_inicio e data_fim)"
+        )
+    
+    # Agendamentos + dados do paciente + profissional em uma única query
+    query = db.query(
+        Appointment.id,
+        Appointment.status,
+        Appointment.scheduled_date,
+        Appointment.price,
+        Patient.id.label("patient_id"),
+        Patient.full_name,
+        Patient.numero_carteira,
+        Patient.validade_carteira,
+        Patient.cns,
+        Patient.operadora_id,
+        User.full_name.label("nome_profissional"),
+        TISSGuia.id.label("guia_existente")
+    ).join(
+        Patient, Patient.id == Appointment.patient_id
+    ).outerjoin(
+        User, User.id == Appointment.healthcare_professional_id
+    ).outerjoin(
+        TISSGuia,
+        (TISSGuia.appointment_id == Appointment.id) & TISSGuia.deleted_at.is_(None)
+    ).filter(
+        Patient.organization_id == current_user.organization_id
+    )
+    
+    if request.appointment_ids:
+        query = query.filter(Appointment.id.in_(request.appointment_ids))
+    else:
+        query = query.filter(
+            Appointment.status == AppointmentStatus.COMPLETED,
+            Appointment.scheduled_date >= datetime.combine(request.data_inicio, datetime.min.time()),
+            Appointment.scheduled_date <= datetime.combine(request.data_fim, datetime.max.time()),
+            Patient.operadora_id == lote.operadora_id
+        )
+    
+    agendamentos = query.order_by(Appointment.scheduled_date).all()
+    
+    encontrados = {ag.id for ag in agendamentos}
+    ignorados = [
+        {"appointment_id": appointment_id, "motivo": "Agendamento não encontrado"}
+        for appointment_id in (request.appointment_ids or [])
+        if appointment_id not in encontrados
+    ]
+    
+    validos = []
+    for ag in agendamentos:
+        if ag.status != AppointmentStatus.COMPLETED:
+            motivo = "Agendamento não concluído"
+        elif ag.guia_existente:
+            motivo = "Agendamento já possui guia"
+        elif ag.operadora_id != lote.operadora_id:
+            motivo = "Paciente não pertence à operadora do lote"
+        elif not ag.numero_carteira:
+            motivo = "Paciente sem número de carteira"
+        else:
+            validos.append(ag)
+            continue
+        ignorados.append({"appointment_id": ag.id, "motivo": motivo})
+    
+    if not validos:
+        return TISSGuiasEmLoteResponse(
+            total_guias=0,
+            total_procedimentos=0,
+            valor_total=0.0,
+            ignorados=ignorados
+        )
+    
+    numeros = tiss_numeracao_service.numeros_guia(
+        db, current_user.organization_id, datetime.utcnow().year, len(validos)
+    )
+    agora = datetime.utcnow()
+    
+    guias = []
+    procedimentos = []
+    for ag, numero_guia in zip(validos, numeros):
+        guia_id = uuid.uuid4()
+        data_atendimento = ag.scheduled_date.date()
+        valor_guia = 0.0
+        
+        for proc in request.procedimentos:
+            valor_unitario = proc.valor_unitario_informado
+            if valor_unitario is None:
+                valor_unitario = float(ag.price or 0)
+            valor_total = valor_unitario * proc.quantidade_executada
+            valor_guia += valor_total
+            
+            procedimentos.append({
+                "id": uuid.uuid4(),
+                "organization_id": current_user.organization_id,
+                "guia_id": guia_id,
+                "data_realizacao": data_atendimento,
+                "tabela": proc.tabela,
+                "codigo_procedimento": proc.codigo_procedimento,
+                "descricao_procedimento": proc.descricao_procedimento,
+                "quantidade_executada": proc.quantidade_executada,
+                "valor_unitario_informado": valor_unitario,
+                "valor_total_informado": valor_total,
+                "nome_profissional_executante": ag.nome_profissional,
+                "created_at": agora,
+                "updated_at": agora
+            })
+        
+        guias.append({
+            "id": guia_id,
+            "organization_id": current_user.organization_id,
+            "lote_id": lote.id,
+            "patient_id": ag.patient_id,
+            "appointment_id": ag.id,
+            "tipo_guia": request.tipo_guia.value,
+            "numero_guia_prestador": numero_guia,
+            "data_atendimento": data_atendimento,
+            "hora_inicial": ag.scheduled_date.strftime("%H:%M"),
+            "numero_carteira": ag.numero_carteira,
+            "validade_carteira": ag.validade_carteira,
+            "nome_beneficiario": ag.full_name,
+            "numero_cns": ag.cns,
+            "codigo_prestador_na_operadora": request.codigo_prestador_na_operadora,
+            "nome_contratado": request.nome_contratado,
+            "cnpj_contratado": request.cnpj_contratado,
+            "cnes": request.cnes,
+            "nome_profissional": ag.nome_profissional,
+            "indicacao_clinica": request.indicacao_clinica,
+            "valor_total_informado": valor_guia,
+            "status": "pendente",
+            "created_at": agora,
+            "updated_at": agora
+        })
+    
+    try:
+        db.execute(insert(TISSGuia), guias)
+        db.execute(insert(TISSProcedimento), procedimentos)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        # Outra requisição faturou algum destes agendamentos depois da
+        # checagem acima; o rollback devolve a faixa de números reservada
+        if getattr(getattr(e.orig, "diag", None), "constraint_name", None) == "uq_tiss_guias_appointment_id":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Agendamentos já faturados por outra requisição; repita a operação para criar as guias restantes"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao criar guias: {str(e)}"
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao criar guias: {str(e)}"
+        )
+    
+    return TISSGuiasEmLoteResponse(
+        total_guias=len(guias),
+        total_procedimentos=len(procedimentos),
+        valor_total=sum(guia["valor_total_informado"] for guia in guias),
+        ignorados=ignorados
+    )
+
+
 @router.get("/", response_model=List[TISSGuiaListResponse])
 def listar_guias(
     skip: int = 0,
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import List
 from uuid import UUID
 from datetime import datetime
@@ -8,6 +9,8 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.tiss import TISSLote, TISSOperadora, TISSGuia
+from app.services.tiss_faturamento_service import tiss_faturamento_service
+from app.services.tiss_numeracao_service import tiss_numeracao_service
 from app.schemas.tiss import (
     TISSLoteCreate,
     TISSLoteUpdate,
@@ -21,17 +24,8 @@ router = APIRouter(prefix="/tiss/lotes", tags=["TISS - Lotes"])
 def gerar_numero_lote(db: Session, organization_id: UUID, competencia: str) -> str:
     """Gerar número sequencial do lote"""
     # Formato: LOTE-AAAAMM-XXX (Ex: LOTE-202411-001)
-    ano_mes = competencia.replace("/", "")
-    
-    # Contar lotes existentes na competência
-    count = db.query(TISSLote).filter(
-        TISSLote.organization_id == organization_id,
-        TISSLote.competencia == competencia,
-        TISSLote.deleted_at.is_(None)
-    ).count()
-    
-    sequencial = str(count + 1).zfill(3)
-    return f"LOTE-{ano_mes}-{sequencial}"
+    # Contador da competência com lock de linha (sem COUNT e sem colisão)
+    return tiss_numeracao_service.numeros_lote(db, organization_id, competencia)[0]
 
 
 @router.post("/", response_model=TISSLoteResponse, status_code=status.HTTP_201_CREATED)
@@ -153,6 +147,10 @@ def atualizar_lote(
     
     lote.updated_at = datetime.utcnow()
     
+    # Pagamento/glosa/status alteram o resumo de faturamento
+    db.flush()
+    tiss_faturamento_service.atualizar_lotes(db, [lote.id])
+    
     db.commit()
     db.refresh(lote)
     
@@ -185,22 +183,21 @@ def fechar_lote(
             detail="Apenas lotes em rascunho podem ser fechados"
         )
     
-    # Buscar guias do lote
-    guias = db.query(TISSGuia).filter(
+    # Totais das guias calculados no banco
+    quantidade_guias, valor_total = db.query(
+        func.count(TISSGuia.id),
+        func.coalesce(func.sum(TISSGuia.valor_total_informado), 0)
+    ).filter(
         TISSGuia.lote_id == lote_id,
         TISSGuia.deleted_at.is_(None)
-    ).all()
+    ).one()
     
-    if not guias:
+    if not quantidade_guias:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Lote não possui guias vinculadas"
         )
     
-    # Calcular totais
-    valor_total = sum(guia.valor_total_informado for guia in guias)
-    quantidade_guias = len(guias)
-    
     # Atualizar lote
     lote.status = "enviado"
     lote.valor_total_informado = valor_total
@@ -208,6 +205,9 @@ def fechar_lote(
     lote.data_envio = datetime.utcnow()
     lote.updated_at = datetime.utcnow()
     
+    db.flush()
+    tiss_faturamento_service.atualizar_lotes(db, [lote.id])
+    
     db.commit()
     db.refresh(lote)
     
@@ -6,6 +6,7 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.reference_cache import referencia_versionada
 from app.models.user import User
 from app.models.tiss import TISSOperadora
 from app.schemas.tiss import (
@@ -56,7 +57,8 @@ def listar_operadoras(
     limit: int = 100,
     ativo: bool = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cache_headers: dict = Depends(referencia_versionada("tiss_operadoras", por_organizacao=True))
 ):
     """Listar operadoras da organização"""
     
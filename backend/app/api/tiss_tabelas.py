@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
@@ -13,6 +14,12 @@ from app.schemas.tiss import (
     TISSTabelaReferenciaUpdate,
     TISSTabelaReferenciaResponse
 )
+from app.services.tuss_index_service import tuss_index_service
+from app.core.fast_json import resposta_lista
+from app.core.reference_cache import CabecalhosReferencia, referencia_versionada
+
+# Numeric no banco, float em TISSTabelaReferenciaResponse
+CAMPOS_VALOR = ("valor_referencia", "valor_minimo", "valor_maximo")
 
 router = APIRouter(prefix="/tiss/tabelas", tags=["TISS - Tabelas de Referência"])
 
@@ -49,6 +56,8 @@ def criar_tabela_referencia(
     db.commit()
     db.refresh(db_tabela)
     
+    tuss_index_service.atualizar(db, current_user.organization_id)
+    
     return db_tabela
 
 
@@ -61,32 +70,33 @@ def listar_tabelas_referencia(
     ativo: bool = None,
     busca: str = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cache_headers: CabecalhosReferencia = Depends(referencia_versionada("tiss_tabelas_referencia", por_organizacao=True))
 ):
-    """Listar procedimentos das tabelas de referência"""
-    
-    query = db.query(TISSTabelaReferencia).filter(
-        TISSTabelaReferencia.organization_id == current_user.organization_id,
-        TISSTabelaReferencia.deleted_at.is_(None)
+    """
+    Listar procedimentos das tabelas de referência
+    
+    Atendido pelo índice em memória: busca casa prefixo de código ou
+    início das palavras da descrição, sem diferenciar acentos.
+    """
+    tabelas = tuss_index_service.listar(
+        db,
+        current_user.organization_id,
+        skip=skip,
+        limit=limit,
+        tipo_tabela=tipo_tabela,
+        codigo_tabela=codigo_tabela,
+        ativo=ativo,
+        busca=busca,
+        versao_tabela=cache_headers.versoes["tiss_tabelas_referencia"]
     )
     
-    if tipo_tabela:
-        query = query.filter(TISSTabelaReferencia.tipo_tabela == tipo_tabela)
-    
-    if codigo_tabela:
-        query = query.filter(TISSTabelaReferencia.codigo_tabela == codigo_tabela)
-    
-    if ativo is not None:
-        query = query.filter(TISSTabelaReferencia.ativo == ativo)
+    for tabela in tabelas:
+        for campo in CAMPOS_VALOR:
+            if tabela[campo] is not None:
+                tabela[campo] = float(tabela[campo])
     
-    if busca:
-        query = query.filter(
-            (TISSTabelaReferencia.codigo.ilike(f"%{busca}%")) |
-            (TISSTabelaReferencia.descricao.ilike(f"%{busca}%"))
-        )
-    
-    tabelas = query.order_by(TISSTabelaReferencia.codigo).offset(skip).limit(limit).all()
-    return tabelas
+    return resposta_lista(tabelas, headers=cache_headers)
 
 
 @router.get("/buscar/{codigo}", response_model=TISSTabelaReferenciaResponse)
@@ -94,17 +104,15 @@ def buscar_por_codigo(
     codigo: str,
     tipo_tabela: str = "TUSS",
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cache_headers: CabecalhosReferencia = Depends(referencia_versionada("tiss_tabelas_referencia", por_organizacao=True))
 ):
-    """Buscar procedimento por código"""
+    """Buscar procedimento por código (índice em memória)"""
     
-    tabela = db.query(TISSTabelaReferencia).filter(
-        TISSTabelaReferencia.organization_id == current_user.organization_id,
-        TISSTabelaReferencia.tipo_tabela == tipo_tabela,
-        TISSTabelaReferencia.codigo == codigo,
-        TISSTabelaReferencia.ativo == True,
-        TISSTabelaReferencia.deleted_at.is_(None)
-    ).first()
+    tabela = tuss_index_service.buscar_codigo(
+        db, current_user.organization_id, tipo_tabela, codigo,
+        versao_tabela=cache_headers.versoes["tiss_tabelas_referencia"]
+    )
     
     if not tabela:
         raise HTTPException(
@@ -166,9 +174,21 @@ def atualizar_tabela_referencia(
     
     tabela.updated_at = datetime.utcnow()
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        # Código alterado para um já usado na mesma tabela (índice único parcial)
+        if getattr(getattr(e.orig, "diag", None), "constraint_name", None) != "uq_tiss_tabelas_referencia_codigo":
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Código {update_data.get('codigo', tabela.codigo)} já existe na tabela {update_data.get('tipo_tabela', tabela.tipo_tabela)}"
+        )
     db.refresh(tabela)
     
+    tuss_index_service.atualizar(db, current_user.organization_id)
+    
     return tabela
 
 
@@ -196,6 +216,8 @@ def deletar_tabela_referencia(
     tabela.deleted_at = datetime.utcnow()
     db.commit()
     
+    tuss_index_service.atualizar(db, current_user.organization_id)
+    
     return None
 
 
@@ -259,6 +281,8 @@ def importar_tuss(
     
     db.commit()
     
+    tuss_index_service.atualizar(db, current_user.organization_id)
+    
     return {
         "message": f"{importados} procedimentos TUSS importados com sucesso",
         "total_importados": importados
@@ -266,73 +290,151 @@ def importar_tuss(
 
 # IMPORTAÇÃO CSV
 from fastapi import UploadFile, File
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import csv
+import gzip
+import io
+import uuid
+
+# Linhas enviadas ao banco por INSERT ... ON CONFLICT
+LINHAS_POR_LOTE_IMPORTACAO = 1000
+
+# Colunas atualizadas quando o código já existe na tabela
+COLUNAS_UPSERT_TUSS = ("descricao", "valor_referencia", "capitulo", "grupo", "subgrupo", "ativo", "updated_at")
+
+
+def _abrir_csv(file: UploadFile, encoding: str):
+    """
+    Leitor de CSV sobre o arquivo enviado, sem carregá-lo inteiro
+
+    Arquivos .gz (ou com assinatura gzip) são descompactados em fluxo.
+    """
+    binario = file.file
+    assinatura = binario.read(2)
+    binario.seek(0)
+    
+    if file.filename.endswith('.gz') or assinatura == b'\x1f\x8b':
+        binario = gzip.GzipFile(fileobj=binario, mode='rb')
+    
+    texto = io.TextIOWrapper(binario, encoding=encoding, newline='')
+    return csv.DictReader(texto)
+
+
+def _upsert_lote_tuss(db: Session, registros: List[dict]) -> dict:
+    """Grava um lote de procedimentos com um único INSERT ... ON CONFLICT"""
+    stmt = pg_insert(TISSTabelaReferencia).values(registros)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['organization_id', 'tipo_tabela', 'codigo'],
+        index_where=TISSTabelaReferencia.deleted_at.is_(None),
+        set_={coluna: stmt.excluded[coluna] for coluna in COLUNAS_UPSERT_TUSS}
+    ).returning(
+        # xmax = 0 só para linhas recém-inseridas
+        literal_column("xmax = 0").label("inserido")
+    )
+    
+    resultado = db.execute(stmt).scalars().all()
+    db.commit()
+    
+    inseridos = sum(1 for inserido in resultado if inserido)
+    return {"inseridos": inseridos, "atualizados": len(resultado) - inseridos}
+
 
 @router.post("/importar-csv", status_code=status.HTTP_201_CREATED)
-async def importar_tuss_csv(
+def importar_tuss_csv(
     file: UploadFile = File(...),
+    encoding: str = "utf-8-sig",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Importar tabela TUSS completa via CSV"""
-    import csv
-    import io
+    """
+    Importar tabela TUSS completa via CSV (ou CSV compactado em .gz)
     
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Arquivo deve ser CSV")
+    O arquivo é lido em fluxo e gravado em lotes com upsert: códigos
+    novos são inseridos e códigos existentes têm descrição, valor e
+    classificação atualizados.
+    """
+    if not file.filename.endswith(('.csv', '.csv.gz')):
+        raise HTTPException(status_code=400, detail="Arquivo deve ser CSV ou CSV.GZ")
     
-    contents = await file.read()
-    csv_data = contents.decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(csv_data))
+    try:
+        csv_reader = _abrir_csv(file, encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Encoding inválido: {encoding}")
     
-    importados = 0
-    erros = []
+    hoje = datetime.now().date()
+    agora = datetime.utcnow()
     
-    for row in csv_reader:
-        try:
-            codigo = row.get('codigo', '').strip()
-            descricao = row.get('descricao', '').strip()
-            
-            if not codigo or not descricao:
-                continue
-            
-            existing = db.query(TISSTabelaReferencia).filter(
-                TISSTabelaReferencia.organization_id == current_user.organization_id,
-                TISSTabelaReferencia.codigo == codigo,
-                TISSTabelaReferencia.deleted_at.is_(None)
-            ).first()
-            
-            if existing:
+    lotes = []
+    erros = []
+    ignorados = 0
+    pendentes = {}
+    
+    def gravar_pendentes():
+        resultado = _upsert_lote_tuss(db, list(pendentes.values()))
+        resultado["lote"] = len(lotes) + 1
+        resultado["linhas"] = len(pendentes)
+        lotes.append(resultado)
+        pendentes.clear()
+    
+    try:
+        for row in csv_reader:
+            try:
+                codigo = (row.get('codigo') or '').strip()
+                descricao = (row.get('descricao') or '').strip()
+                
+                if not codigo or not descricao:
+                    ignorados += 1
+                    continue
+                
+                valor_str = (row.get('valor_referencia') or '0').replace(',', '.')
+                valor = float(valor_str) if valor_str else 0.0
+                
+                # Código repetido no mesmo lote: vale a última linha
+                pendentes[codigo] = {
+                    "id": uuid.uuid4(),
+                    "organization_id": current_user.organization_id,
+                    "tipo_tabela": "TUSS",
+                    "codigo_tabela": "22",
+                    "codigo": codigo,
+                    "descricao": descricao.upper(),
+                    "valor_referencia": valor,
+                    "data_inicio_vigencia": hoje,
+                    "capitulo": (row.get('capitulo') or '').upper(),
+                    "grupo": (row.get('grupo') or '').upper(),
+                    "subgrupo": (row.get('subgrupo') or '').upper(),
+                    "ativo": True,
+                    "created_at": agora,
+                    "updated_at": agora
+                }
+            except Exception as e:
+                erros.append(f"Linha {csv_reader.line_num}: {str(e)}")
                 continue
             
-            valor_str = row.get('valor_referencia', '0').replace(',', '.')
-            valor = float(valor_str) if valor_str else 0.0
-            
-            db_proc = TISSTabelaReferencia(
-                organization_id=current_user.organization_id,
-                tipo_tabela="TUSS",
-                codigo_tabela="22",
-                codigo=codigo,
-                descricao=descricao.upper(),
-                valor_referencia=valor,
-                data_inicio_vigencia=datetime.now().date(),
-                capitulo=row.get('capitulo', '').upper(),
-                grupo=row.get('grupo', '').upper(),
-                subgrupo=row.get('subgrupo', '').upper()
-            )
-            db.add(db_proc)
-            importados += 1
-            
-            if importados % 100 == 0:
-                db.commit()
-                
-        except Exception as e:
-            erros.append(f"Erro: {str(e)}")
-            continue
+            if len(pendentes) >= LINHAS_POR_LOTE_IMPORTACAO:
+                gravar_pendentes()
+        
+        if pendentes:
+            gravar_pendentes()
     
-    db.commit()
+    except (UnicodeDecodeError, gzip.BadGzipFile, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Erro ao ler arquivo na linha {csv_reader.line_num}: {str(e)} "
+                   f"({sum(lote['linhas'] for lote in lotes)} linhas já gravadas)"
+        )
+    
+    tuss_index_service.atualizar(db, current_user.organization_id)
+    
+    total_inseridos = sum(lote["inseridos"] for lote in lotes)
+    total_atualizados = sum(lote["atualizados"] for lote in lotes)
     
     return {
         "message": "Importação concluída",
-        "total_importados": importados,
+        "total_importados": total_inseridos,
+        "total_atualizados": total_atualizados,
+        "total_ignorados": ignorados,
+        "lotes": lotes,
         "erros": erros[:10]
     }
@@ -1,89 +1,206 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import Dict
-from app.core.database import get_db
-from app.schemas.tiss_xml import XMLTISSGenerateRequest, XMLTISSGenerateResponse
+from app.core.database import get_db, get_read_db, SessionLocal
+from app.schemas.tiss_xml import (
+    XMLTISSGenerateRequest,
+    XMLTISSGenerateResponse,
+    XMLTISSExportRequest,
+    XMLTISSExportJobResponse
+)
 from app.services.tiss_xml_generator import TISSXMLGenerator
+from app.services.tiss_export_service import tiss_export_service
+from app.services.tiss_xsd_validator import tiss_xsd_validator, TISSSchemaIndisponivel
 from app.models.tiss import TISSLote, TISSGuia, TISSOperadora, TISSProcedimento
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/tiss-xml", tags=["TISS XML"])
 
+# Guias lidas do banco por vez durante a geração do XML
+GUIAS_POR_BLOCO = 500
+
+# XML gerado para validação fica em memória até este tamanho, depois vai para disco
+XML_VALIDACAO_MEMORIA_MAX = 8 * 1024 * 1024
+
+def _carregar_lote(db: Session, lote_id: str):
+    """Busca lote e operadora, validando se o lote pode gerar XML"""
+    lote = db.query(TISSLote).filter(TISSLote.id == lote_id).first()
+    if not lote:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    
+    operadora = db.query(TISSOperadora).filter(
+        TISSOperadora.id == lote.operadora_id
+    ).first()
+    if not operadora:
+        raise HTTPException(status_code=404, detail="Operadora não encontrada")
+    
+    quantidade_guias = db.query(func.count(TISSGuia.id)).filter(
+        TISSGuia.lote_id == lote_id,
+        TISSGuia.deleted_at == None
+    ).scalar()
+    
+    if not quantidade_guias:
+        raise HTTPException(status_code=400, detail="Lote sem guias válidas")
+    
+    return lote, operadora, quantidade_guias
+
+
+def _primeiro_procedimento_subquery(db: Session, lote_id):
+    """Primeiro procedimento de cada guia do lote (DISTINCT ON guia_id)"""
+    return db.query(
+        TISSProcedimento.guia_id,
+        TISSProcedimento.codigo_procedimento,
+        TISSProcedimento.descricao_procedimento,
+        TISSProcedimento.valor_unitario_informado
+    ).join(
+        TISSGuia, TISSGuia.id == TISSProcedimento.guia_id
+    ).filter(
+        TISSGuia.lote_id == lote_id
+    ).distinct(
+        TISSProcedimento.guia_id
+    ).order_by(
+        TISSProcedimento.guia_id,
+        TISSProcedimento.created_at
+    ).subquery()
+
+
+def _iterar_guias(db: Session, lote_id, registro_ans: str):
+    """
+    Gera os dados de cada guia do lote sem carregar o lote inteiro
+    
+    Guias e procedimentos vêm de uma única query (LEFT JOIN com o
+    primeiro procedimento de cada guia), lida em blocos.
+    """
+    procedimento = _primeiro_procedimento_subquery(db, lote_id)
+    
+    guias = db.query(
+        TISSGuia.numero_guia_prestador,
+        TISSGuia.created_at,
+        TISSGuia.numero_carteira,
+        TISSGuia.nome_beneficiario,
+        TISSGuia.codigo_prestador_na_operadora,
+        TISSGuia.nome_contratado,
+        TISSGuia.data_atendimento,
+        TISSGuia.valor_total_informado,
+        procedimento.c.guia_id.label("procedimento_guia_id"),
+        procedimento.c.codigo_procedimento,
+        procedimento.c.descricao_procedimento,
+        procedimento.c.valor_unitario_informado
+    ).outerjoin(
+        procedimento, procedimento.c.guia_id == TISSGuia.id
+    ).filter(
+        TISSGuia.lote_id == lote_id,
+        TISSGuia.deleted_at == None
+    ).order_by(TISSGuia.created_at).yield_per(GUIAS_POR_BLOCO)
+    
+    for guia in guias:
+        tem_procedimento = guia.procedimento_guia_id is not None
+        
+        yield {
+            "numero_guia": guia.numero_guia_prestador,
+            "data_emissao": guia.created_at.strftime("%Y-%m-%d"),
+            "codigo_operadora": registro_ans,
+            "numero_carteira": guia.numero_carteira or "",
+            "nome_beneficiario": guia.nome_beneficiario or "",
+            "codigo_prestador": guia.codigo_prestador_na_operadora or "000000",
+            "nome_prestador": guia.nome_contratado or "Clínica Sanaris",
+            "codigo_procedimento": guia.codigo_procedimento if tem_procedimento else "",
+            "descricao_procedimento": guia.descricao_procedimento if tem_procedimento else "",
+            "data_realizacao": guia.data_atendimento.strftime("%Y-%m-%d") if guia.data_atendimento else "",
+            "valor_procedimento": float(guia.valor_unitario_informado or 0) if tem_procedimento else 0,
+            "valor_total": float(guia.valor_total_informado or 0)
+        }
+
+
+def _cabecalho_lote(lote: TISSLote, operadora: TISSOperadora, quantidade_guias: int) -> dict:
+    """Dados do lote para o gerador, sem as guias (valores simples, sem objetos da sessão)"""
+    return {
+        "numero_lote": lote.numero_lote,
+        "data_criacao": lote.created_at.strftime("%Y-%m-%d"),
+        "operadora_codigo": operadora.registro_ans,
+        "operadora_nome": operadora.razao_social,
+        "prestador_codigo": "000000",
+        "prestador_nome": "Clínica Sanaris",
+        "valor_total_lote": float(lote.valor_total_informado or 0),
+        "quantidade_guias": quantidade_guias
+    }
+
+
+def _montar_lote_data(db: Session, lote: TISSLote, operadora: TISSOperadora, quantidade_guias: int) -> dict:
+    """Monta o dicionário do lote para o gerador; as guias são lidas sob demanda"""
+    lote_data = _cabecalho_lote(lote, operadora, quantidade_guias)
+    lote_data["guias"] = _iterar_guias(db, lote.id, operadora.registro_ans)
+    return lote_data
+
+
+def _stream_xml_lote(lote_id, cabecalho: dict, registro_ans: str, pretty: bool):
+    """
+    Produz o XML do lote em blocos para StreamingResponse
+    
+    Lote e operadora já foram validados pela requisição, antes dos
+    headers 200: aqui só as guias são lidas, em sessão própria (a
+    sessão da requisição é encerrada antes do corpo ser enviado).
+    """
+    db = SessionLocal()
+    try:
+        lote_data = {**cabecalho, "guias": _iterar_guias(db, lote_id, registro_ans)}
+        yield from TISSXMLGenerator().gerar_xml_lote_stream(lote_data, pretty=pretty)
+    finally:
+        db.close()
+
+
+def _carregar_lote_exportacao(db: Session, lote_id: str):
+    """
+    Dados do lote prontos para enviar a outro processo
+    
+    As guias são materializadas em lista: o gerador do banco não
+    atravessa a fronteira do ProcessPoolExecutor.
+    """
+    lote, operadora, quantidade_guias = _carregar_lote(db, lote_id)
+    lote_data = _montar_lote_data(db, lote, operadora, quantidade_guias)
+    lote_data["guias"] = list(lote_data["guias"])
+    
+    filename = TISSXMLGenerator().gerar_nome_arquivo(operadora.registro_ans, lote.numero_lote)
+    return lote_data, filename
+
+
+def _validar_xsd_lote(db: Session, lote_id: str):
+    """Gera o XML do lote em arquivo temporário e valida contra o XSD"""
+    lote, operadora, quantidade_guias = _carregar_lote(db, lote_id)
+    lote_data = _montar_lote_data(db, lote, operadora, quantidade_guias)
+    
+    with tempfile.SpooledTemporaryFile(max_size=XML_VALIDACAO_MEMORIA_MAX) as arquivo:
+        TISSXMLGenerator().salvar_xml_lote(lote_data, arquivo)
+        arquivo.seek(0)
+        return tiss_xsd_validator.validar(arquivo)
+
+
 @router.post("/gerar/{lote_id}", response_model=XMLTISSGenerateResponse)
-async def gerar_xml_lote(
+def gerar_xml_lote(
     lote_id: str,
+    pretty: bool = True,
     db: Session = Depends(get_db)
 ):
     """
     Gera arquivo XML TISS padrão ANS para um lote específico
     """
     try:
-        lote = db.query(TISSLote).filter(TISSLote.id == lote_id).first()
-        if not lote:
-            raise HTTPException(status_code=404, detail="Lote não encontrado")
-        
-        operadora = db.query(TISSOperadora).filter(
-            TISSOperadora.id == lote.operadora_id
-        ).first()
-        if not operadora:
-            raise HTTPException(status_code=404, detail="Operadora não encontrada")
-        
-        guias = db.query(TISSGuia).filter(
-            TISSGuia.lote_id == lote_id,
-            TISSGuia.deleted_at == None
-        ).all()
-        
-        if not guias:
-            raise HTTPException(status_code=400, detail="Lote sem guias válidas")
-        
-        lote_data = {
-            "numero_lote": lote.numero_lote,
-            "data_criacao": lote.created_at.strftime("%Y-%m-%d"),
-            "operadora_codigo": operadora.registro_ans,
-            "operadora_nome": operadora.razao_social,
-            "prestador_codigo": "000000",
-            "prestador_nome": "Clínica Sanaris",
-            "guias": [],
-            "valor_total_lote": float(lote.valor_total_informado or 0),
-            "quantidade_guias": len(guias)
-        }
-        
-        for guia in guias:
-            procedimentos = db.query(TISSProcedimento).filter(
-                TISSProcedimento.guia_id == guia.id
-            ).all()
-            
-            codigo_proc = procedimentos[0].codigo_procedimento if procedimentos else ""
-            descricao_proc = procedimentos[0].descricao_procedimento if procedimentos else ""
-            valor_proc = float(procedimentos[0].valor_unitario_informado or 0) if procedimentos else 0
-            
-            guia_data = {
-                "numero_guia": guia.numero_guia_prestador,
-                "data_emissao": guia.created_at.strftime("%Y-%m-%d"),
-                "codigo_operadora": operadora.registro_ans,
-                "numero_carteira": guia.numero_carteira or "",
-                "nome_beneficiario": guia.nome_beneficiario or "",
-                "codigo_prestador": guia.codigo_prestador_na_operadora or "000000",
-                "nome_prestador": guia.nome_contratado or "Clínica Sanaris",
-                "codigo_procedimento": codigo_proc,
-                "descricao_procedimento": descricao_proc,
-                "data_realizacao": guia.data_atendimento.strftime("%Y-%m-%d") if guia.data_atendimento else "",
-                "valor_procedimento": valor_proc,
-                "valor_total": float(guia.valor_total_informado or 0)
-            }
-            lote_data["guias"].append(guia_data)
+        lote, operadora, quantidade_guias = _carregar_lote(db, lote_id)
+        lote_data = _montar_lote_data(db, lote, operadora, quantidade_guias)
         
         generator = TISSXMLGenerator()
-        xml_content = generator.gerar_xml_lote(lote_data)
+        xml_content = generator.gerar_xml_lote(lote_data, pretty=pretty)
         filename = generator.gerar_nome_arquivo(operadora.registro_ans, lote.numero_lote)
         
         return XMLTISSGenerateResponse(
             success=True,
             filename=filename,
             xml_content=xml_content,
-            message=f"XML gerado com sucesso: {len(guias)} guias"
+            message=f"XML gerado com sucesso: {quantidade_guias} guias"
         )
         
     except HTTPException:
@@ -95,43 +212,147 @@ async def gerar_xml_lote(
 @router.get("/download/{lote_id}")
 async def download_xml_lote(
     lote_id: str,
+    pretty: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Faz download direto do arquivo XML do lote
+    
+    O arquivo é transmitido em blocos conforme é gerado, com memória
+    constante independente da quantidade de guias.
     """
     try:
-        result = await gerar_xml_lote(lote_id, db)
+        lote, operadora, quantidade_guias = _carregar_lote(db, lote_id)
+        filename = TISSXMLGenerator().gerar_nome_arquivo(operadora.registro_ans, lote.numero_lote)
         
-        return Response(
-            content=result.xml_content.encode('utf-8'),
+        return StreamingResponse(
+            _stream_xml_lote(
+                lote.id, _cabecalho_lote(lote, operadora, quantidade_guias), operadora.registro_ans, pretty
+            ),
             media_type="application/xml",
             headers={
-                "Content-Disposition": f"attachment; filename={result.filename}"
+                "Content-Disposition": f"attachment; filename={filename}"
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao fazer download do XML: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao fazer download: {str(e)}")
 
+@router.post("/exportacoes", response_model=XMLTISSExportJobResponse, status_code=202)
+async def exportar_lotes(
+    request: XMLTISSExportRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Exporta em segundo plano o XML de todos os lotes da competência
+    para as operadoras informadas
+    
+    Cada lote é gerado em um processo separado e gravado em disco;
+    acompanhe o andamento em GET /tiss-xml/exportacoes/{job_id}.
+    """
+    lotes = db.query(
+        TISSLote.id,
+        TISSLote.numero_lote,
+        TISSOperadora.razao_social
+    ).join(
+        TISSOperadora, TISSOperadora.id == TISSLote.operadora_id
+    ).filter(
+        TISSLote.competencia == request.competencia,
+        TISSLote.operadora_id.in_(request.operadora_ids),
+        TISSLote.deleted_at == None
+    ).order_by(TISSOperadora.razao_social, TISSLote.numero_lote).all()
+    
+    if not lotes:
+        raise HTTPException(
+            status_code=404,
+            detail="Nenhum lote encontrado para a competência e operadoras informadas"
+        )
+    
+    job = tiss_export_service.criar_job(
+        request.competencia,
+        request.operadora_ids,
+        [
+            {"lote_id": lote.id, "numero_lote": lote.numero_lote, "operadora_nome": lote.razao_social}
+            for lote in lotes
+        ]
+    )
+    tiss_export_service.iniciar(job["job_id"], _carregar_lote_exportacao, pretty=request.pretty)
+    
+    logger.info(f"Exportação TISS {job['job_id']} iniciada: {len(lotes)} lotes")
+    return job
+
+@router.get("/exportacoes/{job_id}", response_model=XMLTISSExportJobResponse)
+async def status_exportacao(job_id: str):
+    """
+    Andamento de um job de exportação de lotes
+    """
+    job = tiss_export_service.obter_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    return job
+
+@router.post("/validar-xsd")
+def validar_xsd_arquivo(
+    file: UploadFile = File(...)
+) -> Dict:
+    """
+    Valida um arquivo XML TISS contra o schema XSD da ANS (4.03)
+    
+    Retorna todos os erros encontrados com o XPath do elemento.
+    Compilação do schema e validação usam CPU e disco: handler síncrono,
+    executado no threadpool sem bloquear o event loop.
+    """
+    try:
+        erros = tiss_xsd_validator.validar(file.file)
+    except TISSSchemaIndisponivel as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        "valido": len(erros) == 0,
+        "total_erros": len(erros),
+        "erros": erros
+    }
+
 @router.get("/validar/{lote_id}")
-async def validar_xml_lote(
+def validar_xml_lote(
     lote_id: str,
+    validar_xsd: bool = False,
     db: Session = Depends(get_db)
 ) -> Dict:
     """
     Valida se o lote está pronto para gerar XML
+    
+    Com validar_xsd=true o XML do lote também é gerado e validado contra
+    o schema da ANS; os erros vêm em erros_xsd com o XPath de cada um.
     """
     try:
         lote = db.query(TISSLote).filter(TISSLote.id == lote_id).first()
         if not lote:
             raise HTTPException(status_code=404, detail="Lote não encontrado")
         
-        guias = db.query(TISSGuia).filter(
+        # Guias com a contagem de procedimentos em uma única query
+        procedimentos_por_guia = db.query(
+            TISSProcedimento.guia_id,
+            func.count(TISSProcedimento.id).label("quantidade")
+        ).join(
+            TISSGuia, TISSGuia.id == TISSProcedimento.guia_id
+        ).filter(
+            TISSGuia.lote_id == lote_id
+        ).group_by(TISSProcedimento.guia_id).subquery()
+        
+        guias = db.query(
+            TISSGuia.numero_guia_prestador,
+            TISSGuia.valor_total_informado,
+            func.coalesce(procedimentos_por_guia.c.quantidade, 0).label("quantidade_procedimentos")
+        ).outerjoin(
+            procedimentos_por_guia, procedimentos_por_guia.c.guia_id == TISSGuia.id
+        ).filter(
             TISSGuia.lote_id == lote_id,
             TISSGuia.deleted_at == None
-        ).all()
+        ).order_by(TISSGuia.created_at).all()
         
         erros = []
         avisos = []
@@ -146,16 +367,12 @@ async def validar_xml_lote(
             if not guia.numero_guia_prestador:
                 erros.append(f"Guia {idx+1}: Número da guia não definido")
             
-            procedimentos = db.query(TISSProcedimento).filter(
-                TISSProcedimento.guia_id == guia.id
-            ).all()
-            
-            if not procedimentos:
+            if not guia.quantidade_procedimentos:
                 avisos.append(f"Guia {idx+1}: Sem procedimentos cadastrados")
             if not guia.valor_total_informado or guia.valor_total_informado == 0:
                 avisos.append(f"Guia {idx+1}: Valor total zerado")
         
-        return {
+        resultado = {
             "valido": len(erros) == 0,
             "erros": erros,
             "avisos": avisos,
@@ -163,6 +380,15 @@ async def validar_xml_lote(
             "pode_gerar": len(erros) == 0
         }
         
+        if validar_xsd and not erros:
+            erros_xsd = _validar_xsd_lote(db, lote_id)
+            resultado["erros_xsd"] = erros_xsd
+            resultado["valido"] = not erros_xsd
+        
+        return resultado
+        
+    except TISSSchemaIndisponivel as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -173,7 +399,7 @@ async def validar_xml_lote(
 async def relatorios_dashboard(
     data_inicio: str = None,
     data_fim: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict:
     """
     Dashboard de relatórios TISS com estatísticas gerais
@@ -181,55 +407,62 @@ async def relatorios_dashboard(
     try:
         from datetime import datetime
         
-        # Query base
-        query = db.query(TISSLote)
-        
         # Filtros de data
+        filtros = []
         if data_inicio:
-            query = query.filter(TISSLote.created_at >= datetime.fromisoformat(data_inicio))
+            filtros.append(TISSLote.created_at >= datetime.fromisoformat(data_inicio))
         if data_fim:
-            query = query.filter(TISSLote.created_at <= datetime.fromisoformat(data_fim))
+            filtros.append(TISSLote.created_at <= datetime.fromisoformat(data_fim))
         
-        lotes = query.all()
+        quantidade_guias = func.coalesce(func.sum(TISSLote.quantidade_guias), 0)
+        valor_informado = func.coalesce(func.sum(TISSLote.valor_total_informado), 0)
         
         # Estatísticas gerais
-        total_lotes = len(lotes)
-        total_guias = sum(lote.quantidade_guias or 0 for lote in lotes)
-        valor_total = sum(float(lote.valor_total_informado or 0) for lote in lotes)
+        resumo = db.query(
+            func.count(TISSLote.id).label("total_lotes"),
+            quantidade_guias.label("total_guias"),
+            valor_informado.label("valor_total")
+        ).filter(*filtros).one()
         
         # Por operadora
-        operadoras_stats = {}
-        for lote in lotes:
-            operadora = db.query(TISSOperadora).filter(
-                TISSOperadora.id == lote.operadora_id
-            ).first()
-            
-            if operadora:
-                op_nome = operadora.razao_social
-                if op_nome not in operadoras_stats:
-                    operadoras_stats[op_nome] = {
-                        "nome": op_nome,
-                        "quantidade_lotes": 0,
-                        "quantidade_guias": 0,
-                        "valor_total": 0
-                    }
-                
-                operadoras_stats[op_nome]["quantidade_lotes"] += 1
-                operadoras_stats[op_nome]["quantidade_guias"] += lote.quantidade_guias or 0
-                operadoras_stats[op_nome]["valor_total"] += float(lote.valor_total_informado or 0)
+        por_operadora = db.query(
+            TISSOperadora.razao_social,
+            func.count(TISSLote.id).label("quantidade_lotes"),
+            quantidade_guias.label("quantidade_guias"),
+            valor_informado.label("valor_total")
+        ).join(
+            TISSOperadora, TISSOperadora.id == TISSLote.operadora_id
+        ).filter(*filtros).group_by(TISSOperadora.razao_social).all()
         
         # Por status
-        status_stats = {}
-        for lote in lotes:
-            status = lote.status
-            if status not in status_stats:
-                status_stats[status] = {
-                    "status": status,
-                    "quantidade": 0,
-                    "valor": 0
-                }
-            status_stats[status]["quantidade"] += 1
-            status_stats[status]["valor"] += float(lote.valor_total_informado or 0)
+        por_status = db.query(
+            TISSLote.status,
+            func.count(TISSLote.id).label("quantidade"),
+            valor_informado.label("valor")
+        ).filter(*filtros).group_by(TISSLote.status).all()
+        
+        total_lotes = resumo.total_lotes
+        total_guias = int(resumo.total_guias)
+        valor_total = float(resumo.valor_total)
+        
+        operadoras_stats = {
+            row.razao_social: {
+                "nome": row.razao_social,
+                "quantidade_lotes": row.quantidade_lotes,
+                "quantidade_guias": int(row.quantidade_guias),
+                "valor_total": float(row.valor_total)
+            }
+            for row in por_operadora
+        }
+        
+        status_stats = {
+            row.status: {
+                "status": row.status,
+                "quantidade": row.quantidade,
+                "valor": float(row.valor)
+            }
+            for row in por_status
+        }
         
         return {
             "resumo": {
@@ -0,0 +1,156 @@
+"""
+Cache do usuário autenticado (get_current_user)
+Tokens já validados e dados do usuário por alguns segundos, sem carregar o
+usuário do banco (só a versão de "users" em reference_data_versions)
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import threading
+import time
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.core.data_versions import incrementar_versoes
+from app.models.user import User
+
+# Colunas que mudam quem pode acessar o quê: alterá-las incrementa a versão
+# de "users" e descarta o cache de todos os usuários em todos os workers.
+# last_login, tokens do Google etc. não invalidam nada.
+COLUNAS_ACESSO = (
+    "email", "hashed_password", "is_active", "is_superuser",
+    "role", "allowed_modules", "organization_id",
+)
+
+
+class AuthCache:
+    """
+    LRU limitado com TTL curto, em duas camadas
+
+    - token (sha256) -> id do usuário, até o menor entre TTL e exp do JWT
+    - id do usuário -> cópia desanexada (detached) do User
+
+    Cada cópia guarda a versão de "users" lida antes de carregar o
+    usuário; quem consulta informa a versão atual e entradas de outra
+    versão são ignoradas. Desativação, troca de role ou de senha feita
+    em qualquer worker vale no próximo request de todos.
+
+    A cópia guardada nunca é usada diretamente: quem lê recebe uma
+    instância própria via Session.merge(load=False), anexada à sessão da
+    requisição sem SELECT, então alterações em current_user continuam
+    sendo gravadas no commit como antes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._usuarios: "OrderedDict[object, Tuple[float, int, User]]" = OrderedDict()
+
+    @staticmethod
+    def _chave_token(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _guardar(self, tabela: OrderedDict, chave, valor) -> None:
+        tabela[chave] = valor
+        tabela.move_to_end(chave)
+        while len(tabela) > settings.AUTH_CACHE_MAX_ENTRIES:
+            tabela.popitem(last=False)
+
+    @property
+    def ativo(self) -> bool:
+        return settings.AUTH_CACHE_TTL_SECONDS > 0
+
+    def obter(self, token: str, versao: int) -> Optional[User]:
+        """Cópia desanexada do usuário do token, se válida e da versão informada"""
+        if not self.ativo:
+            return None
+
+        chave = self._chave_token(token)
+        agora = time.monotonic()
+        with self._lock:
+            item = self._tokens.get(chave)
+            if item is None:
+                return None
+            expira, user_id = item
+            if expira <= agora:
+                del self._tokens[chave]
+                return None
+            self._tokens.move_to_end(chave)
+
+            principal = self._usuarios.get(user_id)
+            if principal is None:
+                return None
+            expira, versao_guardada, usuario = principal
+            if expira <= agora or versao_guardada != versao:
+                del self._usuarios[user_id]
+                return None
+            self._usuarios.move_to_end(user_id)
+            return usuario
+
+    def guardar(self, token: str, payload: dict, user: User, versao: int) -> None:
+        """
+        Guarda o token validado e uma cópia das colunas do usuário
+
+        versao é a de "users" lida antes de carregar o usuário: se ele
+        mudou no meio tempo, a entrada já nasce desatualizada e é
+        recarregada no próximo acesso.
+        """
+        if not self.ativo:
+            return
+
+        agora = time.monotonic()
+        expira = agora + settings.AUTH_CACHE_TTL_SECONDS
+        if payload.get("exp"):
+            # Token não pode sobreviver no cache além da própria expiração
+            expira = min(expira, agora + payload["exp"] - time.time())
+
+        copia = User(**{
+            coluna.key: getattr(user, coluna.key)
+            for coluna in sa_inspect(User).column_attrs
+        })
+        make_transient_to_detached(copia)
+
+        with self._lock:
+            self._guardar(self._tokens, self._chave_token(token), (expira, user.id))
+            self._guardar(self._usuarios, user.id, (expira, versao, copia))
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._usuarios.clear()
+
+
+# Singleton
+auth_cache = AuthCache()
+
+
+def _alterou_acesso(usuario: User) -> bool:
+    estado = sa_inspect(usuario)
+    return any(estado.attrs[coluna].history.has_changes() for coluna in COLUNAS_ACESSO)
+
+
+@event.listens_for(Session, "after_flush")
+def _versionar_usuarios_alterados(session, flush_context):
+    """
+    UPDATE de COLUNAS_ACESSO ou DELETE de User via ORM (users_management,
+    troca de senha, desativação...) incrementa a versão de "users", na
+    mesma transação
+    """
+    alterados = any(
+        isinstance(instancia, User) and _alterou_acesso(instancia)
+        for instancia in session.dirty
+    ) or any(isinstance(instancia, User) for instancia in session.deleted)
+    if alterados:
+        incrementar_versoes(session.connection(), ("users",))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _versionar_usuarios_em_lote(orm_execute_state):
+    """update()/delete() de User via db.execute ou Query.update/delete"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name == "users":
+        incrementar_versoes(orm_execute_state.session.connection(), ("users",))
@@ -0,0 +1,57 @@
+"""
+Contadores de versão por tabela (reference_data_versions)
+Compartilhados entre processos: caches em memória comparam a versão
+guardada com a do banco para saber se ainda valem
+"""
+from datetime import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.reference_data_version import ReferenceDataVersion
+
+
+def incrementar_versoes(conexao, tabelas: Iterable[str]) -> None:
+    """
+    Soma 1 à versão das tabelas, na mesma transação da alteração
+
+    A linha do contador fica bloqueada até o commit: a nova versão só
+    aparece junto com os dados alterados, e um rollback a desfaz.
+    """
+    tabela = ReferenceDataVersion.__table__
+    # Ordem fixa: transações que alteram as mesmas tabelas não travam em ciclo
+    nomes = sorted(set(tabelas))
+    if not nomes:
+        return
+
+    agora = datetime.utcnow()
+    stmt = pg_insert(tabela).values([
+        {"table_name": nome, "version": 1, "updated_at": agora}
+        for nome in nomes
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["table_name"],
+        set_={"version": tabela.c.version + 1, "updated_at": stmt.excluded.updated_at}
+    )
+    conexao.execute(stmt)
+
+
+def marcar_alterada(db: Session, *tabelas: str) -> None:
+    """Para alterações feitas com SQL textual (fora do ORM)"""
+    incrementar_versoes(db.connection(), tabelas)
+
+
+def versoes(db: Session, tabelas: Iterable[str]) -> Dict[str, int]:
+    """Versão atual de cada tabela (0 se nunca alterada)"""
+    tabelas = tuple(tabelas)
+    atuais = dict(db.query(
+        ReferenceDataVersion.table_name, ReferenceDataVersion.version
+    ).filter(
+        ReferenceDataVersion.table_name.in_(tabelas)
+    ).all())
+    return {nome: atuais.get(nome, 0) for nome in tabelas}
+
+
+def versao(db: Session, tabela: str) -> int:
+    return versoes(db, (tabela,))[tabela]
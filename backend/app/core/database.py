@@ -1,11 +1,23 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from uuid import uuid4
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.core.db_pool import MonitoredAsyncQueuePool, MonitoredQueuePool
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
@@ -16,13 +28,166 @@ if "asyncpg" in DATABASE_URL:
 
 print(f"Conectando ao banco: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else DATABASE_URL}")
 
-engine = create_engine(DATABASE_URL, echo=False)
+# Pool configurável pelo Settings (DB_POOL_*); pre_ping e recycle evitam
+# conexões mortas após restart do Postgres ou timeout de firewall/pooler
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+)
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=MonitoredQueuePool,
+    pool_logging_name="principal",
+    **POOL_OPTIONS
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engine assíncrono (asyncpg) para endpoints async def: as consultas
+# não bloqueiam o event loop enquanto aguardam o banco
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+# psycopg2 não usa prepared statements no servidor; o asyncpg usa, e com
+# PgBouncer em modo transaction cada statement pode cair em outra conexão
+ASYNC_CONNECT_ARGS = {}
+if settings.DB_PGBOUNCER:
+    ASYNC_CONNECT_ARGS = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    poolclass=MonitoredAsyncQueuePool,
+    pool_logging_name="principal_async",
+    connect_args=ASYNC_CONNECT_ARGS,
+    **POOL_OPTIONS
+)
+# expire_on_commit=False: atributos continuam acessíveis após o commit
+# (recarregar sob demanda não é permitido em AsyncSession)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Réplica de leitura (opcional) para relatórios e dashboards
+REPLICA_URL = settings.DATABASE_REPLICA_URL
+if REPLICA_URL and "asyncpg" in REPLICA_URL:
+    REPLICA_URL = REPLICA_URL.replace("postgresql+asyncpg://", "postgresql://")
+replica_engine = None
+async_replica_engine = None
+ReplicaSessionLocal = None
+AsyncReplicaSessionLocal = None
+
+if REPLICA_URL:
+    replica_engine = create_engine(
+        REPLICA_URL,
+        echo=False,
+        poolclass=MonitoredQueuePool,
+        pool_logging_name="replica",
+        **POOL_OPTIONS
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    async_replica_engine = create_async_engine(
+        make_url(REPLICA_URL).set(drivername="postgresql+asyncpg"),
+        echo=False,
+        poolclass=MonitoredAsyncQueuePool,
+        pool_logging_name="replica_async",
+        connect_args=ASYNC_CONNECT_ARGS,
+        **POOL_OPTIONS
+    )
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        async_replica_engine,
+        class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+# Atraso de replicação em segundos; 0 se a réplica já aplicou tudo o que
+# recebeu (ou se a URL aponta para um primário)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class _EstadoReplica:
+    """
+    Decide se a réplica pode atender leituras
+
+    O atraso é medido no máximo a cada DB_REPLICA_LAG_CHECK_SECONDS; acima
+    de DB_REPLICA_MAX_LAG_SECONDS (ou com a réplica fora do ar) as
+    leituras voltam para o primário até a próxima medição.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._verificado_em = None
+        self._disponivel = False
+        self.atraso = None
+
+    def disponivel(self) -> bool:
+        if replica_engine is None:
+            return False
+
+        agora = time.monotonic()
+        if self._verificado_em is not None and agora - self._verificado_em < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            return self._disponivel
+
+        with self._lock:
+            if self._verificado_em is not None and agora - self._verificado_em < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+                return self._disponivel
+            try:
+                with replica_engine.connect() as conexao:
+                    self.atraso = float(conexao.execute(REPLICA_LAG_SQL).scalar() or 0)
+                self._disponivel = self.atraso <= settings.DB_REPLICA_MAX_LAG_SECONDS
+                if not self._disponivel:
+                    logger.warning(f"Réplica atrasada {self.atraso:.1f}s: leituras no primário")
+            except Exception as e:
+                self.atraso = None
+                self._disponivel = False
+                logger.warning(f"Réplica indisponível, leituras no primário: {e}")
+            self._verificado_em = time.monotonic()
+            return self._disponivel
+
+
+estado_replica = _EstadoReplica()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    """
+    Sessão somente leitura: réplica quando configurada e em dia, senão primário
+
+    Para relatórios e dashboards; dados gravados na mesma requisição ou
+    instantes antes podem ainda não estar visíveis.
+    """
+    fabrica = ReplicaSessionLocal if estado_replica.disponivel() else SessionLocal
+    db = fabrica()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    """Versão assíncrona de get_read_db"""
+    disponivel = replica_engine is not None and await run_in_threadpool(estado_replica.disponivel)
+    fabrica = AsyncReplicaSessionLocal if disponivel else AsyncSessionLocal
+    async with fabrica() as db:
+        yield db
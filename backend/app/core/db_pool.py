@@ -0,0 +1,90 @@
+"""
+Pool de conexões com métricas de uso
+Conexões em uso, ociosas, overflow e tempo de espera por conexão
+"""
+from typing import Dict
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class _MetricasPool:
+    """Contadores acumulados de um pool (por nome)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            if espera > self.espera_maxima:
+                self.espera_maxima = espera
+
+    def registrar_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+# Chave: pool_logging_name do engine (preservado quando o pool é recriado)
+_metricas: Dict[str, _MetricasPool] = {}
+_pools: Dict[str, QueuePool] = {}
+
+
+def _metricas_do_pool(nome: str) -> _MetricasPool:
+    metricas = _metricas.get(nome)
+    if metricas is None:
+        metricas = _metricas.setdefault(nome, _MetricasPool())
+    return metricas
+
+
+class _MedicaoMixin:
+    """Mede o tempo de cada checkout (fila do pool + abertura de conexão nova)"""
+
+    def connect(self):
+        nome = self._orig_logging_name or "default"
+        # dispose()/recreate() troca a instância; a última é a que vale
+        _pools[nome] = self
+        metricas = _metricas_do_pool(nome)
+
+        inicio = time.perf_counter()
+        try:
+            conexao = super().connect()
+        except exc.TimeoutError:
+            metricas.registrar_timeout()
+            raise
+        metricas.registrar(time.perf_counter() - inicio)
+        return conexao
+
+
+class MonitoredQueuePool(_MedicaoMixin, QueuePool):
+    """QueuePool (engine síncrono) com métricas"""
+
+
+class MonitoredAsyncQueuePool(_MedicaoMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool (engine asyncpg) com métricas"""
+
+
+def pool_metrics() -> Dict[str, dict]:
+    """Situação atual e contadores de cada pool que já entregou conexões"""
+    resultado = {}
+    for nome, pool in list(_pools.items()):
+        metricas = _metricas_do_pool(nome)
+        resultado[nome] = {
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "ociosas": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": metricas.checkouts,
+            "timeouts": metricas.timeouts,
+            "espera_media_ms": round(metricas.espera_total / metricas.checkouts * 1000, 3)
+            if metricas.checkouts else 0.0,
+            "espera_maxima_ms": round(metricas.espera_maxima * 1000, 3),
+        }
+    return resultado
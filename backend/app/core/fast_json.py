@@ -0,0 +1,59 @@
+"""
+Resposta JSON rápida para listagens grandes
+orjson e dicionários montados direto das linhas do banco, sem criar e
+validar um model Pydantic por linha
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+# Z em datetimes UTC, como o Pydantic
+_OPCOES = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(valor):
+    # Mesmo formato do Pydantic v2: Decimal vira string
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError
+
+
+def dumps(conteudo) -> bytes:
+    return orjson.dumps(conteudo, default=_default, option=_OPCOES)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson (UUID, datetime, date e Enum nativos)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def colunas(modelo, schema) -> list:
+    """Colunas do model com os mesmos nomes dos campos do schema de resposta"""
+    return [getattr(modelo, campo) for campo in schema.model_fields]
+
+
+def linhas_para_dicts(linhas: Iterable) -> List[dict]:
+    """Linhas de db.query(colunas...) como dicionários"""
+    return [linha._asdict() for linha in linhas]
+
+
+def resposta_lista(itens: List[dict], headers: Optional[Dict[str, str]] = None):
+    """
+    Lista pronta para o cliente
+
+    Com FAST_JSON_RESPONSES vai direto para o orjson (o response_model do
+    endpoint fica só na documentação); desligado, o FastAPI valida cada
+    item pelo response_model como antes. Os dicionários precisam ter os
+    campos e tipos finais do schema. headers vale só para o
+    FastJSONResponse (no caminho validado o endpoint usa o Response
+    injetado).
+    """
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(itens, headers=headers)
+    return itens
@@ -0,0 +1,134 @@
+"""
+Métricas no formato texto do Prometheus (GET /metrics)
+Latência por rota, requisições em andamento, pool do banco, WebSockets,
+scheduler de lembretes e envios de notificações
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+# Buckets em segundos: de respostas em cache até relatórios/exportações pesadas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "sanaris_http_request_duration_seconds",
+    "Duração das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "sanaris_http_requests_in_flight",
+    "Requisições HTTP em andamento",
+)
+
+REMINDER_RUN_DURATION = Histogram(
+    "sanaris_reminder_run_duration_seconds",
+    "Duração de cada execução do scheduler de lembretes",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0),
+)
+REMINDER_LAST_RUN = Gauge(
+    "sanaris_reminder_last_run_timestamp_seconds",
+    "Horário (epoch) do fim da última execução do scheduler de lembretes",
+)
+REMINDER_BACKLOG = Gauge(
+    "sanaris_reminder_backlog",
+    "Consultas na janela de lembrete que continuam sem lembrete enviado ao fim da execução",
+    ["tipo"],
+)
+
+NOTIFICATIONS_SENT = Counter(
+    "sanaris_notifications_sent_total",
+    "Notificações enviadas por canal e resultado",
+    ["channel", "result"],
+)
+NOTIFICATION_SEND_DURATION = Histogram(
+    "sanaris_notification_send_duration_seconds",
+    "Duração do envio de notificações por canal",
+    ["channel"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class _SubsistemasCollector:
+    """Lê pool do banco e WebSockets no momento da coleta"""
+
+    def collect(self):
+        from app.core.db_pool import pool_metrics
+        from app.core.websocket_manager import manager
+
+        em_uso = GaugeMetricFamily("sanaris_db_pool_checked_out", "Conexões em uso", labels=["pool"])
+        ociosas = GaugeMetricFamily("sanaris_db_pool_idle", "Conexões ociosas no pool", labels=["pool"])
+        overflow = GaugeMetricFamily("sanaris_db_pool_overflow", "Conexões acima de pool_size", labels=["pool"])
+        tamanho = GaugeMetricFamily("sanaris_db_pool_size", "pool_size configurado", labels=["pool"])
+        checkouts = CounterMetricFamily("sanaris_db_pool_checkouts", "Conexões entregues pelo pool", labels=["pool"])
+        timeouts = CounterMetricFamily("sanaris_db_pool_timeouts", "Esperas por conexão que estouraram pool_timeout", labels=["pool"])
+        espera = GaugeMetricFamily("sanaris_db_pool_wait_max_seconds", "Maior espera por conexão", labels=["pool"])
+
+        for nome, pool in pool_metrics().items():
+            em_uso.add_metric([nome], pool["em_uso"])
+            ociosas.add_metric([nome], pool["ociosas"])
+            overflow.add_metric([nome], pool["overflow"])
+            tamanho.add_metric([nome], pool["tamanho"])
+            checkouts.add_metric([nome], pool["checkouts"])
+            timeouts.add_metric([nome], pool["timeouts"])
+            espera.add_metric([nome], pool["espera_maxima_ms"] / 1000)
+
+        yield from (em_uso, ociosas, overflow, tamanho, checkouts, timeouts, espera)
+
+        conexoes = list(manager.active_connections.values())
+        yield GaugeMetricFamily(
+            "sanaris_websocket_connections", "WebSockets abertos do chat",
+            value=sum(len(sockets) for sockets in conexoes)
+        )
+        yield GaugeMetricFamily(
+            "sanaris_websocket_users", "Usuários com ao menos um WebSocket aberto",
+            value=len(conexoes)
+        )
+        yield GaugeMetricFamily(
+            "sanaris_websocket_channels", "Canais com inscritos",
+            value=sum(1 for inscritos in list(manager.channel_subscribers.values()) if inscritos)
+        )
+
+
+REGISTRY.register(_SubsistemasCollector())
+
+
+def metrics_payload() -> bytes:
+    """Texto no formato de exposição do Prometheus"""
+    return generate_latest(REGISTRY)
+
+
+def _rota(scope) -> str:
+    # Caminho da rota ({lote_id}), não a URL: mantém a cardinalidade limitada
+    return getattr(scope.get("route"), "path", None) or "<sem rota>"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latência por rota e requisições em andamento"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def send_com_status(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.labels(scope.get("method", ""), _rota(scope), str(status)).observe(
+                time.perf_counter() - inicio
+            )
@@ -0,0 +1,203 @@
+"""
+Profiling de requisições
+Quantidade de statements SQL e tempo de banco por requisição, header
+Server-Timing, log de requisições lentas e agregados por rota
+"""
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statements guardados por requisição para o log (os mais lentos)
+MAX_STATEMENTS_LOG = 5
+
+
+class _PerfilRequisicao:
+    __slots__ = ("statements", "tempo_db", "por_sql", "mais_lentos")
+
+    def __init__(self):
+        self.statements = 0
+        self.tempo_db = 0.0
+        self.por_sql: Counter = Counter()
+        self.mais_lentos: List[tuple] = []
+
+    def registrar(self, sql: str, duracao: float) -> None:
+        self.statements += 1
+        self.tempo_db += duracao
+        self.por_sql[sql] += 1
+        if len(self.mais_lentos) < MAX_STATEMENTS_LOG:
+            self.mais_lentos.append((duracao, sql))
+            self.mais_lentos.sort(reverse=True)
+        elif duracao > self.mais_lentos[-1][0]:
+            self.mais_lentos[-1] = (duracao, sql)
+            self.mais_lentos.sort(reverse=True)
+
+
+# Compartilhado por referência com o threadpool dos endpoints def
+# (run_in_threadpool copia o contexto)
+_perfil_atual: ContextVar[Optional[_PerfilRequisicao]] = ContextVar("perfil_requisicao", default=None)
+
+
+def _antes_do_cursor(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_atual.get() is not None:
+        conn.info.setdefault("perfil_inicio", []).append(time.perf_counter())
+
+
+def _depois_do_cursor(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_atual.get()
+    if perfil is None:
+        return
+    inicios = conn.info.get("perfil_inicio")
+    if inicios:
+        perfil.registrar(statement, time.perf_counter() - inicios.pop())
+
+
+class _AgregadoRota:
+    __slots__ = ("requisicoes", "tempo_total", "tempo_maximo", "statements_total", "statements_maximo", "tempo_db_total")
+
+    def __init__(self):
+        self.requisicoes = 0
+        self.tempo_total = 0.0
+        self.tempo_maximo = 0.0
+        self.statements_total = 0
+        self.statements_maximo = 0
+        self.tempo_db_total = 0.0
+
+
+class RequestProfiler:
+    """
+    Liga/desliga o profiling em tempo de execução
+
+    Desligado, os listeners do SQLAlchemy são removidos e o middleware
+    apenas repassa a requisição (um teste de booleano).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rotas: Dict[str, _AgregadoRota] = {}
+        self.ativo = False
+
+    def ativar(self) -> None:
+        with self._lock:
+            if not self.ativo:
+                event.listen(Engine, "before_cursor_execute", _antes_do_cursor)
+                event.listen(Engine, "after_cursor_execute", _depois_do_cursor)
+                self.ativo = True
+
+    def desativar(self) -> None:
+        with self._lock:
+            if self.ativo:
+                self.ativo = False
+                event.remove(Engine, "before_cursor_execute", _antes_do_cursor)
+                event.remove(Engine, "after_cursor_execute", _depois_do_cursor)
+
+    def registrar(self, rota: str, duracao: float, perfil: _PerfilRequisicao) -> None:
+        with self._lock:
+            agregado = self._rotas.get(rota)
+            if agregado is None:
+                agregado = self._rotas[rota] = _AgregadoRota()
+            agregado.requisicoes += 1
+            agregado.tempo_total += duracao
+            agregado.tempo_maximo = max(agregado.tempo_maximo, duracao)
+            agregado.statements_total += perfil.statements
+            agregado.statements_maximo = max(agregado.statements_maximo, perfil.statements)
+            agregado.tempo_db_total += perfil.tempo_db
+
+    def agregados(self) -> List[dict]:
+        """Rotas ordenadas pela média de statements por requisição"""
+        with self._lock:
+            itens = list(self._rotas.items())
+        resultado = [
+            {
+                "rota": rota,
+                "requisicoes": a.requisicoes,
+                "tempo_medio_ms": round(a.tempo_total / a.requisicoes * 1000, 2),
+                "tempo_maximo_ms": round(a.tempo_maximo * 1000, 2),
+                "statements_medio": round(a.statements_total / a.requisicoes, 2),
+                "statements_maximo": a.statements_maximo,
+                "tempo_db_medio_ms": round(a.tempo_db_total / a.requisicoes * 1000, 2),
+            }
+            for rota, a in itens
+        ]
+        resultado.sort(key=lambda item: item["statements_medio"], reverse=True)
+        return resultado
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._rotas.clear()
+
+
+# Singleton
+request_profiler = RequestProfiler()
+
+
+def _nome_rota(scope) -> str:
+    # Caminho da rota com parâmetros ({lote_id}), não a URL: agrega por endpoint
+    caminho = getattr(scope.get("route"), "path", None) or "<sem rota>"
+    return f"{scope.get('method', '')} {caminho}"
+
+
+def _logar_se_lenta(rota: str, status: Optional[int], duracao: float, perfil: _PerfilRequisicao) -> None:
+    lenta = duracao * 1000 >= settings.PROFILING_SLOW_REQUEST_MS
+    muitas = perfil.statements >= settings.PROFILING_MAX_STATEMENTS
+    if not (lenta or muitas):
+        return
+
+    sql_repetido, repeticoes = perfil.por_sql.most_common(1)[0] if perfil.por_sql else ("", 0)
+    linhas = [
+        f"Requisição {'lenta' if lenta else 'com muitos statements'}: {rota} -> {status} "
+        f"em {duracao * 1000:.1f}ms, {perfil.statements} statements, {perfil.tempo_db * 1000:.1f}ms no banco"
+    ]
+    if repeticoes > 1:
+        linhas.append(f"  repetido {repeticoes}x: {' '.join(sql_repetido.split())[:500]}")
+    for tempo, sql in perfil.mais_lentos:
+        if tempo * 1000 >= settings.PROFILING_SLOW_STATEMENT_MS:
+            linhas.append(f"  {tempo * 1000:.1f}ms: {' '.join(sql.split())[:500]}")
+    logger.warning("\n".join(linhas))
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI; só mede quando request_profiler.ativo"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not request_profiler.ativo:
+            await self.app(scope, receive, send)
+            return
+
+        perfil = _PerfilRequisicao()
+        token = _perfil_atual.set(perfil)
+        inicio = time.perf_counter()
+        status = None
+
+        async def send_com_timing(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                total = (time.perf_counter() - inicio) * 1000
+                valor = (
+                    f"db;dur={perfil.tempo_db * 1000:.1f};desc=\"{perfil.statements} statements\", "
+                    f"app;dur={total:.1f}"
+                )
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"server-timing", valor.encode())]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            _perfil_atual.reset(token)
+            duracao = time.perf_counter() - inicio
+            rota = _nome_rota(scope)
+            request_profiler.registrar(rota, duracao, perfil)
+            _logar_se_lenta(rota, status, duracao, perfil)
@@ -0,0 +1,145 @@
+"""
+GET condicional para dados de referência
+Versão por tabela (reference_data_versions), ETag, Cache-Control e 304
+sem consultar as linhas
+"""
+from itertools import chain
+from typing import Dict, Iterable, Optional
+import hashlib
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.data_versions import incrementar_versoes, versoes
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.models.user import User
+
+# Tabelas cujas listagens respondem com ETag
+TABELAS_REFERENCIA = frozenset({
+    "tiss_tabelas_referencia",
+    "tiss_operadoras",
+    "medications",
+    "job_titles",
+    "permissions",
+    "medical_record_templates",
+    "photo_evolutions",
+})
+
+
+@event.listens_for(Session, "after_flush")
+def _versionar_alteracoes_orm(session, flush_context):
+    """INSERT/UPDATE/DELETE de instâncias das tabelas de referência"""
+    tabelas = {
+        instancia.__tablename__
+        for instancia in chain(session.new, session.dirty, session.deleted)
+        if getattr(instancia, "__tablename__", None) in TABELAS_REFERENCIA
+    }
+    if tabelas:
+        incrementar_versoes(session.connection(), tabelas)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _versionar_escritas_em_lote(orm_execute_state):
+    """insert()/update()/delete() do ORM via db.execute (importação TUSS em lote)"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name in TABELAS_REFERENCIA:
+        incrementar_versoes(orm_execute_state.session.connection(), (mapper.local_table.name,))
+
+
+class CabecalhosReferencia(dict):
+    """
+    ETag e Cache-Control da resposta, com as versões usadas no ETag
+
+    Os índices em memória recebem essas versões (versoes[tabela]) em vez
+    de consultá-las de novo: o conteúdo fica consistente com o ETag.
+    """
+
+    def __init__(self, headers: Dict[str, str], versoes: Dict[str, int]):
+        super().__init__(headers)
+        self.versoes = versoes
+
+
+def _etag(request: Request, atuais: Dict[str, int], escopo) -> str:
+    # Mesma URL (com query string), mesmo escopo e mesmas versões = mesmo conteúdo
+    chave = "|".join([
+        request.url.path,
+        str(sorted(request.query_params.multi_items())),
+        str(escopo),
+        *[f"{nome}={numero}" for nome, numero in sorted(atuais.items())],
+    ])
+    return f'W/"{hashlib.sha1(chave.encode()).hexdigest()[:24]}"'
+
+
+def _corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca (RFC 9110): ignora o prefixo W/"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaco = etag.removeprefix("W/")
+    return any(
+        candidato.strip().removeprefix("W/") == opaco
+        for candidato in if_none_match.split(",")
+    )
+
+
+def _cache_control(publico: bool) -> str:
+    visibilidade = "public" if publico else "private"
+    if settings.REFERENCE_CACHE_MAX_AGE > 0:
+        return f"{visibilidade}, max-age={settings.REFERENCE_CACHE_MAX_AGE}"
+    # Sempre revalida; sem mudança o custo é um 304 sem corpo
+    return f"{visibilidade}, no-cache"
+
+
+def _condicional(request: Request, response: Response, db: Session, tabelas, escopo, publico: bool) -> CabecalhosReferencia:
+    atuais = versoes(db, tabelas)
+    etag = _etag(request, atuais, escopo)
+    headers = {"ETag": etag, "Cache-Control": _cache_control(publico)}
+
+    if _corresponde(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return CabecalhosReferencia(headers, atuais)
+
+
+def referencia_versionada(*tabelas: str, por_organizacao: bool = False, publico: bool = False):
+    """
+    Dependência de GET condicional para listagens de referência
+
+    Calcula o ETag pelas versões das tabelas, sem ler as linhas, e
+    responde 304 quando bate com If-None-Match. Caso contrário grava
+    ETag e Cache-Control na resposta e devolve esses headers (para
+    endpoints que retornam um Response próprio, como resposta_lista)
+    em um CabecalhosReferencia, que também traz as versões lidas.
+
+    Declarar depois de get_current_user no endpoint, para a autenticação
+    ser checada antes do 304. por_organizacao inclui a organização do
+    usuário no ETag; publico permite cache compartilhado (proxies).
+    """
+    desconhecidas = set(tabelas) - TABELAS_REFERENCIA
+    if desconhecidas:
+        raise ValueError(f"Tabelas sem versionamento: {', '.join(sorted(desconhecidas))}")
+
+    if por_organizacao:
+        def dependencia(
+            request: Request,
+            response: Response,
+            db: Session = Depends(get_db),
+            current_user: User = Depends(get_current_user)
+        ) -> CabecalhosReferencia:
+            return _condicional(request, response, db, tabelas, current_user.organization_id, publico)
+    else:
+        def dependencia(
+            request: Request,
+            response: Response,
+            db: Session = Depends(get_db)
+        ) -> CabecalhosReferencia:
+            return _condicional(request, response, db, tabelas, None, publico)
+
+    return dependencia
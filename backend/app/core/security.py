@@ -1,24 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import bcrypt
 
+from app.core.auth_cache import auth_cache
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.data_versions import versao
+from app.core.database import get_async_db, get_db
 from app.models.user import User
+from app.services.permission_service import permission_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar senha usando bcrypt"""
+# bcrypt é CPU-bound (centenas de ms por hash) e libera o GIL: roda em um
+# pool próprio e limitado, fora do event loop e sem ocupar todos os núcleos
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+
+def _checkpw(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
+def _hashpw(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode()
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verificar senha usando bcrypt (bloqueia: usar em endpoints def)"""
+    return _bcrypt_executor.submit(_checkpw, plain_password, hashed_password).result()
+
 def get_password_hash(password: str) -> str:
-    """Gerar hash da senha usando bcrypt"""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    """Gerar hash da senha usando bcrypt (bloqueia: usar em endpoints def)"""
+    return _bcrypt_executor.submit(_hashpw, password).result()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verificar senha sem bloquear o event loop (endpoints async def)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, _checkpw, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Gerar hash sem bloquear o event loop (endpoints async def)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, _hashpw, password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Hash gerado com custo diferente de BCRYPT_ROUNDS (formato $2b$12$...)"""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Criar token JWT"""
@@ -32,16 +69,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obter usuário atual do token"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _payload_do_token(token: str) -> dict:
+    """Valida o JWT e retorna o payload (com sub = email)"""
+    credentials_exception = _credentials_exception()
     
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -51,10 +88,46 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    return payload
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """Obter usuário atual do token"""
+    # Token já validado há pouco e usuário sem alteração de acesso em
+    # nenhum worker (versão de "users"): anexado à sessão sem carregar
+    versao_usuarios = versao(db, "users") if auth_cache.ativo else 0
+    cached = auth_cache.obter(token, versao_usuarios)
+    if cached is not None:
+        return db.merge(cached, load=False)
+    
+    payload = _payload_do_token(token)
+    
+    user = db.query(User).filter(User.email == payload["sub"]).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    
+    auth_cache.guardar(token, payload, user, versao_usuarios)
+    return user
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Obter usuário atual do token (sessão assíncrona, para endpoints com get_async_db)"""
+    versao_usuarios = await db.run_sync(versao, "users") if auth_cache.ativo else 0
+    cached = auth_cache.obter(token, versao_usuarios)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+    
+    payload = _payload_do_token(token)
     
+    user = await db.scalar(select(User).where(User.email == payload["sub"]))
+    if user is None:
+        raise _credentials_exception()
+    
+    auth_cache.guardar(token, payload, user, versao_usuarios)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -62,3 +135,33 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+def require_permission(*nomes: str):
+    """
+    Dependência que exige todas as permissões informadas
+
+    Uso: Depends(require_permission("manage_users")). A checagem é feita
+    no bitset em memória do usuário (permission_service), sem consulta
+    ao banco enquanto ele estiver no cache.
+    """
+    def verificar(
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_db)
+    ) -> User:
+        if not permission_service.tem_permissoes(db, current_user, nomes):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sem permissão")
+        return current_user
+
+    return verificar
+
+def require_module(*modulos: str):
+    """Dependência que exige acesso aos módulos informados (allowed_modules)"""
+    def verificar(
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_db)
+    ) -> User:
+        if not permission_service.tem_modulos(db, current_user, modulos):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sem acesso ao módulo")
+        return current_user
+
+    return verificar
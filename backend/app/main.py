@@ -1,11 +1,17 @@
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, Base, SessionLocal
+from app.core.db_pool import pool_metrics
+from app.core.profiling import ProfilingMiddleware, request_profiler
+from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, metrics_payload
 
 from app.services.reminder_scheduler import reminder_scheduler
+from app.services.tiss_export_service import tiss_export_service
+from app.services.tuss_index_service import tuss_index_service
+from app.services.medication_search_service import medication_search_service
 
 from app.api.endpoints import (
     schedule,
@@ -28,7 +34,8 @@ from app.api.endpoints import (
     dashboard_stats,
     appointments,
     medical_records,
-    prescriptions
+    prescriptions,
+    profiling
 )
 
 # Importar routers TISS
@@ -39,6 +46,7 @@ from app.api import (
     tiss_procedimentos,
     tiss_tabelas,
     tiss_xml,
+    tiss_faturamento,
     prestadores
 )
 
@@ -62,6 +70,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiling de requisições (statements SQL, tempo de banco, Server-Timing)
+app.add_middleware(ProfilingMiddleware)
+if settings.PROFILING_ENABLED:
+    request_profiler.ativar()
+
+# Métricas Prometheus (latência por rota, requisições em andamento)
+app.add_middleware(MetricsMiddleware)
+
 
 # Eventos de inicialização e desligamento
 @app.on_event("startup")
@@ -69,12 +85,30 @@ async def startup_event():
     """Iniciar scheduler de lembretes ao subir o backend"""
     reminder_scheduler.start()
     logger.info("🚀 Scheduler de lembretes iniciado!")
+    
+    db = SessionLocal()
+    try:
+        tuss_index_service.carregar(db)
+    except Exception as e:
+        # Sem índice pré-carregado cada organização é indexada na primeira busca
+        logger.error(f"Erro ao carregar índice TUSS: {e}")
+        db.rollback()
+    
+    try:
+        medication_search_service.carregar(db)
+    except Exception as e:
+        # Sem índice pré-carregado ele é montado na primeira busca
+        logger.error(f"Erro ao carregar índice de medicamentos: {e}")
+    finally:
+        db.close()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Parar scheduler ao desligar o backend"""
     reminder_scheduler.stop()
     logger.info("⏹️ Scheduler de lembretes parado!")
+    tiss_export_service.desligar()
+    await async_engine.dispose()
 
 
 # Routers de Autenticação e Organizações
@@ -99,6 +133,7 @@ app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["
 app.include_router(dashboard_stats.router, prefix="/api/v1/statistics", tags=["Dashboard Statistics"])
 app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["Dashboard"])
 app.include_router(admin_stats.router, prefix="/api/v1/admin", tags=["Admin Statistics"])
+app.include_router(profiling.router, prefix="/api/v1/profiling", tags=["Profiling"])
 
 # Routers Financeiros
 app.include_router(financial.router, prefix="/api/v1/financial", tags=["Financial"])
@@ -122,6 +157,7 @@ app.include_router(tiss_procedimentos.router, prefix="/api/v1", tags=["TISS"])
 app.include_router(prestadores.router, prefix="/api/v1/prestadores", tags=["Prestadores"])
 app.include_router(tiss_tabelas.router, prefix="/api/v1", tags=["TISS"])
 app.include_router(tiss_xml.router, prefix="/api/v1", tags=["TISS"])
+app.include_router(tiss_faturamento.router, prefix="/api/v1", tags=["TISS"])
 
 
 # Health checks
@@ -131,4 +167,25 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/health/db-pool")
+def db_pool_metrics():
+    """Conexões em uso/ociosas e tempo de espera de cada pool do banco"""
+    return {
+        "configuracao": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pre_ping": settings.DB_POOL_PRE_PING,
+            "recycle": settings.DB_POOL_RECYCLE,
+            "pgbouncer": settings.DB_PGBOUNCER,
+        },
+        "pools": pool_metrics(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Métricas no formato texto do Prometheus (por processo)"""
+    return Response(metrics_payload(), headers={"Content-Type": CONTENT_TYPE_LATEST})
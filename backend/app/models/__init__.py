@@ -2,7 +2,7 @@ from app.models.appointment import Appointment, AppointmentWaitlist, Professiona
 from app.models.cfm_integration import CFMCredentials, CFMPrescriptionLog
 from app.models.digital_signature import DigitalCertificate, OTPConfiguration, SignatureLog
 from app.models.document import DocumentTemplate, PatientDocument, QuickPatientRegistration
-from app.models.financial import AccountReceivable, PaymentInstallment, PaymentTransaction, Supplier, ExpenseCategory, CostCenter, AccountPayable, PayableTransaction, ProfessionalFeeConfiguration, ProfessionalFee, ProfessionalFeeItem
+from app.models.financial import AccountReceivable, PaymentInstallment, PaymentTransaction, Supplier, ExpenseCategory, CostCenter, AccountPayable, PayableTransaction, ProfessionalFeeConfiguration, ProfessionalFee, ProfessionalFeeItem, ProfessionalFeeMonthlySummary
 from app.models.medical_record import MedicalRecord, VitalSigns, MedicalRecordAttachment
 from app.models.medical_record_template import MedicalRecordTemplate, ExamResult, PhotoEvolution
 from app.models.medication import Medication
@@ -10,7 +10,8 @@ from app.models.notification import Notification
 from app.models.organization import Organization
 from app.models.patient import Patient
 from app.models.prescription import Prescription, PrescriptionItem, PrescriptionTemplate
-from app.models.tiss import TISSOperadora, TISSLote, TISSGuia, TISSProcedimento, TISSTabelaReferencia
+from app.models.reference_data_version import ReferenceDataVersion
+from app.models.tiss import TISSOperadora, TISSLote, TISSGuia, TISSProcedimento, TISSTabelaReferencia, TISSFaturamentoResumo, TISSNumeracao
 from app.models.user import User
 
 __all__ = [
@@ -36,6 +37,7 @@ __all__ = [
     "ProfessionalFeeConfiguration",
     "ProfessionalFee",
     "ProfessionalFeeItem",
+    "ProfessionalFeeMonthlySummary",
     "MedicalRecord",
     "VitalSigns",
     "MedicalRecordAttachment",
@@ -49,10 +51,13 @@ __all__ = [
     "Prescription",
     "PrescriptionItem",
     "PrescriptionTemplate",
+    "ReferenceDataVersion",
     "TISSOperadora",
     "TISSLote",
     "TISSGuia",
     "TISSProcedimento",
     "TISSTabelaReferencia",
+    "TISSFaturamentoResumo",
+    "TISSNumeracao",
     "User",
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ Sistema de Gestão Financeira
 Contas a Receber
 """
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Numeric, Integer, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Numeric, Integer, Enum as SQLEnum, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -103,6 +103,11 @@ class AccountReceivable(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Conciliação bancária: contas à vista em aberto por vencimento e valor
+        Index("ix_accounts_receivable_reconciliation", "status", "due_date", "remaining_amount", "patient_id"),
+    )
+    
     def __repr__(self):
         return f"<AccountReceivable {self.invoice_number}>"
 
@@ -137,6 +142,11 @@ class PaymentInstallment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Conciliação bancária: parcelas em aberto por vencimento e valor
+        Index("ix_payment_installments_reconciliation", "status", "due_date", "total_amount"),
+    )
+    
     def __repr__(self):
         return f"<PaymentInstallment {self.installment_number}>"
 
@@ -168,7 +178,7 @@ class PaymentTransaction(Base):
     
     # Aprovação
     authorization_code = Column(String(100))
-    nsu = Column(String(100))  # Número sequencial único
+    nsu = Column(String(100), index=True)  # Número sequencial único (FITID no extrato importado)
     
     # Status
     is_confirmed = Column(Boolean, default=False)
@@ -548,3 +558,39 @@ class ProfessionalFeeItem(Base):
     
     def __repr__(self):
         return f"<ProfessionalFeeItem {self.id}>"
+
+
+class ProfessionalFeeMonthlySummary(Base):
+    """Consolidado de repasses por profissional e mês (mantido na geração, pagamento e exclusão)"""
+    __tablename__ = "professional_fee_monthly_summaries"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    
+    # Chave
+    healthcare_professional_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    reference_year = Column(Integer, nullable=False)
+    reference_month = Column(Integer, nullable=False)
+    
+    # Totais
+    total_fees = Column(Integer, default=0)
+    total_appointments = Column(Integer, default=0)
+    total_revenue = Column(Numeric(12, 2), default=0)
+    total_gross = Column(Numeric(12, 2), default=0)
+    total_net = Column(Numeric(12, 2), default=0)
+    total_deductions = Column(Numeric(12, 2), default=0)
+    pending_amount = Column(Numeric(12, 2), default=0)
+    paid_amount = Column(Numeric(12, 2), default=0)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint(
+            "healthcare_professional_id", "reference_year", "reference_month",
+            name="uq_professional_fee_monthly_summary"
+        ),
+        Index("ix_professional_fee_monthly_summaries_period", "reference_year", "reference_month"),
+    )
+    
+    def __repr__(self):
+        return f"<ProfessionalFeeMonthlySummary {self.healthcare_professional_id} {self.reference_month}/{self.reference_year}>"
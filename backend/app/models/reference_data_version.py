@@ -0,0 +1,16 @@
+"""
+Versão dos Dados de Referência
+Contador por tabela, incrementado a cada alteração (ETag das listagens)
+"""
+from sqlalchemy import BigInteger, Column, DateTime, String
+from app.core.database import Base
+from datetime import datetime
+
+
+class ReferenceDataVersion(Base):
+    """Versão atual de uma tabela de referência (TUSS, medicamentos, cargos...)"""
+    __tablename__ = "reference_data_versions"
+    
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Text, Boolean, JSON, Date
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Text, Boolean, JSON, Date, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -60,6 +60,9 @@ class TISSOperadora(Base):
 class TISSLote(Base):
     """Lotes de Faturamento TISS"""
     __tablename__ = "tiss_lotes"
+    __table_args__ = (
+        Index('ix_tiss_lotes_competencia', 'organization_id', 'operadora_id', 'competencia'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
@@ -120,8 +123,9 @@ class TISSGuia(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
-    lote_id = Column(UUID(as_uuid=True), ForeignKey("tiss_lotes.id"), nullable=False)
+    lote_id = Column(UUID(as_uuid=True), ForeignKey("tiss_lotes.id"), nullable=False, index=True)
     patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.id"), nullable=False)
+    appointment_id = Column(UUID(as_uuid=True), ForeignKey("appointments.id"), nullable=True)
     
     # Tipo de Guia
     tipo_guia = Column(String(50), nullable=False)
@@ -181,6 +185,16 @@ class TISSGuia(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     deleted_at = Column(DateTime, nullable=True)
     
+    __table_args__ = (
+        # Um agendamento em no máximo uma guia ativa (não faturar duas vezes)
+        Index(
+            'uq_tiss_guias_appointment_id',
+            'appointment_id',
+            unique=True,
+            postgresql_where=text('appointment_id IS NOT NULL AND deleted_at IS NULL')
+        ),
+    )
+    
     # Relacionamentos
     organization = relationship("Organization", back_populates="tiss_guias")
     lote = relationship("TISSLote", back_populates="guias")
@@ -194,7 +208,7 @@ class TISSProcedimento(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
-    guia_id = Column(UUID(as_uuid=True), ForeignKey("tiss_guias.id"), nullable=False)
+    guia_id = Column(UUID(as_uuid=True), ForeignKey("tiss_guias.id"), nullable=False, index=True)
     
     # Dados do Procedimento
     data_realizacao = Column(Date, nullable=False)
@@ -250,6 +264,15 @@ class TISSProcedimento(Base):
 class TISSTabelaReferencia(Base):
     """Tabelas de Referência TISS"""
     __tablename__ = "tiss_tabelas_referencia"
+    __table_args__ = (
+        # Um código ativo por tabela/organização (alvo do ON CONFLICT na importação)
+        Index(
+            'uq_tiss_tabelas_referencia_codigo',
+            'organization_id', 'tipo_tabela', 'codigo',
+            unique=True,
+            postgresql_where=text('deleted_at IS NULL')
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
@@ -288,3 +311,65 @@ class TISSTabelaReferencia(Base):
     
     # Relacionamentos
     organization = relationship("Organization", back_populates="tiss_tabelas_referencia")
+
+
+class TISSFaturamentoResumo(Base):
+    """
+    Consolidado de faturamento por operadora, competência, procedimento e profissional
+    
+    Mantido incrementalmente a cada fechamento/atualização de lote
+    (lotes em rascunho não entram).
+    """
+    __tablename__ = "tiss_faturamento_resumo"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    
+    # Chave
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    operadora_id = Column(UUID(as_uuid=True), ForeignKey("tiss_operadoras.id"), nullable=False)
+    competencia = Column(String(7), nullable=False)
+    ano = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    codigo_procedimento = Column(String(20), nullable=False)
+    profissional = Column(String(200), nullable=False, default="")
+    
+    descricao_procedimento = Column(String(500))
+    
+    # Totais
+    quantidade_procedimentos = Column(Integer, default=0)
+    quantidade_glosados = Column(Integer, default=0)
+    valor_informado = Column(Float, default=0.0)
+    valor_glosa = Column(Float, default=0.0)
+    valor_aceito = Column(Float, default=0.0)
+    
+    # Prazo de pagamento (soma em dias entre envio e pagamento do lote)
+    quantidade_pagos = Column(Integer, default=0)
+    dias_ate_pagamento = Column(Integer, default=0)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint(
+            'organization_id', 'operadora_id', 'competencia', 'codigo_procedimento', 'profissional',
+            name='uq_tiss_faturamento_resumo'
+        ),
+        Index('ix_tiss_faturamento_resumo_periodo', 'organization_id', 'ano', 'mes'),
+    )
+
+
+class TISSNumeracao(Base):
+    """Contador sequencial por organização (números de lote e de guia)"""
+    __tablename__ = "tiss_numeracao"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    
+    # lote (escopo = competência) ou guia (escopo = ano)
+    tipo = Column(String(20), nullable=False)
+    escopo = Column(String(10), nullable=False)
+    ultimo_numero = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('organization_id', 'tipo', 'escopo', name='uq_tiss_numeracao'),
+    )
@@ -73,3 +73,53 @@ class FinancialSummary(BaseModel):
     pending_count: int
     overdue_count: int
     paid_count: int
+
+class BulkPaymentItem(BaseModel):
+    account_receivable_id: str
+    installment_id: Optional[str] = None
+    amount: Decimal = Field(..., gt=0)
+    payment_method: str = "transfer"
+    payment_date: Optional[datetime] = None
+    nsu: Optional[str] = None
+    notes: Optional[str] = None
+
+class BulkPaymentRequest(BaseModel):
+    payments: List[BulkPaymentItem] = Field(..., min_length=1)
+
+class PaymentBatchError(BaseModel):
+    line: int
+    detail: str
+
+class PaymentBatchResult(BaseModel):
+    total_rows: int = 0
+    registered: int = 0
+    duplicated: int = 0
+    unmatched: int = 0
+    total_amount: Decimal = Decimal(0)
+    batches: List[int] = []
+    errors: List[PaymentBatchError] = []
+
+class GenerateFeeBatchRequest(BaseModel):
+    reference_month: int = Field(..., ge=1, le=12)
+    reference_year: int = Field(..., ge=2020, le=2100)
+    professional_ids: Optional[List[str]] = None
+
+class GeneratedFeeSummary(BaseModel):
+    id: str
+    fee_number: str
+    healthcare_professional_id: str
+    gross_amount: Decimal
+    net_amount: Decimal
+    total_appointments: int
+    total_revenue: Decimal
+
+class SkippedFeeProfessional(BaseModel):
+    healthcare_professional_id: str
+    reason: str
+
+class GenerateFeeBatchResponse(BaseModel):
+    reference_month: int
+    reference_year: int
+    generated: int
+    fees: List[GeneratedFeeSummary] = []
+    skipped: List[SkippedFeeProfessional] = []
@@ -430,6 +430,42 @@ class TISSLoteComGuias(TISSLoteResponse):
 # AÇÕES ESPECIAIS
 # ============================================
 
+class TISSProcedimentoEmLote(BaseModel):
+    """Procedimento aplicado a cada agendamento na criação de guias em lote"""
+    tabela: str = Field("22", max_length=10, description="22=TUSS, 18=CBHPM")
+    codigo_procedimento: str = Field(..., max_length=20)
+    descricao_procedimento: str = Field(..., max_length=500)
+    quantidade_executada: int = Field(default=1, ge=1)
+    valor_unitario_informado: Optional[float] = Field(None, ge=0, description="Vazio = valor do agendamento")
+
+
+class TISSGuiasEmLoteRequest(BaseModel):
+    """Criação de guias a partir de agendamentos concluídos"""
+    lote_id: UUID
+    appointment_ids: Optional[List[UUID]] = Field(None, description="Vazio = todos os concluídos no período")
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    tipo_guia: TipoGuiaEnum = TipoGuiaEnum.CONSULTA
+    indicacao_clinica: str = Field("E", pattern=r'^(C|U|E)$')
+    nome_contratado: str = Field(..., max_length=200)
+    cnpj_contratado: str = Field(..., max_length=18)
+    codigo_prestador_na_operadora: Optional[str] = None
+    cnes: Optional[str] = Field(None, max_length=20)
+    procedimentos: List[TISSProcedimentoEmLote] = Field(..., min_length=1)
+
+
+class TISSGuiaEmLoteIgnorada(BaseModel):
+    appointment_id: UUID
+    motivo: str
+
+
+class TISSGuiasEmLoteResponse(BaseModel):
+    total_guias: int
+    total_procedimentos: int
+    valor_total: float
+    ignorados: List[TISSGuiaEmLoteIgnorada] = []
+
+
 class AdicionarGuiaAoLoteRequest(BaseModel):
     """Request para adicionar guia ao lote"""
     guia_id: UUID
@@ -488,6 +524,25 @@ class TISSResumoPorPeriodo(BaseModel):
     total_lotes: int
 
 
+class AgrupamentoAnaliseEnum(str, Enum):
+    OPERADORA = "operadora"
+    PROCEDIMENTO = "procedimento"
+    PROFISSIONAL = "profissional"
+
+
+class TISSAnaliseFaturamentoItem(BaseModel):
+    """Indicadores de faturamento/glosa de uma operadora, procedimento ou profissional"""
+    chave: str
+    nome: str
+    quantidade_procedimentos: int
+    quantidade_glosados: int
+    valor_informado: float
+    valor_glosa: float
+    valor_aceito: float
+    taxa_glosa: float  # % do valor informado
+    prazo_medio_pagamento_dias: Optional[float] = None
+
+
 # ============================================
 # LABELS EM PORTUGUÊS
 # ============================================
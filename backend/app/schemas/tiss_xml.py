@@ -37,3 +37,34 @@ class XMLTISSGenerateResponse(BaseModel):
     filename: str
     xml_content: str
     message: str
+
+class XMLTISSExportRequest(BaseModel):
+    competencia: str
+    operadora_ids: List[str] = Field(..., min_length=1)
+    pretty: bool = False
+
+class XMLTISSExportArquivo(BaseModel):
+    lote_id: str
+    numero_lote: Optional[str] = None
+    operadora_nome: Optional[str] = None
+    status: str  # pendente, gerado, erro
+    filename: Optional[str] = None
+    caminho: Optional[str] = None
+    tamanho_bytes: Optional[int] = None
+    quantidade_guias: Optional[int] = None
+    erro: Optional[str] = None
+
+class XMLTISSExportJobResponse(BaseModel):
+    job_id: str
+    status: str  # pendente, processando, concluido, concluido_com_erros, erro
+    competencia: str
+    operadora_ids: List[str]
+    diretorio: str
+    total_lotes: int
+    lotes_processados: int
+    lotes_com_erro: int
+    arquivos: List[XMLTISSExportArquivo]
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+    erro: Optional[str] = None
@@ -0,0 +1,126 @@
+"""
+Serviço de Consolidação de Repasses
+Resumo por profissional/mês usado em relatórios e exportações
+"""
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, exists, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from app.models.financial import ProfessionalFee, ProfessionalFeeMonthlySummary, PaymentStatus
+
+SUMMARY_COLUMNS = [
+    "id", "healthcare_professional_id", "reference_year", "reference_month",
+    "total_fees", "total_appointments", "total_revenue",
+    "total_gross", "total_net", "total_deductions",
+    "pending_amount", "paid_amount", "updated_at",
+]
+
+
+class FeeSummaryService:
+    """Mantém a tabela professional_fee_monthly_summaries"""
+
+    def _aggregate_select(self):
+        """Agregação de repasses ativos por (profissional, ano, mês)"""
+        fee = ProfessionalFee
+        is_paid = fee.status == PaymentStatus.PAID
+
+        return select(
+            func.gen_random_uuid(),
+            fee.healthcare_professional_id,
+            fee.reference_year,
+            fee.reference_month,
+            func.count(fee.id),
+            func.coalesce(func.sum(fee.total_appointments), 0),
+            func.coalesce(func.sum(fee.total_revenue), 0),
+            func.coalesce(func.sum(fee.gross_amount), 0),
+            func.coalesce(func.sum(fee.net_amount), 0),
+            func.coalesce(func.sum(fee.gross_amount - fee.net_amount), 0),
+            func.coalesce(func.sum(case((is_paid, 0), else_=fee.net_amount)), 0),
+            func.coalesce(func.sum(case((is_paid, fee.net_amount), else_=0)), 0),
+            literal(datetime.utcnow()),
+        ).where(
+            fee.is_deleted == False
+        ).group_by(
+            fee.healthcare_professional_id,
+            fee.reference_year,
+            fee.reference_month,
+        )
+
+    def _upsert(self, db: Session, source):
+        stmt = pg_insert(ProfessionalFeeMonthlySummary).from_select(SUMMARY_COLUMNS, source)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_professional_fee_monthly_summary",
+            set_={
+                column: stmt.excluded[column]
+                for column in SUMMARY_COLUMNS
+                if column not in ("id", "healthcare_professional_id", "reference_year", "reference_month")
+            }
+        )
+        db.execute(stmt)
+
+    def refresh(self, db: Session, keys: Iterable[Tuple]) -> None:
+        """
+        Recalcula o resumo das chaves (profissional, ano, mês) afetadas
+
+        Não faz commit: deve rodar na mesma transação que alterou os repasses.
+        """
+        keys = list(set(keys))
+        if not keys:
+            return
+
+        fee = ProfessionalFee
+        summary = ProfessionalFeeMonthlySummary
+
+        self._upsert(
+            db,
+            self._aggregate_select().where(
+                tuple_(fee.healthcare_professional_id, fee.reference_year, fee.reference_month).in_(keys)
+            )
+        )
+
+        # Chaves sem repasse ativo deixam de ter resumo
+        db.execute(
+            delete(summary).where(
+                tuple_(summary.healthcare_professional_id, summary.reference_year, summary.reference_month).in_(keys),
+                ~exists().where(
+                    fee.healthcare_professional_id == summary.healthcare_professional_id,
+                    fee.reference_year == summary.reference_year,
+                    fee.reference_month == summary.reference_month,
+                    fee.is_deleted == False,
+                )
+            ).execution_options(synchronize_session=False)
+        )
+
+    def refresh_fee(self, db: Session, fee: ProfessionalFee) -> None:
+        """Recalcula o resumo do período de um repasse"""
+        self.refresh(db, [(fee.healthcare_professional_id, fee.reference_year, fee.reference_month)])
+
+    def rebuild(self, db: Session, year: Optional[int] = None) -> int:
+        """
+        Reconstrói o resumo a partir de professional_fees
+
+        Returns:
+            Número de linhas de resumo após a reconstrução
+        """
+        summary = ProfessionalFeeMonthlySummary
+        source = self._aggregate_select()
+        cleanup = delete(summary)
+
+        if year:
+            source = source.where(ProfessionalFee.reference_year == year)
+            cleanup = cleanup.where(summary.reference_year == year)
+
+        db.execute(cleanup.execution_options(synchronize_session=False))
+        self._upsert(db, source)
+
+        count_query = db.query(func.count(summary.id))
+        if year:
+            count_query = count_query.filter(summary.reference_year == year)
+        return count_query.scalar()
+
+
+# Singleton
+fee_summary_service = FeeSummaryService()
@@ -22,6 +22,19 @@ class FinancialService:
         random_str = secrets.token_hex(2).upper()
         return f"{prefix}-{date_str}-{random_str}"
     
+    def generate_invoice_numbers(self, count: int, prefix: str = "FAT") -> List[str]:
+        """
+        Gera números de fatura para um lote, sem colisão dentro do lote
+        
+        Formato: FAT-YYYYMMDD-XXXX-NNNN
+        Exemplo: FAT-20251103-A5D2-0001
+        """
+        if count == 1:
+            return [self.generate_invoice_number(prefix)]
+        
+        base = self.generate_invoice_number(prefix)
+        return [f"{base}-{i:04d}" for i in range(1, count + 1)]
+    
     def generate_transaction_number(self, prefix: str = "TRX") -> str:
         """
         Gera número de transação único
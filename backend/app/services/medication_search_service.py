@@ -0,0 +1,240 @@
+"""
+Índice em Memória para Autocomplete de Medicamentos (base ANVISA)
+Busca por prefixo de palavra e por trigramas do nome comercial e do princípio ativo
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+import heapq
+import logging
+import re
+import time
+import unicodedata
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.data_versions import versao
+from app.models.medication import Medication
+from app.models.prescription import PrescriptionItem
+
+logger = logging.getLogger(__name__)
+
+# Colunas guardadas no índice (mesmos campos de MedicationSearchResponse)
+COLUNAS = (
+    "id", "commercial_name", "active_ingredient",
+    "concentration", "pharmaceutical_form", "manufacturer",
+)
+POS_NOME = COLUNAS.index("commercial_name")
+POS_PRINCIPIO = COLUNAS.index("active_ingredient")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Fração mínima de trigramas em comum na busca aproximada (erros de digitação)
+SIMILARIDADE_MINIMA = 0.5
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sem acento, espaços simples"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def trigramas(texto: str) -> Set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class _IndiceMedicamentos:
+    """
+    Índice imutável da base de medicamentos
+
+    Palavras em lista ordenada (prefixo com bisect) e trigramas em
+    dicionário, ambos apontando para posições das linhas em array('I').
+    """
+
+    __slots__ = (
+        "linhas", "nomes", "principios", "popularidade",
+        "tokens", "posicoes", "por_trigrama", "versao", "criado_em",
+    )
+
+    def __init__(self, linhas: Iterable[tuple], popularidade: Dict[str, int], versao: int = 0):
+        self.linhas = tuple(linhas)
+        self.nomes = [normalizar(linha[POS_NOME]) for linha in self.linhas]
+        self.principios = [normalizar(linha[POS_PRINCIPIO]) for linha in self.linhas]
+        self.popularidade = array("I", (popularidade.get(nome, 0) for nome in self.nomes))
+
+        por_token: Dict[str, array] = {}
+        self.por_trigrama: Dict[str, array] = {}
+        for posicao, (nome, principio) in enumerate(zip(self.nomes, self.principios)):
+            for token in set(_TOKEN.findall(nome)) | set(_TOKEN.findall(principio)):
+                por_token.setdefault(token, array("I")).append(posicao)
+            for trigrama in trigramas(nome) | trigramas(principio):
+                self.por_trigrama.setdefault(trigrama, array("I")).append(posicao)
+
+        self.tokens = sorted(por_token)
+        self.posicoes = [por_token[token] for token in self.tokens]
+        self.versao = versao
+        self.criado_em = time.monotonic()
+
+    def _prefixo_token(self, prefixo: str) -> Set[int]:
+        encontrados = set()
+        posicao = bisect_left(self.tokens, prefixo)
+        while posicao < len(self.tokens) and self.tokens[posicao].startswith(prefixo):
+            encontrados.update(self.posicoes[posicao])
+            posicao += 1
+        return encontrados
+
+    def _contem(self, termo: str) -> Set[int]:
+        """Linhas cujo nome ou princípio ativo contém o termo (3+ caracteres)"""
+        listas = sorted(
+            (self.por_trigrama.get(trigrama, ()) for trigrama in trigramas(termo)),
+            key=len
+        )
+        if not listas or not listas[0]:
+            return set()
+
+        # Interseção a partir da lista mais curta; confirma o trecho inteiro
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            candidatos.intersection_update(lista)
+            if not candidatos:
+                return candidatos
+        return {
+            posicao for posicao in candidatos
+            if termo in self.nomes[posicao] or termo in self.principios[posicao]
+        }
+
+    def _parecidos(self, termo: str) -> Dict[int, int]:
+        """Linhas com boa parte dos trigramas do termo (tolerância a erros)"""
+        do_termo = trigramas(termo)
+        contagem = Counter()
+        for trigrama in do_termo:
+            contagem.update(self.por_trigrama.get(trigrama, ()))
+        minimo = max(1, int(len(do_termo) * SIMILARIDADE_MINIMA))
+        return {posicao: total for posicao, total in contagem.items() if total >= minimo}
+
+    def buscar(self, busca: str, limite: int) -> List[int]:
+        """
+        Posições das melhores sugestões para o texto digitado
+
+        Ordem: nome começa com o termo, princípio ativo começa com o termo,
+        alguma palavra começa com o termo, trecho no meio; em cada faixa,
+        os mais prescritos primeiro. Sem nenhum desses, usa a busca
+        aproximada por trigramas.
+        """
+        termo = normalizar(busca)
+        if not termo:
+            return []
+
+        palavras = termo.split()
+        if len(termo) < 3:
+            candidatos = self._prefixo_token(palavras[0])
+        else:
+            candidatos = self._contem(termo)
+
+        if not candidatos and len(termo) >= 3:
+            parecidos = self._parecidos(termo)
+            return heapq.nsmallest(
+                limite,
+                parecidos,
+                key=lambda p: (-parecidos[p], -self.popularidade[p], self.nomes[p])
+            )
+
+        inicio_palavra = " " + termo
+
+        def chave(posicao: int):
+            nome = self.nomes[posicao]
+            principio = self.principios[posicao]
+            if nome.startswith(termo):
+                faixa = 0
+            elif principio.startswith(termo):
+                faixa = 1
+            elif inicio_palavra in " " + nome or inicio_palavra in " " + principio:
+                faixa = 2
+            else:
+                faixa = 3
+            return (faixa, -self.popularidade[posicao], len(nome), nome)
+
+        return heapq.nsmallest(limite, candidatos, key=chave)
+
+
+class MedicationSearchService:
+    """Mantém o índice de medicamentos, carregado do banco"""
+
+    def __init__(self):
+        self._indice = None
+
+    def _popularidade(self, db: Session) -> Dict[str, int]:
+        """Quantidade de itens de receita por nome de medicamento normalizado"""
+        popularidade: Dict[str, int] = {}
+        for nome, total in db.query(
+            func.lower(PrescriptionItem.medication_name), func.count(PrescriptionItem.id)
+        ).group_by(
+            func.lower(PrescriptionItem.medication_name)
+        ):
+            chave = normalizar(nome)
+            popularidade[chave] = popularidade.get(chave, 0) + total
+        return popularidade
+
+    def carregar(self, db: Session, versao_tabela: Optional[int] = None) -> int:
+        """
+        Monta o índice (startup, após o TTL e quando a tabela muda)
+
+        Returns:
+            Total de medicamentos indexados
+        """
+        inicio = time.perf_counter()
+        # Lida antes das linhas: índice nunca com versão mais nova que o conteúdo
+        if versao_tabela is None:
+            versao_tabela = versao(db, Medication.__tablename__)
+        linhas = db.query(
+            *[getattr(Medication, coluna) for coluna in COLUNAS]
+        ).yield_per(5000)
+
+        # Troca atômica: requisições em andamento continuam no índice antigo
+        self._indice = _IndiceMedicamentos(
+            (tuple(linha) for linha in linhas),
+            self._popularidade(db),
+            versao_tabela
+        )
+
+        total = len(self._indice.linhas)
+        logger.info(f"Índice de medicamentos carregado: {total} registros em {time.perf_counter() - inicio:.2f}s")
+        return total
+
+    def _obter(self, db: Session, versao_tabela: Optional[int] = None) -> _IndiceMedicamentos:
+        indice = self._indice
+        # Medicamentos alterados (em qualquer worker) mudam a versão da
+        # tabela; a popularidade é atualizada após o TTL. O endpoint passa
+        # a versão já lida por referencia_versionada
+        if versao_tabela is None:
+            versao_tabela = versao(db, Medication.__tablename__)
+        if (
+            indice is None
+            or indice.versao != versao_tabela
+            or time.monotonic() - indice.criado_em > settings.MEDICATION_INDEX_TTL_SECONDS
+        ):
+            self.carregar(db, versao_tabela)
+            indice = self._indice
+        return indice
+
+    def buscar(
+        self,
+        db: Session,
+        busca: str,
+        limite: int = 10,
+        versao_tabela: Optional[int] = None
+    ) -> List[dict]:
+        """Sugestões ordenadas por relevância (ver _IndiceMedicamentos.buscar)"""
+        indice = self._obter(db, versao_tabela)
+        return [
+            dict(zip(COLUNAS, indice.linhas[posicao]))
+            for posicao in indice.buscar(busca, limite)
+        ]
+
+
+# Singleton
+medication_search_service = MedicationSearchService()
@@ -4,13 +4,32 @@ Gerencia envio de Email, SMS e WhatsApp com integração Twilio
 """
 from typing import Optional
 from datetime import datetime, timedelta
+import functools
 import logging
 import os
+import time
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
+from app.core.metrics import NOTIFICATION_SEND_DURATION, NOTIFICATIONS_SENT
+
 logger = logging.getLogger(__name__)
 
+
+def _medir_envio(canal: str):
+    """Conta envios por resultado e mede a duração (métricas em /metrics)"""
+    def decorador(envio):
+        @functools.wraps(envio)
+        async def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            result = await envio(*args, **kwargs)
+            NOTIFICATION_SEND_DURATION.labels(canal).observe(time.perf_counter() - inicio)
+            NOTIFICATIONS_SENT.labels(canal, "success" if result.get("success") else "failure").inc()
+            return result
+        return medido
+    return decorador
+
+
 class NotificationTemplates:
     """Templates de mensagens"""
     
@@ -87,6 +106,7 @@ class NotificationService:
             self.client = None
             logger.warning("⚠️ Twilio em modo simulação")
     
+    @_medir_envio("whatsapp")
     async def send_whatsapp(self, recipient_phone: str, recipient_name: str, message: str) -> dict:
         """Enviar WhatsApp"""
         try:
@@ -127,6 +147,7 @@ class NotificationService:
             logger.error(f"❌ Erro: {e}")
             return {"success": False, "error": str(e)}
     
+    @_medir_envio("sms")
     async def send_sms(self, recipient_phone: str, recipient_name: str, message: str) -> dict:
         """Enviar SMS"""
         try:
@@ -0,0 +1,542 @@
+"""
+Serviço de Pagamentos em Lote
+Registro em massa e conciliação bancária (CSV/OFX)
+"""
+import csv
+import io
+import re
+import secrets
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.financial import (
+    AccountReceivable, PaymentInstallment, PaymentTransaction,
+    PaymentStatus, PaymentMethodType
+)
+from app.models.patient import Patient
+from app.utils.validators import format_cpf
+
+OPEN_STATUSES = (PaymentStatus.PENDING, PaymentStatus.OVERDUE, PaymentStatus.PARTIALLY_PAID)
+
+# Cabeçalhos aceitos no CSV do extrato -> campo interno
+CSV_COLUMNS = {
+    "data": "payment_date",
+    "date": "payment_date",
+    "data_pagamento": "payment_date",
+    "valor": "amount",
+    "amount": "amount",
+    "descricao": "description",
+    "historico": "description",
+    "memo": "description",
+    "cpf": "cpf",
+    "documento": "cpf",
+    "id": "fitid",
+    "identificador": "fitid",
+    "fitid": "fitid",
+}
+
+OFX_FIELD_RE = re.compile(r"<(\w+)>([^<\r\n]*)")
+OFX_BLOCK_RE = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+OFX_READ_SIZE = 64 * 1024
+
+
+class InstallmentMatcher:
+    """
+    Índice em memória de títulos em aberto
+
+    Chaves: (valor em aberto, paciente) e valor em aberto, cada uma com
+    a lista de candidatos ordenada por vencimento. Um título casado é
+    consumido e não volta a ser oferecido no mesmo lote.
+    """
+
+    def __init__(self, candidates: Iterable[Dict[str, Any]], tolerance_days: int):
+        self.tolerance = timedelta(days=tolerance_days)
+        self._by_patient: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        self._by_amount: Dict[Decimal, List[Dict[str, Any]]] = defaultdict(list)
+        self._used = set()
+
+        for candidate in candidates:
+            amount = candidate["open_amount"]
+            self._by_patient[(amount, candidate["patient_id"])].append(candidate)
+            self._by_amount[amount].append(candidate)
+
+        for bucket in self._by_patient.values():
+            bucket.sort(key=lambda c: c["due_date"])
+        for bucket in self._by_amount.values():
+            bucket.sort(key=lambda c: c["due_date"])
+
+    def _in_window(self, bucket: List[Dict[str, Any]], payment_date: datetime) -> List[Dict[str, Any]]:
+        return [
+            c for c in bucket
+            if c["key"] not in self._used and abs(c["due_date"] - payment_date) <= self.tolerance
+        ]
+
+    def match(
+        self,
+        amount: Decimal,
+        payment_date: datetime,
+        patient_id: Optional[uuid.UUID] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Busca o título para um crédito do extrato
+
+        Com paciente identificado, escolhe o vencimento mais próximo.
+        Sem paciente, só concilia quando há um único candidato na janela.
+        """
+        if patient_id is not None:
+            candidates = self._in_window(self._by_patient.get((amount, patient_id), []), payment_date)
+            if not candidates:
+                return None
+            chosen = min(candidates, key=lambda c: abs(c["due_date"] - payment_date))
+        else:
+            candidates = self._in_window(self._by_amount.get(amount, []), payment_date)
+            if len(candidates) != 1:
+                return None
+            chosen = candidates[0]
+
+        self._used.add(chosen["key"])
+        return chosen
+
+
+class PaymentImportService:
+    """Serviço de registro de pagamentos em lote"""
+
+    def __init__(self, chunk_size: int = 500, tolerance_days: int = 5):
+        self.chunk_size = chunk_size
+        self.tolerance_days = tolerance_days
+
+    # ============================================
+    # PARSERS DE EXTRATO
+    # ============================================
+
+    def _parse_amount(self, value: Optional[str]) -> Optional[Decimal]:
+        if not value:
+            return None
+        value = value.strip().replace("R$", "").replace(" ", "")
+        if "," in value:
+            value = value.replace(".", "").replace(",", ".")
+        try:
+            return round(Decimal(value), 2)
+        except InvalidOperation:
+            return None
+
+    def _parse_date(self, value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        value = value.strip()
+        for fmt, size in (("%d/%m/%Y", 10), ("%Y-%m-%d", 10), ("%Y%m%d", 8)):
+            try:
+                return datetime.strptime(value[:size], fmt)
+            except ValueError:
+                continue
+        return None
+
+    def parse_csv(self, stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """
+        Lê extrato CSV linha a linha
+
+        Aceita separador "," ou ";" e valores no formato brasileiro.
+        Débitos (valores negativos) são ignorados.
+        """
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            header_line = text.readline()
+            delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+            header = [
+                CSV_COLUMNS.get(column.strip().lower(), column.strip().lower())
+                for column in next(csv.reader([header_line], delimiter=delimiter))
+            ]
+
+            for line_number, row in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+                if not row:
+                    continue
+                data = dict(zip(header, row))
+                yield {
+                    "line": line_number,
+                    "fitid": (data.get("fitid") or "").strip() or None,
+                    "amount": self._parse_amount(data.get("amount")),
+                    "payment_date": self._parse_date(data.get("payment_date")),
+                    "description": (data.get("description") or "").strip(),
+                    "cpf": re.sub(r"[^0-9]", "", data.get("cpf") or "") or None,
+                }
+        finally:
+            text.detach()
+
+    def parse_ofx(self, stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """
+        Lê extrato OFX (SGML ou XML) transação a transação
+
+        Os blocos são separados pelas tags <STMTTRN>...</STMTTRN>, não por
+        linha: OFX em XML costuma vir numa linha só. O arquivo é lido em
+        pedaços e só o trecho a partir do bloco corrente fica em memória.
+        """
+        text = io.TextIOWrapper(stream, encoding="cp1252", errors="replace")
+        try:
+            buffer = ""
+            count = 0
+            while True:
+                piece = text.read(OFX_READ_SIZE)
+                buffer += piece
+
+                end = 0
+                for block in OFX_BLOCK_RE.finditer(buffer):
+                    end = block.end()
+                    count += 1
+                    fields = {tag.upper(): value.strip() for tag, value in OFX_FIELD_RE.findall(block.group(1))}
+                    yield {
+                        "line": count,
+                        "fitid": fields.get("FITID") or None,
+                        "amount": self._parse_amount(fields.get("TRNAMT")),
+                        "payment_date": self._parse_date(fields.get("DTPOSTED")),
+                        "description": fields.get("MEMO") or fields.get("NAME") or "",
+                        "cpf": None,
+                    }
+
+                if not piece:
+                    break
+
+                # Guarda o bloco ainda incompleto (ou o fim do pedaço, que
+                # pode ter cortado uma tag <STMTTRN> ao meio)
+                buffer = buffer[end:]
+                start = buffer.upper().rfind("<STMTTRN>")
+                buffer = buffer[start:] if start >= 0 else buffer[-len("<STMTTRN>"):]
+        finally:
+            text.detach()
+
+    # ============================================
+    # APLICAÇÃO DOS PAGAMENTOS
+    # ============================================
+
+    def _chunks(self, rows: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _existing_nsus(self, db: Session, nsus: List[str]) -> set:
+        if not nsus:
+            return set()
+        rows = db.query(PaymentTransaction.nsu).filter(
+            PaymentTransaction.nsu.in_(nsus),
+            PaymentTransaction.is_refunded == False
+        ).all()
+        return {row.nsu for row in rows}
+
+    def _apply_chunk(self, db: Session, items: List[Dict[str, Any]], result: Dict[str, Any]) -> int:
+        """
+        Registra um bloco de pagamentos com inserts e updates em massa
+
+        Cada item: line, account_receivable_id, installment_id, amount,
+        payment_method, payment_date, nsu, notes. Um commit por bloco.
+
+        Contas e parcelas são lidas com SELECT ... FOR UPDATE (em ordem de
+        id, contas antes das parcelas): outra importação ou /payments
+        sobre os mesmos títulos espera o commit e lê os saldos já
+        atualizados, sem sobrescrever pagamentos.
+        """
+        if not items:
+            return 0
+
+        account_ids = {item["account_receivable_id"] for item in items}
+        installment_ids = {item["installment_id"] for item in items if item["installment_id"]}
+
+        accounts = {
+            row.id: {"total": row.total_amount, "paid": row.paid_amount or Decimal(0), "status": row.status}
+            for row in db.query(
+                AccountReceivable.id, AccountReceivable.total_amount,
+                AccountReceivable.paid_amount, AccountReceivable.status
+            ).filter(
+                AccountReceivable.id.in_(account_ids),
+                AccountReceivable.is_deleted == False
+            ).order_by(AccountReceivable.id).with_for_update()
+        }
+        installments = {
+            row.id: {"account_id": row.account_receivable_id, "total": row.total_amount, "paid": row.paid_amount or Decimal(0)}
+            for row in db.query(
+                PaymentInstallment.id, PaymentInstallment.account_receivable_id,
+                PaymentInstallment.total_amount, PaymentInstallment.paid_amount
+            ).filter(
+                PaymentInstallment.id.in_(installment_ids)
+            ).order_by(PaymentInstallment.id).with_for_update()
+        } if installment_ids else {}
+
+        batch_prefix = f"TRX-{datetime.now().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(3).upper()}"
+        now = datetime.utcnow()
+        transactions = []
+        touched_accounts: Dict[uuid.UUID, datetime] = {}
+        touched_installments: Dict[uuid.UUID, datetime] = {}
+
+        for item in items:
+            account = accounts.get(item["account_receivable_id"])
+            if account is None:
+                result["errors"].append({"line": item["line"], "detail": "Conta não encontrada"})
+                continue
+            if account["status"] in (PaymentStatus.PAID, PaymentStatus.CANCELLED):
+                result["errors"].append({"line": item["line"], "detail": "Conta já está paga ou cancelada"})
+                continue
+            if item["amount"] > account["total"] - account["paid"]:
+                result["errors"].append({
+                    "line": item["line"],
+                    "detail": f"Valor do pagamento ({item['amount']}) maior que saldo devedor ({account['total'] - account['paid']})"
+                })
+                continue
+
+            installment = None
+            if item["installment_id"]:
+                installment = installments.get(item["installment_id"])
+                if installment is None or installment["account_id"] != item["account_receivable_id"]:
+                    result["errors"].append({"line": item["line"], "detail": "Parcela não encontrada"})
+                    continue
+
+            payment_date = item["payment_date"] or now
+            account["paid"] += item["amount"]
+            touched_accounts[item["account_receivable_id"]] = payment_date
+            if installment is not None:
+                installment["paid"] += item["amount"]
+                touched_installments[item["installment_id"]] = payment_date
+
+            transactions.append({
+                "id": uuid.uuid4(),
+                "account_receivable_id": item["account_receivable_id"],
+                "installment_id": item["installment_id"],
+                "transaction_number": f"{batch_prefix}-{len(transactions) + 1:05d}",
+                "payment_method": item["payment_method"],
+                "amount": item["amount"],
+                "nsu": item["nsu"],
+                "notes": item["notes"],
+                "payment_date": payment_date,
+                "is_confirmed": True,
+                "confirmed_at": now,
+                "created_at": now,
+            })
+
+        if not transactions:
+            # Libera os locks
+            db.rollback()
+            return 0
+
+        db.execute(insert(PaymentTransaction), transactions)
+
+        if touched_installments:
+            db.execute(update(PaymentInstallment), [
+                {
+                    "id": installment_id,
+                    "paid_amount": installments[installment_id]["paid"],
+                    "status": PaymentStatus.PAID if installments[installment_id]["paid"] >= installments[installment_id]["total"] else PaymentStatus.PARTIALLY_PAID,
+                    "payment_date": payment_date,
+                    "updated_at": now,
+                }
+                for installment_id, payment_date in touched_installments.items()
+            ])
+
+        account_updates = []
+        for account_id, payment_date in touched_accounts.items():
+            account = accounts[account_id]
+            remaining = account["total"] - account["paid"]
+            paid_off = remaining <= 0
+            account_updates.append({
+                "id": account_id,
+                "paid_amount": account["paid"],
+                "remaining_amount": remaining,
+                "status": PaymentStatus.PAID if paid_off else PaymentStatus.PARTIALLY_PAID,
+                "payment_date": payment_date if paid_off else None,
+                "updated_at": now,
+            })
+        db.execute(update(AccountReceivable), account_updates)
+
+        db.commit()
+
+        result["registered"] += len(transactions)
+        result["total_amount"] += sum(t["amount"] for t in transactions)
+        return len(transactions)
+
+    def register_payments(self, db: Session, payments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Registra pagamentos informados explicitamente (API em lote)
+
+        Returns:
+            Dict com contadores por bloco e erros por linha
+        """
+        result = self._new_result()
+
+        for chunk in self._chunks(payments):
+            result["total_rows"] += len(chunk)
+            known_nsus = self._existing_nsus(db, [p["nsu"] for p in chunk if p["nsu"]])
+
+            items = []
+            for payment in chunk:
+                if payment["nsu"] and payment["nsu"] in known_nsus:
+                    result["duplicated"] += 1
+                    continue
+                if payment["nsu"]:
+                    known_nsus.add(payment["nsu"])
+                items.append(payment)
+
+            result["batches"].append(self._apply_chunk(db, items, result))
+
+        return result
+
+    # ============================================
+    # CONCILIAÇÃO BANCÁRIA
+    # ============================================
+
+    def _load_candidates(self, db: Session, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Carrega parcelas e contas à vista em aberto da janela (2 queries)"""
+        candidates = []
+
+        installment_rows = db.query(
+            PaymentInstallment.id,
+            PaymentInstallment.account_receivable_id,
+            (PaymentInstallment.total_amount - func.coalesce(PaymentInstallment.paid_amount, 0)).label("open_amount"),
+            PaymentInstallment.due_date,
+            AccountReceivable.patient_id
+        ).join(
+            AccountReceivable, AccountReceivable.id == PaymentInstallment.account_receivable_id
+        ).filter(
+            PaymentInstallment.status.in_(OPEN_STATUSES),
+            PaymentInstallment.due_date.between(start, end),
+            AccountReceivable.is_deleted == False
+        ).all()
+
+        for row in installment_rows:
+            candidates.append({
+                "key": ("installment", row.id),
+                "account_receivable_id": row.account_receivable_id,
+                "installment_id": row.id,
+                "open_amount": round(row.open_amount, 2),
+                "due_date": row.due_date,
+                "patient_id": row.patient_id,
+            })
+
+        account_rows = db.query(
+            AccountReceivable.id,
+            AccountReceivable.remaining_amount,
+            AccountReceivable.due_date,
+            AccountReceivable.patient_id
+        ).filter(
+            AccountReceivable.status.in_(OPEN_STATUSES),
+            AccountReceivable.due_date.between(start, end),
+            AccountReceivable.is_deleted == False,
+            func.coalesce(AccountReceivable.total_installments, 1) <= 1
+        ).all()
+
+        for row in account_rows:
+            if row.remaining_amount is None:
+                continue
+            candidates.append({
+                "key": ("account", row.id),
+                "account_receivable_id": row.id,
+                "installment_id": None,
+                "open_amount": round(row.remaining_amount, 2),
+                "due_date": row.due_date,
+                "patient_id": row.patient_id,
+            })
+
+        return candidates
+
+    def _resolve_patients(self, db: Session, cpfs: set) -> Dict[str, uuid.UUID]:
+        """Mapeia CPF (só dígitos) -> paciente, aceitando CPF salvo com ou sem máscara"""
+        if not cpfs:
+            return {}
+        lookup = set(cpfs) | {format_cpf(cpf) for cpf in cpfs}
+        rows = db.query(Patient.cpf, Patient.id).filter(Patient.cpf.in_(lookup)).all()
+        return {re.sub(r"[^0-9]", "", row.cpf): row.id for row in rows}
+
+    def import_statement(
+        self,
+        db: Session,
+        rows: Iterable[Dict[str, Any]],
+        payment_method: PaymentMethodType = PaymentMethodType.TRANSFER
+    ) -> Dict[str, Any]:
+        """
+        Concilia um extrato bancário com os títulos em aberto
+
+        O extrato é consumido em blocos; para cada bloco são feitas
+        poucas queries (duplicidade, pacientes, candidatos) e um commit.
+        Créditos já importados (mesmo FITID/NSU) são ignorados.
+        """
+        result = self._new_result()
+        seen_fitids = set()
+
+        for chunk in self._chunks(rows):
+            result["total_rows"] += len(chunk)
+
+            valid = []
+            for row in chunk:
+                if row["amount"] is None or row["payment_date"] is None:
+                    result["errors"].append({"line": row["line"], "detail": "Data ou valor inválido"})
+                    continue
+                if row["amount"] <= 0:
+                    continue
+                valid.append(row)
+
+            if not valid:
+                result["batches"].append(0)
+                continue
+
+            known_nsus = self._existing_nsus(db, [row["fitid"] for row in valid if row["fitid"]])
+            patients = self._resolve_patients(db, {row["cpf"] for row in valid if row["cpf"]})
+
+            window = timedelta(days=self.tolerance_days)
+            matcher = InstallmentMatcher(
+                self._load_candidates(
+                    db,
+                    min(row["payment_date"] for row in valid) - window,
+                    max(row["payment_date"] for row in valid) + window
+                ),
+                self.tolerance_days
+            )
+
+            items = []
+            for row in valid:
+                if row["fitid"] and (row["fitid"] in known_nsus or row["fitid"] in seen_fitids):
+                    result["duplicated"] += 1
+                    continue
+
+                candidate = matcher.match(row["amount"], row["payment_date"], patients.get(row["cpf"]))
+                if candidate is None:
+                    result["unmatched"] += 1
+                    result["errors"].append({"line": row["line"], "detail": f"Sem título correspondente: {row['description']}"[:255]})
+                    continue
+
+                if row["fitid"]:
+                    seen_fitids.add(row["fitid"])
+                items.append({
+                    "line": row["line"],
+                    "account_receivable_id": candidate["account_receivable_id"],
+                    "installment_id": candidate["installment_id"],
+                    "amount": row["amount"],
+                    "payment_method": payment_method,
+                    "payment_date": row["payment_date"],
+                    "nsu": row["fitid"],
+                    "notes": f"[CONCILIAÇÃO] {row['description']}".strip(),
+                })
+
+            result["batches"].append(self._apply_chunk(db, items, result))
+
+        return result
+
+    def _new_result(self) -> Dict[str, Any]:
+        return {
+            "total_rows": 0,
+            "registered": 0,
+            "duplicated": 0,
+            "unmatched": 0,
+            "total_amount": Decimal(0),
+            "batches": [],
+            "errors": [],
+        }
+
+
+# Singleton
+payment_import_service = PaymentImportService()
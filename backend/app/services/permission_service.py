@@ -0,0 +1,214 @@
+"""
+Serviço de Permissões
+Permissões e módulos de cada usuário compilados em bitsets e mantidos em memória
+"""
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+import json
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.data_versions import incrementar_versoes, versoes
+from app.models.permission import Permission, UserPermission
+from app.models.user import User
+
+# Módulos do menu liberados para admins (mesma ordem de get_my_modules)
+MODULOS = (
+    "dashboard", "pacientes", "agenda", "prontuarios",
+    "prescricoes", "cfm", "relatorios", "chat",
+)
+TODOS_MODULOS = (1 << len(MODULOS)) - 1
+
+ROLES_ADMIN = ("super_admin", "admin")
+
+
+def parse_allowed_modules(valor) -> List[str]:
+    """allowed_modules em JSON (["a","b"]) ou array do PostgreSQL ({a,b})"""
+    if not valor:
+        return []
+    if not isinstance(valor, str):
+        return list(valor)
+
+    valor = valor.strip()
+    if valor.startswith("["):
+        try:
+            return [str(modulo).strip() for modulo in json.loads(valor) if str(modulo).strip()]
+        except ValueError:
+            pass
+    return [
+        modulo.strip().strip('"')
+        for modulo in valor.strip("{}[]").split(",")
+        if modulo.strip().strip('"')
+    ]
+
+
+class _Catalogo:
+    """Nome de permissão -> bit, na ordem de Permission.name"""
+
+    __slots__ = ("nomes", "bits", "todas", "admin", "versao")
+
+    def __init__(self, nomes: List[str], versao: int):
+        self.nomes = tuple(nomes)
+        self.bits = {nome: 1 << posicao for posicao, nome in enumerate(self.nomes)}
+        self.todas = (1 << len(self.nomes)) - 1
+        # Admin tem todas menos manage_users
+        self.admin = self.todas & ~self.bits.get("manage_users", 0)
+        self.versao = versao
+
+    def mascara(self, nomes) -> Optional[int]:
+        """Bits das permissões; None se alguma não existir no catálogo"""
+        mascara = 0
+        for nome in nomes:
+            bit = self.bits.get(nome)
+            if bit is None:
+                return None
+            mascara |= bit
+        return mascara
+
+
+class PermissionService:
+    """
+    Cache LRU (com TTL) do bitset de permissões e módulos por usuário
+
+    A chave inclui role e allowed_modules, então mudanças nesses campos
+    geram outra entrada. O catálogo guarda a versão de "permissions" e
+    cada entrada a de "user_permissions" (reference_data_versions): uma
+    consulta lê as duas e, se alguma mudou em qualquer worker, o
+    catálogo ou o bitset são refeitos.
+
+    Os bits de módulo começam por MODULOS; nomes gravados em
+    allowed_modules fora dessa lista (ex.: configuracoes) ganham o
+    próximo bit na primeira vez que aparecem e o mantêm no processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogo: Optional[_Catalogo] = None
+        self._usuarios: "OrderedDict[tuple, Tuple[float, int, int, int]]" = OrderedDict()
+        self._modulos: List[str] = list(MODULOS)
+        self._bit_modulo: Dict[str, int] = {modulo: 1 << posicao for posicao, modulo in enumerate(MODULOS)}
+
+    def _registrar_modulo(self, modulo: str) -> int:
+        bit = self._bit_modulo.get(modulo)
+        if bit is not None:
+            return bit
+        with self._lock:
+            bit = self._bit_modulo.get(modulo)
+            if bit is None:
+                bit = 1 << len(self._modulos)
+                self._modulos.append(modulo)
+                self._bit_modulo[modulo] = bit
+            return bit
+
+    def _obter_catalogo(self, db: Session, versao: int) -> _Catalogo:
+        catalogo = self._catalogo
+        if catalogo is None or catalogo.versao != versao:
+            nomes = [nome for (nome,) in db.query(Permission.name).order_by(Permission.name)]
+            catalogo = _Catalogo(nomes, versao)
+            with self._lock:
+                # Bits podem ter mudado de posição: bitsets antigos não valem mais
+                self._catalogo = catalogo
+                self._usuarios.clear()
+        return catalogo
+
+    def _compilar(self, db: Session, catalogo: _Catalogo, user: User) -> Tuple[int, int]:
+        if user.role == "super_admin":
+            return catalogo.todas, TODOS_MODULOS
+        if user.role == "admin":
+            return catalogo.admin, TODOS_MODULOS
+
+        permissoes = 0
+        for (nome,) in db.query(Permission.name).join(
+            UserPermission, UserPermission.permission_id == Permission.id
+        ).filter(
+            UserPermission.user_id == user.id
+        ):
+            permissoes |= catalogo.bits.get(nome, 0)
+
+        modulos = 0
+        for modulo in parse_allowed_modules(user.allowed_modules):
+            modulos |= self._registrar_modulo(modulo)
+        return permissoes, modulos
+
+    def bitsets(self, db: Session, user: User) -> Tuple[_Catalogo, int, int]:
+        """
+        Catálogo, bitset de permissões e bitset de módulos do usuário
+
+        Enquanto a entrada estiver no cache, só lê as versões.
+        """
+        atuais = versoes(db, ("permissions", "user_permissions"))
+        catalogo = self._obter_catalogo(db, atuais["permissions"])
+        chave = (user.id, user.role, user.allowed_modules)
+        versao = atuais["user_permissions"]
+        agora = time.monotonic()
+
+        with self._lock:
+            item = self._usuarios.get(chave)
+            if item is not None and item[0] > agora and item[1] == versao:
+                self._usuarios.move_to_end(chave)
+                return catalogo, item[2], item[3]
+
+        permissoes, modulos = self._compilar(db, catalogo, user)
+        with self._lock:
+            self._usuarios[chave] = (agora + settings.PERMISSION_CACHE_TTL_SECONDS, versao, permissoes, modulos)
+            self._usuarios.move_to_end(chave)
+            while len(self._usuarios) > settings.PERMISSION_CACHE_MAX_ENTRIES:
+                self._usuarios.popitem(last=False)
+        return catalogo, permissoes, modulos
+
+    def tem_permissoes(self, db: Session, user: User, nomes) -> bool:
+        # Super admin passa mesmo por permissão ainda não cadastrada
+        if user.role == "super_admin":
+            return True
+        catalogo, permissoes, _ = self.bitsets(db, user)
+        requeridas = catalogo.mascara(nomes)
+        return requeridas is not None and permissoes & requeridas == requeridas
+
+    def tem_modulos(self, db: Session, user: User, modulos) -> bool:
+        _, _, permitidos = self.bitsets(db, user)
+        requeridos = 0
+        for modulo in modulos:
+            bit = self._bit_modulo.get(modulo)
+            if bit is None:
+                return False
+            requeridos |= bit
+        return permitidos & requeridos == requeridos
+
+    def listar_permissoes(self, db: Session, user: User) -> List[str]:
+        catalogo, permissoes, _ = self.bitsets(db, user)
+        return [nome for nome in catalogo.nomes if permissoes & catalogo.bits[nome]]
+
+    def listar_modulos(self, db: Session, user: User) -> List[str]:
+        _, _, modulos = self.bitsets(db, user)
+        return [modulo for modulo in list(self._modulos) if modulos & self._bit_modulo[modulo]]
+
+    def invalidar_catalogo(self) -> None:
+        with self._lock:
+            self._catalogo = None
+            self._usuarios.clear()
+
+
+# Singleton
+permission_service = PermissionService()
+
+
+@event.listens_for(Session, "after_flush")
+def _versionar_atribuicoes(session, flush_context):
+    """INSERT/UPDATE/DELETE de UserPermission via ORM"""
+    if any(isinstance(instancia, UserPermission) for instancia in chain(session.new, session.dirty, session.deleted)):
+        incrementar_versoes(session.connection(), ("user_permissions",))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _versionar_atribuicoes_em_lote(orm_execute_state):
+    """insert()/update()/delete() de UserPermission via db.execute ou Query.delete"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name == "user_permissions":
+        incrementar_versoes(orm_execute_state.session.connection(), ("user_permissions",))
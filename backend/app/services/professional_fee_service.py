@@ -0,0 +1,224 @@
+"""
+Serviço de Geração de Repasses
+Repasses do mês calculados no banco para vários profissionais de uma vez
+"""
+from calendar import monthrange
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+import uuid
+
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.financial import (
+    AccountReceivable, PaymentStatus, ProfessionalFee, ProfessionalFeeConfiguration,
+    ProfessionalFeeItem, ProfessionalFeeType
+)
+from app.models.user import User
+from app.services.fee_summary_service import fee_summary_service
+from app.services.financial_service import financial_service
+
+
+def _period_bounds(reference_year: int, reference_month: int):
+    """Primeiro e último instante do mês de referência"""
+    period_start = datetime(reference_year, reference_month, 1)
+    last_day = monthrange(reference_year, reference_month)[1]
+    period_end = datetime(reference_year, reference_month, last_day, 23, 59, 59)
+    return period_start, period_end
+
+
+def _fee_amount_expression():
+    """Valor do repasse por conta recebida, calculado no banco"""
+    return func.round(
+        case(
+            (
+                ProfessionalFeeConfiguration.fee_type == ProfessionalFeeType.PERCENTAGE,
+                AccountReceivable.paid_amount * ProfessionalFeeConfiguration.percentage / 100
+            ),
+            else_=ProfessionalFeeConfiguration.fixed_amount
+        ),
+        2
+    )
+
+
+def _paid_in_period_filters(period_start: datetime, period_end: datetime):
+    return (
+        AccountReceivable.payment_date >= period_start,
+        AccountReceivable.payment_date <= period_end,
+        AccountReceivable.status == PaymentStatus.PAID,
+        AccountReceivable.is_deleted == False
+    )
+
+
+class ProfessionalFeeService:
+    """Geração de repasses por período (usado por /generate e /generate/batch)"""
+
+    def generate_for_period(
+        self,
+        db: Session,
+        reference_year: int,
+        reference_month: int,
+        professional_ids: Optional[List[str]] = None,
+        organization_id=None
+    ):
+        """
+        Gera repasses do período para vários profissionais de uma vez
+
+        Totais e itens são calculados no banco: uma agregação por profissional
+        e um único INSERT ... SELECT para todos os itens, independente do
+        número de atendimentos.
+
+        Returns:
+            (ids dos repasses gerados, dict profissional -> motivo de não geração)
+        """
+        period_start, period_end = _period_bounds(reference_year, reference_month)
+
+        configs_query = db.query(ProfessionalFeeConfiguration).filter(
+            ProfessionalFeeConfiguration.is_active == True
+        )
+        if professional_ids is not None:
+            configs_query = configs_query.filter(
+                ProfessionalFeeConfiguration.healthcare_professional_id.in_(professional_ids)
+            )
+        if organization_id is not None:
+            configs_query = configs_query.join(
+                User, User.id == ProfessionalFeeConfiguration.healthcare_professional_id
+            ).filter(User.organization_id == organization_id)
+
+        configs = {config.healthcare_professional_id: config for config in configs_query.all()}
+        skipped = {}
+
+        if not configs:
+            return [], skipped
+
+        # Repasses já existentes no período
+        existing = db.query(ProfessionalFee.healthcare_professional_id).filter(
+            ProfessionalFee.healthcare_professional_id.in_(list(configs.keys())),
+            ProfessionalFee.reference_month == reference_month,
+            ProfessionalFee.reference_year == reference_year,
+            ProfessionalFee.is_deleted == False
+        ).all()
+        for row in existing:
+            skipped[row.healthcare_professional_id] = "Já existe repasse gerado para este período"
+
+        pending_ids = [pid for pid in configs if pid not in skipped]
+        if not pending_ids:
+            return [], skipped
+
+        # Totais por profissional em uma única agregação
+        totals = db.query(
+            AccountReceivable.healthcare_professional_id,
+            func.count(AccountReceivable.id).label('total_appointments'),
+            func.coalesce(func.sum(AccountReceivable.paid_amount), 0).label('total_revenue'),
+            func.coalesce(func.sum(_fee_amount_expression()), 0).label('gross_amount')
+        ).join(
+            ProfessionalFeeConfiguration,
+            ProfessionalFeeConfiguration.healthcare_professional_id == AccountReceivable.healthcare_professional_id
+        ).filter(
+            AccountReceivable.healthcare_professional_id.in_(pending_ids),
+            *_paid_in_period_filters(period_start, period_end)
+        ).group_by(AccountReceivable.healthcare_professional_id).all()
+
+        totals_by_professional = {row.healthcare_professional_id: row for row in totals}
+
+        now = datetime.utcnow()
+        fee_rows = []
+
+        for professional_id in pending_ids:
+            row = totals_by_professional.get(professional_id)
+            if row is None or not row.total_appointments:
+                skipped[professional_id] = "Não há atendimentos pagos no período selecionado"
+                continue
+
+            config = configs[professional_id]
+            gross_amount = Decimal(row.gross_amount)
+
+            # Calcula retenções
+            inss_amount = round(gross_amount * (config.inss_rate / 100), 2) if config.apply_inss else Decimal(0)
+            ir_amount = round(gross_amount * (config.ir_rate / 100), 2) if config.apply_ir else Decimal(0)
+            iss_amount = round(gross_amount * (config.iss_rate / 100), 2) if config.apply_iss else Decimal(0)
+            other_deductions = config.other_deductions or Decimal(0)
+
+            # Valor líquido
+            net_amount = gross_amount - inss_amount - ir_amount - iss_amount - other_deductions
+
+            # Verifica valor mínimo
+            if config.minimum_amount and net_amount < config.minimum_amount:
+                skipped[professional_id] = (
+                    f"Valor líquido ({net_amount}) é menor que o valor mínimo configurado ({config.minimum_amount})"
+                )
+                continue
+
+            fee_rows.append({
+                "id": uuid.uuid4(),
+                "healthcare_professional_id": professional_id,
+                "reference_month": reference_month,
+                "reference_year": reference_year,
+                "period_start": period_start,
+                "period_end": period_end,
+                "gross_amount": gross_amount,
+                "inss_amount": inss_amount,
+                "ir_amount": ir_amount,
+                "iss_amount": iss_amount,
+                "other_deductions": other_deductions,
+                "net_amount": net_amount,
+                "total_appointments": row.total_appointments,
+                "total_revenue": row.total_revenue,
+                "status": PaymentStatus.PENDING,
+                "is_deleted": False,
+                "created_at": now,
+                "updated_at": now
+            })
+
+        if not fee_rows:
+            return [], skipped
+
+        for fee_row, fee_number in zip(fee_rows, financial_service.generate_invoice_numbers(len(fee_rows), prefix="REP")):
+            fee_row["fee_number"] = fee_number
+
+        db.execute(insert(ProfessionalFee), fee_rows)
+
+        # Itens de todos os repasses em um único INSERT ... SELECT
+        fee_ids = [fee_row["id"] for fee_row in fee_rows]
+        items_select = select(
+            func.gen_random_uuid(),
+            ProfessionalFee.id,
+            AccountReceivable.id,
+            AccountReceivable.appointment_id,
+            AccountReceivable.description,
+            AccountReceivable.paid_amount,
+            _fee_amount_expression(),
+            AccountReceivable.payment_date,
+            literal(now)
+        ).select_from(ProfessionalFee).join(
+            ProfessionalFeeConfiguration,
+            ProfessionalFeeConfiguration.healthcare_professional_id == ProfessionalFee.healthcare_professional_id
+        ).join(
+            AccountReceivable,
+            AccountReceivable.healthcare_professional_id == ProfessionalFee.healthcare_professional_id
+        ).where(
+            ProfessionalFee.id.in_(fee_ids),
+            *_paid_in_period_filters(period_start, period_end)
+        )
+
+        db.execute(
+            insert(ProfessionalFeeItem).from_select(
+                [
+                    "id", "professional_fee_id", "account_receivable_id", "appointment_id",
+                    "description", "service_amount", "fee_amount", "service_date", "created_at"
+                ],
+                items_select
+            )
+        )
+
+        fee_summary_service.refresh(
+            db,
+            [(fee_row["healthcare_professional_id"], reference_year, reference_month) for fee_row in fee_rows]
+        )
+
+        return fee_ids, skipped
+
+
+# Singleton
+professional_fee_service = ProfessionalFeeService()
@@ -8,8 +8,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 import logging
 import asyncio
+import time
 
 from app.core.database import get_db
+from app.core.metrics import REMINDER_BACKLOG, REMINDER_LAST_RUN, REMINDER_RUN_DURATION
 from app.models.appointment import Appointment
 from app.models.patient import Patient
 from app.models.user import User
@@ -44,14 +46,17 @@ class ReminderScheduler:
     
     def check_and_send_reminders(self):
         logger.info("🔍 Verificando consultas...")
+        inicio = time.perf_counter()
         db = next(get_db())
         try:
-            self.send_24h_reminders(db)
-            self.send_1h_reminders(db)
+            REMINDER_BACKLOG.labels("24h").set(self.send_24h_reminders(db))
+            REMINDER_BACKLOG.labels("1h").set(self.send_1h_reminders(db))
         except Exception as e:
             logger.error(f"❌ Erro: {e}")
         finally:
             db.close()
+            REMINDER_RUN_DURATION.observe(time.perf_counter() - inicio)
+            REMINDER_LAST_RUN.set_to_current_time()
     
     def send_24h_reminders(self, db: Session):
         now = datetime.utcnow()
@@ -68,6 +73,8 @@ class ReminderScheduler:
         
         logger.info(f"📋 {len(appointments)} consultas para lembrete 24h")
         
+        # Envios que falharam: continuam pendentes para a próxima execução
+        pendentes = 0
         for apt in appointments:
             existing = db.query(Notification).filter(
                 and_(
@@ -114,7 +121,12 @@ class ReminderScheduler:
             
             db.add(notification)
             db.commit()
+            if not result['success']:
+                pendentes += 1
+                continue
             logger.info(f"✅ Lembrete 24h enviado")
+        
+        return pendentes
     
     def send_1h_reminders(self, db: Session):
         now = datetime.utcnow()
@@ -131,6 +143,8 @@ class ReminderScheduler:
         
         logger.info(f"📋 {len(appointments)} consultas para lembrete 1h")
         
+        # Envios que falharam: continuam pendentes para a próxima execução
+        pendentes = 0
         for apt in appointments:
             existing = db.query(Notification).filter(
                 and_(
@@ -177,6 +191,11 @@ class ReminderScheduler:
             
             db.add(notification)
             db.commit()
+            if not result['success']:
+                pendentes += 1
+                continue
             logger.info(f"✅ Lembrete 1h enviado")
+        
+        return pendentes
 
 reminder_scheduler = ReminderScheduler()
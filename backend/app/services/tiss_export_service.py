@@ -0,0 +1,272 @@
+"""
+Serviço de Exportação TISS em Lote
+Gera o XML de vários lotes de uma competência em paralelo (ProcessPoolExecutor)
+
+O job roda no worker que o criou; o estado é gravado em
+TISS_EXPORT_DIR/jobs/<job_id>.json a cada mudança, então qualquer worker
+do mesmo servidor (ou com TISS_EXPORT_DIR compartilhado) responde ao
+acompanhamento. Um job interrompido por reinício do worker fica com o
+último estado gravado.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.tiss import TISSLote
+from app.services.tiss_xml_generator import salvar_xml_lote_arquivo
+
+logger = logging.getLogger(__name__)
+
+# Jobs finalizados mantidos em memória para consulta de status
+MAX_JOBS_FINALIZADOS = 100
+
+# Recebe (db, lote_id) e devolve (lote_data com guias em lista, nome do arquivo)
+CarregarLote = Callable[[Session, str], Tuple[dict, str]]
+
+
+class TISSExportService:
+    """
+    Orquestra jobs de exportação de XML TISS
+
+    A leitura do banco acontece em uma thread do próprio processo; a
+    serialização de cada lote (parte CPU-bound) roda em processos
+    separados, que gravam o arquivo direto no disco.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.workers = settings.TISS_EXPORT_WORKERS or os.cpu_count() or 1
+
+    def _obter_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: o processo da API já tem threads (scheduler, jobs)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    @staticmethod
+    def _caminho_estado(job_id: str) -> str:
+        return os.path.join(settings.TISS_EXPORT_DIR, "jobs", f"{job_id}.json")
+
+    def _persistir(self, job: dict):
+        """Grava o estado do job (chamar com o lock)"""
+        caminho = self._caminho_estado(job["job_id"])
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.part"
+            with open(temporario, "w") as destino:
+                json.dump(job, destino, default=lambda valor: valor.isoformat())
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.error(f"Erro ao gravar estado da exportação TISS {job['job_id']}: {str(e)}")
+
+    def criar_job(self, competencia: str, operadora_ids: List[str], lotes: List[dict]) -> dict:
+        """
+        Registra um job de exportação
+
+        Args:
+            lotes: dicts com lote_id, numero_lote e operadora_nome
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "status": "pendente",
+            "competencia": competencia,
+            "operadora_ids": [str(operadora_id) for operadora_id in operadora_ids],
+            "diretorio": os.path.join(settings.TISS_EXPORT_DIR, competencia.replace("/", ""), job_id),
+            "total_lotes": len(lotes),
+            "lotes_processados": 0,
+            "lotes_com_erro": 0,
+            "arquivos": [
+                {
+                    "lote_id": str(lote["lote_id"]),
+                    "numero_lote": lote.get("numero_lote"),
+                    "operadora_nome": lote.get("operadora_nome"),
+                    "status": "pendente",
+                }
+                for lote in lotes
+            ],
+            "criado_em": datetime.utcnow(),
+            "iniciado_em": None,
+            "concluido_em": None,
+            "erro": None,
+        }
+
+        with self._lock:
+            self._descartar_jobs_antigos()
+            self._jobs[job_id] = job
+            self._persistir(job)
+        return copy.deepcopy(job)
+
+    def iniciar(self, job_id: str, carregar_lote: CarregarLote, pretty: bool = False):
+        """Executa o job em segundo plano"""
+        thread = threading.Thread(
+            target=self._executar,
+            args=(job_id, carregar_lote, pretty),
+            name=f"tiss-export-{job_id}",
+            daemon=True
+        )
+        thread.start()
+
+    def obter_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return copy.deepcopy(job)
+
+        # Job de outro worker: estado gravado em disco
+        try:
+            uuid.UUID(job_id)
+            with open(self._caminho_estado(job_id)) as origem:
+                return json.load(origem)
+        except (ValueError, OSError):
+            return None
+
+    def desligar(self):
+        """Encerra o pool de processos (shutdown da aplicação)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _descartar_jobs_antigos(self):
+        finalizados = [
+            job for job in self._jobs.values()
+            if job["concluido_em"] is not None
+        ]
+        excedentes = len(finalizados) - MAX_JOBS_FINALIZADOS + 1
+        if excedentes > 0:
+            finalizados.sort(key=lambda job: job["concluido_em"])
+            for job in finalizados[:excedentes]:
+                del self._jobs[job["job_id"]]
+                try:
+                    os.remove(self._caminho_estado(job["job_id"]))
+                except OSError:
+                    pass
+
+    def _atualizar(self, job_id: str, **campos):
+        with self._lock:
+            self._jobs[job_id].update(campos)
+            self._persistir(self._jobs[job_id])
+
+    def _finalizar_arquivo(self, job_id: str, arquivo: dict, **campos):
+        with self._lock:
+            job = self._jobs[job_id]
+            arquivo.update(campos)
+            job["lotes_processados"] += 1
+            if arquivo["status"] == "erro":
+                job["lotes_com_erro"] += 1
+            self._persistir(job)
+
+    def _executar(self, job_id: str, carregar_lote: CarregarLote, pretty: bool):
+        self._atualizar(job_id, status="processando", iniciado_em=datetime.utcnow())
+
+        with self._lock:
+            job = self._jobs[job_id]
+            diretorio = job["diretorio"]
+            arquivos = job["arquivos"]
+
+        db = SessionLocal()
+        try:
+            executor = self._obter_executor()
+            # Limita lotes já carregados aguardando processamento (memória)
+            limite_pendentes = self.workers * 2
+            pendentes = {}
+
+            for arquivo in arquivos:
+                try:
+                    lote_data, filename = carregar_lote(db, arquivo["lote_id"])
+                except Exception as e:
+                    # Erro de banco deixa a transação abortada: sem rollback
+                    # todos os lotes seguintes falhariam (PendingRollbackError)
+                    db.rollback()
+                    detalhe = getattr(e, "detail", None) or str(e)
+                    self._finalizar_arquivo(job_id, arquivo, status="erro", erro=detalhe)
+                    continue
+
+                caminho = os.path.join(diretorio, filename)
+                future = executor.submit(salvar_xml_lote_arquivo, lote_data, caminho, pretty)
+                pendentes[future] = (arquivo, filename, caminho, lote_data["quantidade_guias"])
+
+                if len(pendentes) >= limite_pendentes:
+                    self._coletar(job_id, pendentes)
+
+            while pendentes:
+                self._coletar(job_id, pendentes)
+
+            # Caminho do arquivo gerado fica registrado no lote
+            gerados = [
+                {"id": uuid.UUID(arquivo["lote_id"]), "arquivo_xml_path": arquivo["caminho"]}
+                for arquivo in arquivos
+                if arquivo["status"] == "gerado"
+            ]
+            if gerados:
+                db.execute(update(TISSLote), gerados)
+                db.commit()
+
+            with self._lock:
+                job = self._jobs[job_id]
+                job["status"] = "concluido_com_erros" if job["lotes_com_erro"] else "concluido"
+                job["concluido_em"] = datetime.utcnow()
+                self._persistir(job)
+
+            logger.info(f"Exportação TISS {job_id} concluída: {len(gerados)} arquivos em {diretorio}")
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro na exportação TISS {job_id}: {str(e)}")
+            self._atualizar(job_id, status="erro", erro=str(e), concluido_em=datetime.utcnow())
+        finally:
+            db.close()
+
+    def _coletar(self, job_id: str, pendentes: dict):
+        """Aguarda ao menos um lote terminar e registra o resultado"""
+        concluidos, _ = wait(list(pendentes), return_when=FIRST_COMPLETED)
+        for future in concluidos:
+            arquivo, filename, caminho, quantidade_guias = pendentes.pop(future)
+            try:
+                tamanho = future.result()
+            except Exception as e:
+                logger.error(f"Erro ao gerar XML do lote {arquivo['lote_id']}: {str(e)}")
+                # Processo interrompido (BrokenProcessPool) não chega a limpar o temporário
+                _remover_temporario(caminho)
+                self._finalizar_arquivo(job_id, arquivo, status="erro", erro=str(e))
+                continue
+
+            self._finalizar_arquivo(
+                job_id,
+                arquivo,
+                status="gerado",
+                filename=filename,
+                caminho=caminho,
+                tamanho_bytes=tamanho,
+                quantidade_guias=quantidade_guias
+            )
+
+
+def _remover_temporario(caminho: str):
+    try:
+        os.remove(f"{caminho}.part")
+    except OSError:
+        pass
+
+
+# Singleton
+tiss_export_service = TISSExportService()
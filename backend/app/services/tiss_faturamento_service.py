@@ -0,0 +1,153 @@
+"""
+Serviço de Consolidação do Faturamento TISS
+Resumo por operadora/competência/procedimento/profissional usado nas análises de glosa
+"""
+from typing import Iterable
+
+from sqlalchemy import Date, Integer, and_, case, cast, delete, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.tiss import TISSFaturamentoResumo, TISSGuia, TISSLote, TISSProcedimento
+
+RESUMO_COLUMNS = [
+    "id", "organization_id", "operadora_id", "competencia", "ano", "mes",
+    "codigo_procedimento", "profissional", "descricao_procedimento",
+    "quantidade_procedimentos", "quantidade_glosados",
+    "valor_informado", "valor_glosa", "valor_aceito",
+    "quantidade_pagos", "dias_ate_pagamento", "updated_at",
+]
+
+CHAVE_COLUMNS = ("id", "organization_id", "operadora_id", "competencia", "codigo_procedimento", "profissional")
+
+
+class TISSFaturamentoService:
+    """Mantém a tabela tiss_faturamento_resumo"""
+
+    def _aggregate_select(self):
+        """Agregação dos procedimentos de lotes já fechados"""
+        lote = TISSLote
+        guia = TISSGuia
+        proc = TISSProcedimento
+
+        profissional = func.coalesce(
+            func.nullif(proc.nome_profissional_executante, ""),
+            guia.nome_profissional,
+            literal("")
+        )
+        glosa = func.coalesce(proc.valor_glosa, 0)
+        pago = and_(lote.data_pagamento.isnot(None), lote.data_envio.isnot(None))
+        # date - date no Postgres resulta em dias (inteiro)
+        dias = cast(lote.data_pagamento - cast(lote.data_envio, Date), Integer)
+
+        return select(
+            func.gen_random_uuid(),
+            lote.organization_id,
+            lote.operadora_id,
+            lote.competencia,
+            cast(func.split_part(lote.competencia, "/", 2), Integer),
+            cast(func.split_part(lote.competencia, "/", 1), Integer),
+            proc.codigo_procedimento,
+            profissional,
+            func.max(proc.descricao_procedimento),
+            func.count(proc.id),
+            func.count(proc.id).filter(glosa > 0),
+            func.coalesce(func.sum(proc.valor_total_informado), 0),
+            func.coalesce(func.sum(glosa), 0),
+            func.coalesce(func.sum(func.coalesce(proc.valor_liberado, proc.valor_total_informado - glosa)), 0),
+            func.count(proc.id).filter(pago),
+            func.coalesce(func.sum(case((pago, dias), else_=0)), 0),
+            func.localtimestamp(),
+        ).select_from(proc).join(
+            guia, guia.id == proc.guia_id
+        ).join(
+            lote, lote.id == guia.lote_id
+        ).where(
+            proc.deleted_at.is_(None),
+            guia.deleted_at.is_(None),
+            lote.deleted_at.is_(None),
+            lote.status != "rascunho",
+        ).group_by(
+            lote.organization_id,
+            lote.operadora_id,
+            lote.competencia,
+            proc.codigo_procedimento,
+            profissional,
+        )
+
+    def _upsert(self, db: Session, source):
+        stmt = pg_insert(TISSFaturamentoResumo).from_select(RESUMO_COLUMNS, source)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_tiss_faturamento_resumo",
+            set_={
+                column: stmt.excluded[column]
+                for column in RESUMO_COLUMNS
+                if column not in CHAVE_COLUMNS
+            }
+        )
+        db.execute(stmt)
+
+    def atualizar_lotes(self, db: Session, lote_ids: Iterable) -> None:
+        """
+        Recalcula o resumo das competências/operadoras dos lotes informados
+
+        Não faz commit: deve rodar na mesma transação que alterou os lotes
+        (após flush). Linhas da partição que não foram regravadas pelo
+        upsert deixaram de existir na origem e são removidas.
+        """
+        lote_ids = list(set(lote_ids))
+        if not lote_ids:
+            return
+
+        lote = TISSLote
+        resumo = TISSFaturamentoResumo
+
+        chaves = db.query(
+            lote.organization_id, lote.operadora_id, lote.competencia
+        ).filter(
+            lote.id.in_(lote_ids)
+        ).distinct().all()
+        if not chaves:
+            return
+        chaves = [tuple(chave) for chave in chaves]
+
+        self._upsert(
+            db,
+            self._aggregate_select().where(
+                tuple_(lote.organization_id, lote.operadora_id, lote.competencia).in_(chaves)
+            )
+        )
+
+        db.execute(
+            delete(resumo).where(
+                tuple_(resumo.organization_id, resumo.operadora_id, resumo.competencia).in_(chaves),
+                resumo.updated_at < func.localtimestamp()
+            ).execution_options(synchronize_session=False)
+        )
+
+    def reconstruir(self, db: Session, organization_id) -> int:
+        """
+        Reconstrói o resumo da organização a partir dos lotes
+
+        Returns:
+            Número de linhas de resumo após a reconstrução
+        """
+        resumo = TISSFaturamentoResumo
+
+        db.execute(
+            delete(resumo).where(
+                resumo.organization_id == organization_id
+            ).execution_options(synchronize_session=False)
+        )
+        self._upsert(
+            db,
+            self._aggregate_select().where(TISSLote.organization_id == organization_id)
+        )
+
+        return db.query(func.count(resumo.id)).filter(
+            resumo.organization_id == organization_id
+        ).scalar()
+
+
+# Singleton
+tiss_faturamento_service = TISSFaturamentoService()
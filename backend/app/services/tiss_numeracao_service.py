@@ -0,0 +1,104 @@
+"""
+Serviço de Numeração Sequencial TISS
+Contadores por organização para números de lote e de guia
+"""
+from typing import List
+
+from sqlalchemy import Integer, cast, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.tiss import TISSGuia, TISSLote, TISSNumeracao
+
+
+class TISSNumeracaoService:
+    """
+    Reserva números em tiss_numeracao com UPDATE ... RETURNING
+
+    O incremento bloqueia a linha do contador até o commit da transação,
+    então duas criações simultâneas nunca recebem o mesmo número, e um
+    rollback devolve a faixa reservada.
+    """
+
+    def _ultimo_existente(self, db: Session, tipo: str, organization_id, escopo: str) -> int:
+        """Maior sequencial já usado (só na criação do contador)"""
+        if tipo == "lote":
+            coluna = TISSLote.numero_lote
+            filtros = [
+                TISSLote.organization_id == organization_id,
+                TISSLote.competencia == escopo,
+            ]
+            prefixo = f"LOTE-{escopo.replace('/', '')}-"
+        else:
+            coluna = TISSGuia.numero_guia_prestador
+            filtros = [TISSGuia.organization_id == organization_id]
+            prefixo = f"GUIA-{escopo}-"
+
+        sequencial = cast(func.substring(coluna, r"(\d+)$"), Integer)
+        return db.query(
+            func.coalesce(func.max(sequencial), 0)
+        ).filter(
+            coluna.like(f"{prefixo}%"),
+            *filtros
+        ).scalar()
+
+    def reservar(self, db: Session, tipo: str, organization_id, escopo: str, quantidade: int = 1) -> int:
+        """
+        Reserva uma faixa de números consecutivos
+
+        Args:
+            tipo: "lote" ou "guia"
+            escopo: competência (lotes) ou ano (guias)
+            quantidade: tamanho da faixa (criação em lote)
+
+        Returns:
+            Primeiro número da faixa
+        """
+        tabela = TISSNumeracao
+
+        ultimo = db.execute(
+            update(tabela).where(
+                tabela.organization_id == organization_id,
+                tabela.tipo == tipo,
+                tabela.escopo == escopo
+            ).values(
+                ultimo_numero=tabela.ultimo_numero + quantidade
+            ).returning(tabela.ultimo_numero)
+        ).scalar()
+
+        if ultimo is None:
+            # Primeiro uso do contador: parte do maior número existente.
+            # ON CONFLICT cobre outra transação criando o mesmo contador.
+            inicial = self._ultimo_existente(db, tipo, organization_id, escopo)
+            stmt = pg_insert(tabela).from_select(
+                ["id", "organization_id", "tipo", "escopo", "ultimo_numero"],
+                select(
+                    func.gen_random_uuid(),
+                    literal(organization_id, tabela.organization_id.type),
+                    literal(tipo),
+                    literal(escopo),
+                    literal(inicial + quantidade)
+                )
+            )
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_tiss_numeracao",
+                set_={"ultimo_numero": tabela.ultimo_numero + quantidade}
+            ).returning(tabela.ultimo_numero)
+            ultimo = db.execute(stmt).scalar()
+
+        return ultimo - quantidade + 1
+
+    def numeros_lote(self, db: Session, organization_id, competencia: str, quantidade: int = 1) -> List[str]:
+        """Formato: LOTE-AAAAMM-XXX (Ex: LOTE-202411-001)"""
+        ano_mes = competencia.replace("/", "")
+        primeiro = self.reservar(db, "lote", organization_id, competencia, quantidade)
+        return [f"LOTE-{ano_mes}-{str(n).zfill(3)}" for n in range(primeiro, primeiro + quantidade)]
+
+    def numeros_guia(self, db: Session, organization_id, ano: int, quantidade: int = 1) -> List[str]:
+        """Formato: GUIA-AAAA-XXXXXX (Ex: GUIA-2024-000001)"""
+        primeiro = self.reservar(db, "guia", organization_id, str(ano), quantidade)
+        return [f"GUIA-{ano}-{str(n).zfill(6)}" for n in range(primeiro, primeiro + quantidade)]
+
+
+# Singleton
+tiss_numeracao_service = TISSNumeracaoService()
@@ -1,105 +1,216 @@
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom import minidom
-from typing import List
+from xml.sax.saxutils import escape, quoteattr
+from typing import BinaryIO, Dict, Iterator, List, Optional
 from decimal import Decimal
 from datetime import date
+import os
 import uuid
 
+
+class XMLStreamWriter:
+    """
+    Escritor XML incremental (estilo xmlwriter)
+    
+    Acumula o texto em um buffer pequeno e entrega blocos de bytes
+    assim que o buffer passa de chunk_size, sem montar árvore em memória.
+    """
+    
+    def __init__(self, pretty: bool = False, indent: str = "  ", chunk_size: int = 64 * 1024):
+        self.pretty = pretty
+        self.indent = indent
+        self.chunk_size = chunk_size
+        self._buffer: List[str] = []
+        self._size = 0
+        self._depth = 0
+    
+    def _write(self, text: str):
+        self._buffer.append(text)
+        self._size += len(text)
+    
+    def _newline(self):
+        if self.pretty:
+            self._write("\n" + self.indent * self._depth)
+    
+    def declaration(self):
+        self._write('<?xml version="1.0" encoding="UTF-8"?>')
+    
+    def start(self, tag: str, attrs: Optional[Dict[str, str]] = None):
+        self._newline()
+        attributes = "".join(f" {name}={quoteattr(value)}" for name, value in (attrs or {}).items())
+        self._write(f"<{tag}{attributes}>")
+        self._depth += 1
+    
+    def end(self, tag: str):
+        self._depth -= 1
+        self._newline()
+        self._write(f"</{tag}>")
+    
+    def element(self, tag: str, text=None):
+        self._newline()
+        text = "" if text is None else str(text)
+        if text:
+            self._write(f"<{tag}>{escape(text)}</{tag}>")
+        else:
+            self._write(f"<{tag}/>")
+    
+    def end_document(self):
+        if self.pretty:
+            self._write("\n")
+    
+    def pending(self) -> bool:
+        return self._size >= self.chunk_size
+    
+    def flush(self) -> bytes:
+        data = "".join(self._buffer).encode("utf-8")
+        self._buffer = []
+        self._size = 0
+        return data
+
+
 class TISSXMLGenerator:
     """Gerador de arquivos XML padrão TISS ANS"""
     
     def __init__(self):
         self.versao_tiss = "4.03.00"
-        
-    def gerar_xml_lote(self, lote_data: dict) -> str:
+    
+    def gerar_xml_lote(self, lote_data: dict, pretty: bool = True) -> str:
         """Gera XML completo do lote TISS"""
+        return b"".join(self.gerar_xml_lote_stream(lote_data, pretty=pretty)).decode("utf-8")
+    
+    def gerar_xml_lote_stream(
+        self,
+        lote_data: dict,
+        pretty: bool = False,
+        chunk_size: int = 64 * 1024
+    ) -> Iterator[bytes]:
+        """
+        Gera o XML do lote em blocos de bytes
+        
+        lote_data["guias"] pode ser qualquer iterável (inclusive um gerador
+        lendo do banco): cada guia é escrita e descartada, então a memória
+        fica constante independente do tamanho do lote. Os blocos podem ir
+        direto para um StreamingResponse ou para um arquivo.
+        """
+        writer = XMLStreamWriter(pretty=pretty, chunk_size=chunk_size)
+        writer.declaration()
         
         # Elemento raiz
-        root = Element("ans:mensagemTISS", {
+        writer.start("ans:mensagemTISS", {
             "xmlns:ans": "http://www.ans.gov.br/padroes/tiss/schemas",
             "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
             "xsi:schemaLocation": "http://www.ans.gov.br/padroes/tiss/schemas mensagem.xsd"
         })
         
         # Cabeçalho
-        header = SubElement(root, "ans:cabecalho")
-        SubElement(header, "ans:identificacaoTransacao").text = str(uuid.uuid4())
-        SubElement(header, "ans:tipoTransacao").text = "ENVIO_LOTE_GUIAS"
-        SubElement(header, "ans:sequencialTransacao").text = lote_data.get("numero_lote", "1")
-        SubElement(header, "ans:dataRegistroTransacao").text = date.today().strftime("%Y-%m-%d")
-        SubElement(header, "ans:horaRegistroTransacao").text = date.today().strftime("%H:%M:%S")
+        writer.start("ans:cabecalho")
+        writer.element("ans:identificacaoTransacao", uuid.uuid4())
+        writer.element("ans:tipoTransacao", "ENVIO_LOTE_GUIAS")
+        writer.element("ans:sequencialTransacao", lote_data.get("numero_lote", "1"))
+        writer.element("ans:dataRegistroTransacao", date.today().strftime("%Y-%m-%d"))
+        writer.element("ans:horaRegistroTransacao", date.today().strftime("%H:%M:%S"))
         
         # Identificação do prestador
-        prestador = SubElement(header, "ans:prestador")
-        SubElement(prestador, "ans:codigoPrestadorNaOperadora").text = lote_data.get("prestador_codigo", "")
-        SubElement(prestador, "ans:nomeContratado").text = lote_data.get("prestador_nome", "")
+        writer.start("ans:prestador")
+        writer.element("ans:codigoPrestadorNaOperadora", lote_data.get("prestador_codigo", ""))
+        writer.element("ans:nomeContratado", lote_data.get("prestador_nome", ""))
+        writer.end("ans:prestador")
         
         # Versão TISS
-        SubElement(header, "ans:Padrao").text = self.versao_tiss
+        writer.element("ans:Padrao", self.versao_tiss)
+        writer.end("ans:cabecalho")
         
         # Corpo do lote
-        corpo = SubElement(root, "ans:prestadorParaOperadora")
-        lote_guias = SubElement(corpo, "ans:loteGuias")
+        writer.start("ans:prestadorParaOperadora")
+        writer.start("ans:loteGuias")
         
         # Número do lote
-        SubElement(lote_guias, "ans:numeroLote").text = lote_data.get("numero_lote", "")
+        writer.element("ans:numeroLote", lote_data.get("numero_lote", ""))
         
         # Operadora
-        operadora = SubElement(lote_guias, "ans:dadosOperadora")
-        SubElement(operadora, "ans:codigoOperadoraNaANS").text = lote_data.get("operadora_codigo", "")
-        SubElement(operadora, "ans:nomeOperadora").text = lote_data.get("operadora_nome", "")
+        writer.start("ans:dadosOperadora")
+        writer.element("ans:codigoOperadoraNaANS", lote_data.get("operadora_codigo", ""))
+        writer.element("ans:nomeOperadora", lote_data.get("operadora_nome", ""))
+        writer.end("ans:dadosOperadora")
         
         # Guias
-        guias_element = SubElement(lote_guias, "ans:guias")
+        writer.start("ans:guias")
         
         for guia in lote_data.get("guias", []):
-            self._adicionar_guia_consulta(guias_element, guia)
+            self._escrever_guia_consulta(writer, guia)
+            if writer.pending():
+                yield writer.flush()
+        
+        writer.end("ans:guias")
         
         # Totalizadores
-        SubElement(lote_guias, "ans:valorTotalLote").text = str(lote_data.get("valor_total_lote", "0.00"))
-        SubElement(lote_guias, "ans:quantidadeGuias").text = str(lote_data.get("quantidade_guias", "0"))
+        writer.element("ans:valorTotalLote", lote_data.get("valor_total_lote", "0.00"))
+        writer.element("ans:quantidadeGuias", lote_data.get("quantidade_guias", "0"))
         
         # Hash do lote
-        SubElement(lote_guias, "ans:hashLote").text = self._gerar_hash_lote(lote_data)
+        writer.element("ans:hashLote", self._gerar_hash_lote(lote_data))
+        
+        writer.end("ans:loteGuias")
+        writer.end("ans:prestadorParaOperadora")
+        writer.end("ans:mensagemTISS")
         
-        # Converter para string XML formatada
-        xml_string = self._prettify_xml(root)
-        return xml_string
+        writer.end_document()
+        
+        yield writer.flush()
+    
+    def salvar_xml_lote(self, lote_data: dict, destino: BinaryIO, pretty: bool = False) -> int:
+        """
+        Grava o XML do lote em um arquivo binário aberto, bloco a bloco
+        
+        Returns:
+            Total de bytes escritos
+        """
+        total = 0
+        for chunk in self.gerar_xml_lote_stream(lote_data, pretty=pretty):
+            destino.write(chunk)
+            total += len(chunk)
+        return total
     
-    def _adicionar_guia_consulta(self, parent: Element, guia: dict):
-        """Adiciona guia de consulta ao XML"""
-        guia_consulta = SubElement(parent, "ans:guiaConsulta")
+    def _escrever_guia_consulta(self, writer: XMLStreamWriter, guia: dict):
+        """Escreve guia de consulta no XML"""
+        writer.start("ans:guiaConsulta")
         
         # Cabeçalho da guia
-        cabecalho = SubElement(guia_consulta, "ans:cabecalhoGuia")
-        SubElement(cabecalho, "ans:registroANS").text = guia.get("codigo_operadora", "")
-        SubElement(cabecalho, "ans:numeroGuiaPrestador").text = guia.get("numero_guia", "")
+        writer.start("ans:cabecalhoGuia")
+        writer.element("ans:registroANS", guia.get("codigo_operadora", ""))
+        writer.element("ans:numeroGuiaPrestador", guia.get("numero_guia", ""))
+        writer.end("ans:cabecalhoGuia")
         
         # Dados do beneficiário
-        beneficiario = SubElement(guia_consulta, "ans:dadosBeneficiario")
-        SubElement(beneficiario, "ans:numeroCarteira").text = guia.get("numero_carteira", "")
-        SubElement(beneficiario, "ans:nomeBeneficiario").text = guia.get("nome_beneficiario", "")
+        writer.start("ans:dadosBeneficiario")
+        writer.element("ans:numeroCarteira", guia.get("numero_carteira", ""))
+        writer.element("ans:nomeBeneficiario", guia.get("nome_beneficiario", ""))
+        writer.end("ans:dadosBeneficiario")
         
         # Dados do contratado executante
-        contratado = SubElement(guia_consulta, "ans:dadosContratadoExecutante")
-        SubElement(contratado, "ans:codigoPrestadorNaOperadora").text = guia.get("codigo_prestador", "")
-        SubElement(contratado, "ans:nomeContratado").text = guia.get("nome_prestador", "")
+        writer.start("ans:dadosContratadoExecutante")
+        writer.element("ans:codigoPrestadorNaOperadora", guia.get("codigo_prestador", ""))
+        writer.element("ans:nomeContratado", guia.get("nome_prestador", ""))
+        writer.end("ans:dadosContratadoExecutante")
         
         # Dados do atendimento
-        atendimento = SubElement(guia_consulta, "ans:dadosAtendimento")
-        SubElement(atendimento, "ans:tipoConsulta").text = "1"  # 1=Primeira Consulta
-        SubElement(atendimento, "ans:dataAtendimento").text = guia.get("data_realizacao", "")
+        writer.start("ans:dadosAtendimento")
+        writer.element("ans:tipoConsulta", "1")  # 1=Primeira Consulta
+        writer.element("ans:dataAtendimento", guia.get("data_realizacao", ""))
+        writer.end("ans:dadosAtendimento")
         
         # Procedimentos
-        procedimentos = SubElement(guia_consulta, "ans:procedimentosExecutados")
-        proc = SubElement(procedimentos, "ans:procedimento")
-        SubElement(proc, "ans:codigoProcedimento").text = guia.get("codigo_procedimento", "")
-        SubElement(proc, "ans:descricaoProcedimento").text = guia.get("descricao_procedimento", "")
-        SubElement(proc, "ans:valorProcedimento").text = str(guia.get("valor_procedimento", "0.00"))
+        writer.start("ans:procedimentosExecutados")
+        writer.start("ans:procedimento")
+        writer.element("ans:codigoProcedimento", guia.get("codigo_procedimento", ""))
+        writer.element("ans:descricaoProcedimento", guia.get("descricao_procedimento", ""))
+        writer.element("ans:valorProcedimento", guia.get("valor_procedimento", "0.00"))
+        writer.end("ans:procedimento")
+        writer.end("ans:procedimentosExecutados")
         
         # Valor total
-        SubElement(guia_consulta, "ans:valorTotal").text = str(guia.get("valor_total", "0.00"))
-        SubElement(guia_consulta, "ans:dataEmissao").text = guia.get("data_emissao", "")
+        writer.element("ans:valorTotal", guia.get("valor_total", "0.00"))
+        writer.element("ans:dataEmissao", guia.get("data_emissao", ""))
+        
+        writer.end("ans:guiaConsulta")
     
     def _gerar_hash_lote(self, lote_data: dict) -> str:
         """Gera hash do lote para validação"""
@@ -107,13 +218,34 @@ class TISSXMLGenerator:
         conteudo = f"{lote_data.get('numero_lote', '')}{lote_data.get('valor_total_lote', '')}"
         return hashlib.md5(conteudo.encode()).hexdigest()[:16]
     
-    def _prettify_xml(self, elem: Element) -> str:
-        """Formata XML de forma legível"""
-        rough_string = tostring(elem, encoding='unicode', method='xml')
-        reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent="  ", encoding="UTF-8").decode('utf-8')
-    
     def gerar_nome_arquivo(self, operadora_codigo: str, numero_lote: str) -> str:
         """Gera nome padrão do arquivo XML"""
         data_str = date.today().strftime("%Y%m%d")
         return f"TISS_{operadora_codigo}_{numero_lote}_{data_str}.xml"
+
+
+def salvar_xml_lote_arquivo(lote_data: dict, caminho: str, pretty: bool = False) -> int:
+    """
+    Gera o XML do lote direto em um arquivo no disco
+    
+    Função de módulo para poder rodar em um ProcessPoolExecutor: recebe
+    apenas dados serializáveis e grava em um arquivo temporário que só é
+    renomeado para o nome final ao terminar.
+    
+    Returns:
+        Total de bytes escritos
+    """
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.part"
+    
+    try:
+        with open(temporario, "wb") as destino:
+            total = TISSXMLGenerator().salvar_xml_lote(lote_data, destino, pretty=pretty)
+        os.replace(temporario, caminho)
+    except BaseException:
+        # Lote com erro não deixa arquivo parcial no diretório do job
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    
+    return total
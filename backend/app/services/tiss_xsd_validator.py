@@ -0,0 +1,96 @@
+"""
+Validação de XML TISS contra os schemas XSD da ANS
+O schema é compilado uma única vez por processo e reaproveitado
+"""
+from typing import BinaryIO, Dict, List, Optional, Union
+from xml.etree.ElementTree import ParseError
+import logging
+import os
+import threading
+
+import xmlschema
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Schemas da ANS distribuídos junto com o backend
+XSD_DIR_PADRAO = os.path.join(os.path.dirname(os.path.dirname(__file__)), "resources", "tiss", "xsd")
+XSD_PRINCIPAL = "tissV4_03_00.xsd"
+
+
+class TISSSchemaIndisponivel(Exception):
+    """Arquivos XSD da ANS não encontrados no diretório configurado"""
+
+
+class TISSXSDValidator:
+    """Validador de documentos TISS 4.03 (XSD 1.0)"""
+
+    def __init__(self, diretorio: Optional[str] = None, arquivo: str = XSD_PRINCIPAL):
+        self.diretorio = diretorio or settings.TISS_XSD_DIR or XSD_DIR_PADRAO
+        self.arquivo = arquivo
+        self._schema: Optional[xmlschema.XMLSchema10] = None
+        self._lock = threading.Lock()
+
+    @property
+    def caminho_schema(self) -> str:
+        return os.path.join(self.diretorio, self.arquivo)
+
+    def carregar_schema(self) -> xmlschema.XMLSchema10:
+        """
+        Compila o schema (com includes/imports locais) na primeira chamada
+
+        allow="sandbox" impede que imports saiam do diretório dos XSDs,
+        então nada é buscado na rede.
+        """
+        if self._schema is not None:
+            return self._schema
+
+        with self._lock:
+            if self._schema is None:
+                if not os.path.isfile(self.caminho_schema):
+                    raise TISSSchemaIndisponivel(
+                        f"Schema TISS não encontrado em {self.caminho_schema}"
+                    )
+                self._schema = xmlschema.XMLSchema10(self.caminho_schema, allow="sandbox")
+                logger.info(f"Schema TISS compilado: {self.caminho_schema}")
+            return self._schema
+
+    def validar(self, fonte: Union[str, BinaryIO]) -> List[Dict]:
+        """
+        Valida um documento e retorna todos os erros encontrados
+
+        A leitura é lazy: o documento é percorrido elemento a elemento e
+        os trechos já validados são descartados, então arquivos grandes
+        não são carregados inteiros na memória.
+
+        Args:
+            fonte: caminho do arquivo ou arquivo binário aberto
+
+        Returns:
+            Lista de erros com mensagem, caminho (XPath) e linha
+        """
+        schema = self.carregar_schema()
+
+        erros = []
+        try:
+            recurso = xmlschema.XMLResource(fonte, lazy=True)
+            for erro in schema.iter_errors(recurso):
+                erros.append({
+                    "mensagem": erro.reason or erro.message,
+                    "caminho": erro.path,
+                    "linha": erro.sourceline,
+                })
+        except (ParseError, xmlschema.XMLResourceError) as e:
+            # XML mal formado: não há como continuar a validação
+            erros.append({
+                "mensagem": f"XML mal formado: {str(e)}",
+                "caminho": None,
+                "linha": getattr(e, "position", (None,))[0],
+            })
+
+        return erros
+
+
+# Singleton
+tiss_xsd_validator = TISSXSDValidator()
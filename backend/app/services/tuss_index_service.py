@@ -0,0 +1,233 @@
+"""
+Índice em Memória das Tabelas de Referência TISS (TUSS/CBHPM)
+Busca por código exato, prefixo de código e palavras da descrição sem acento
+"""
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+import logging
+import re
+import time
+import unicodedata
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.data_versions import versao
+from app.models.tiss import TISSTabelaReferencia
+
+logger = logging.getLogger(__name__)
+
+# Colunas guardadas no índice (mesmos campos de TISSTabelaReferenciaResponse)
+COLUNAS = (
+    "id", "organization_id", "tipo_tabela", "codigo_tabela", "codigo", "descricao",
+    "valor_referencia", "valor_minimo", "valor_maximo",
+    "data_inicio_vigencia", "data_fim_vigencia",
+    "capitulo", "grupo", "subgrupo", "porte_anestesico", "observacoes", "ativo",
+    "created_at", "updated_at",
+)
+POS_TIPO = COLUNAS.index("tipo_tabela")
+POS_CODIGO_TABELA = COLUNAS.index("codigo_tabela")
+POS_CODIGO = COLUNAS.index("codigo")
+POS_DESCRICAO = COLUNAS.index("descricao")
+POS_ATIVO = COLUNAS.index("ativo")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalizar_tokens(texto: str) -> List[str]:
+    """Minúsculas, sem acento, separado em palavras"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _TOKEN.findall(texto.lower())
+
+
+class _IndiceOrganizacao:
+    """
+    Índice imutável de uma organização
+
+    Linhas ordenadas por código em uma tupla; códigos em lista paralela
+    (busca por prefixo com bisect); palavras da descrição em lista
+    ordenada com as posições das linhas em array('I').
+    """
+
+    __slots__ = ("linhas", "codigos", "tokens", "posicoes", "por_codigo", "versao", "criado_em")
+
+    def __init__(self, linhas: Iterable[tuple], versao: int = 0):
+        self.linhas = tuple(sorted(linhas, key=lambda linha: linha[POS_CODIGO]))
+        self.codigos = [linha[POS_CODIGO] for linha in self.linhas]
+        self.por_codigo = {
+            (linha[POS_TIPO], linha[POS_CODIGO]): posicao
+            for posicao, linha in enumerate(self.linhas)
+        }
+
+        indice_invertido: Dict[str, array] = {}
+        for posicao, linha in enumerate(self.linhas):
+            for token in set(normalizar_tokens(linha[POS_DESCRICAO])):
+                indice_invertido.setdefault(token, array("I")).append(posicao)
+
+        self.tokens = sorted(indice_invertido)
+        self.posicoes = [indice_invertido[token] for token in self.tokens]
+        self.versao = versao
+        self.criado_em = time.monotonic()
+
+    def _prefixo_codigo(self, prefixo: str) -> Set[int]:
+        encontrados = set()
+        posicao = bisect_left(self.codigos, prefixo)
+        while posicao < len(self.codigos) and self.codigos[posicao].startswith(prefixo):
+            encontrados.add(posicao)
+            posicao += 1
+        return encontrados
+
+    def _prefixo_token(self, prefixo: str) -> Set[int]:
+        encontrados = set()
+        posicao = bisect_left(self.tokens, prefixo)
+        while posicao < len(self.tokens) and self.tokens[posicao].startswith(prefixo):
+            encontrados.update(self.posicoes[posicao])
+            posicao += 1
+        return encontrados
+
+    def buscar(self, busca: str) -> List[int]:
+        """
+        Posições (em ordem de código) que casam com a busca
+
+        Casa se o código começa com o texto digitado ou se cada palavra
+        digitada é início de alguma palavra da descrição.
+        """
+        encontrados = self._prefixo_codigo(busca.strip())
+
+        tokens = normalizar_tokens(busca)
+        if tokens:
+            por_descricao = self._prefixo_token(tokens[0])
+            for token in tokens[1:]:
+                if not por_descricao:
+                    break
+                por_descricao &= self._prefixo_token(token)
+            encontrados |= por_descricao
+
+        return sorted(encontrados)
+
+
+class TUSSIndexService:
+    """Mantém um índice por organização, carregado do banco"""
+
+    def __init__(self):
+        self._indices: Dict[object, _IndiceOrganizacao] = {}
+
+    def _consulta(self, db: Session):
+        return db.query(
+            *[getattr(TISSTabelaReferencia, coluna) for coluna in COLUNAS]
+        ).filter(
+            TISSTabelaReferencia.deleted_at.is_(None)
+        )
+
+    def carregar(self, db: Session) -> int:
+        """
+        Monta os índices de todas as organizações (startup)
+
+        Returns:
+            Total de registros indexados
+        """
+        inicio = time.perf_counter()
+        versao_tabela = versao(db, TISSTabelaReferencia.__tablename__)
+        por_organizacao: Dict[object, List[tuple]] = {}
+        pos_organizacao = COLUNAS.index("organization_id")
+
+        for linha in self._consulta(db).yield_per(5000):
+            por_organizacao.setdefault(linha[pos_organizacao], []).append(tuple(linha))
+
+        self._indices = {
+            organization_id: _IndiceOrganizacao(linhas, versao_tabela)
+            for organization_id, linhas in por_organizacao.items()
+        }
+
+        total = sum(len(linhas) for linhas in por_organizacao.values())
+        logger.info(f"Índice TUSS carregado: {total} registros em {time.perf_counter() - inicio:.2f}s")
+        return total
+
+    def atualizar(self, db: Session, organization_id, versao_tabela: Optional[int] = None) -> None:
+        """Reconstrói o índice de uma organização (após importações e edições)"""
+        # Versão lida antes das linhas: o índice nunca fica com versão
+        # mais nova que o conteúdo (ETag de reference_cache)
+        if versao_tabela is None:
+            versao_tabela = versao(db, TISSTabelaReferencia.__tablename__)
+        linhas = self._consulta(db).filter(
+            TISSTabelaReferencia.organization_id == organization_id
+        ).all()
+        # Troca atômica: requisições em andamento continuam no índice antigo
+        self._indices[organization_id] = _IndiceOrganizacao((tuple(linha) for linha in linhas), versao_tabela)
+
+    def _obter(self, db: Session, organization_id, versao_tabela: Optional[int] = None) -> _IndiceOrganizacao:
+        indice = self._indices.get(organization_id)
+        # Alterações feitas por outros workers mudam a versão da tabela;
+        # o TTL cobre escritas feitas fora da aplicação. Endpoints com
+        # referencia_versionada passam a versão que já leram para o ETag
+        if versao_tabela is None:
+            versao_tabela = versao(db, TISSTabelaReferencia.__tablename__)
+        if (
+            indice is None
+            or indice.versao != versao_tabela
+            or time.monotonic() - indice.criado_em > settings.TUSS_INDEX_TTL_SECONDS
+        ):
+            self.atualizar(db, organization_id, versao_tabela)
+            indice = self._indices[organization_id]
+        return indice
+
+    def buscar_codigo(
+        self,
+        db: Session,
+        organization_id,
+        tipo_tabela: str,
+        codigo: str,
+        versao_tabela: Optional[int] = None
+    ) -> Optional[dict]:
+        """Procedimento ativo com o código exato"""
+        indice = self._obter(db, organization_id, versao_tabela)
+        posicao = indice.por_codigo.get((tipo_tabela, codigo))
+        if posicao is None:
+            return None
+
+        linha = indice.linhas[posicao]
+        if not linha[POS_ATIVO]:
+            return None
+        return dict(zip(COLUNAS, linha))
+
+    def listar(
+        self,
+        db: Session,
+        organization_id,
+        skip: int = 0,
+        limit: int = 100,
+        tipo_tabela: Optional[str] = None,
+        codigo_tabela: Optional[str] = None,
+        ativo: Optional[bool] = None,
+        busca: Optional[str] = None,
+        versao_tabela: Optional[int] = None
+    ) -> List[dict]:
+        """Mesmos filtros de listar_tabelas_referencia, ordenado por código"""
+        indice = self._obter(db, organization_id, versao_tabela)
+        posicoes = indice.buscar(busca) if busca else range(len(indice.linhas))
+
+        resultado = []
+        ignorar = skip
+        for posicao in posicoes:
+            linha = indice.linhas[posicao]
+            if tipo_tabela and linha[POS_TIPO] != tipo_tabela:
+                continue
+            if codigo_tabela and linha[POS_CODIGO_TABELA] != codigo_tabela:
+                continue
+            if ativo is not None and bool(linha[POS_ATIVO]) != ativo:
+                continue
+            if ignorar:
+                ignorar -= 1
+                continue
+
+            resultado.append(dict(zip(COLUNAS, linha)))
+            if len(resultado) >= limit:
+                break
+
+        return resultado
+
+
+# Singleton
+tuss_index_service = TUSSIndexService()
@@ -2,7 +2,7 @@
 Script para criar tabelas de repasse profissionais
 """
 from app.core.database import engine, Base
-from app.models.financial import ProfessionalFeeConfiguration, ProfessionalFee, ProfessionalFeeItem
+from app.models.financial import ProfessionalFeeConfiguration, ProfessionalFee, ProfessionalFeeItem, ProfessionalFeeMonthlySummary
 
 print("🚀 Criando tabelas de repasse profissionais...")
 
@@ -13,5 +13,6 @@ try:
     print("  - professional_fee_configurations")
     print("  - professional_fees")
     print("  - professional_fee_items")
+    print("  - professional_fee_monthly_summaries")
 except Exception as e:
     print(f"❌ Erro ao criar tabelas: {e}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark das listagens: resposta validada pelo FastAPI x FAST_JSON_RESPONSES
+
+Monta uma listagem de agendamentos (AppointmentListResponse) em memória,
+sem banco, e mede a requisição inteira pelo TestClient nos caminhos:
+
+- objetos: entidades com atributos, validadas pelo response_model
+  (from_attributes), como list_appointments fazia antes
+- validado: dicionários das linhas, FAST_JSON_RESPONSES=false
+- rapido: dicionários das linhas direto para o orjson
+
+    cd backend
+    python scripts/bench_fast_json.py --linhas 1000 --repeticoes 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+# Permite rodar a partir de backend/ ou de backend/scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.fast_json import resposta_lista
+from app.models.appointment import AppointmentStatus, AppointmentType
+from app.schemas.appointment import AppointmentListResponse
+
+
+def _linhas(quantidade: int) -> List[dict]:
+    inicio = datetime(2026, 10, 19, 8, 0)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "patient_id": uuid.uuid4(),
+            "healthcare_professional_id": uuid.uuid4(),
+            "scheduled_date": inicio + timedelta(minutes=30 * numero),
+            "duration_minutes": 30,
+            "appointment_type": AppointmentType.RETURN,
+            "status": AppointmentStatus.CONFIRMED,
+            "reason": f"Retorno {numero}",
+            "confirmation_sent": True,
+            "confirmed_at": inicio - timedelta(days=1),
+        }
+        for numero in range(quantidade)
+    ]
+
+
+def _app(linhas: List[dict]) -> FastAPI:
+    objetos = [SimpleNamespace(**linha) for linha in linhas]
+    app = FastAPI()
+
+    @app.get("/objetos", response_model=List[AppointmentListResponse])
+    def listar_objetos():
+        return objetos
+
+    @app.get("/dicts", response_model=List[AppointmentListResponse])
+    def listar_dicts():
+        return resposta_lista([dict(linha) for linha in linhas])
+
+    return app
+
+
+def _medir(client: TestClient, url: str, repeticoes: int) -> tuple[float, int]:
+    client.get(url)  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = client.get(url)
+        tempos.append(time.perf_counter() - inicio)
+        assert resposta.status_code == 200
+    return statistics.median(tempos), len(resposta.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=1000, help="itens por resposta (padrão: 1000)")
+    parser.add_argument("--repeticoes", type=int, default=30, help="requisições por caminho (padrão: 30)")
+    args = parser.parse_args()
+
+    client = TestClient(_app(_linhas(args.linhas)))
+    caminhos = [
+        ("objetos", "/objetos", False),
+        ("validado", "/dicts", False),
+        ("rapido", "/dicts", True),
+    ]
+
+    print(f"linhas={args.linhas} repeticoes={args.repeticoes}")
+    print(f"{'caminho':<9} {'mediana (ms)':>13} {'bytes':>10} {'x rapido':>9}")
+    resultados = []
+    for nome, url, fast_json in caminhos:
+        settings.FAST_JSON_RESPONSES = fast_json
+        resultados.append((nome, *_medir(client, url, args.repeticoes)))
+
+    base = resultados[-1][1]
+    for nome, mediana, tamanho in resultados:
+        print(f"{nome:<9} {mediana * 1000:>13.1f} {tamanho:>10} {mediana / base:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
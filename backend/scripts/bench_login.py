@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark do login: vazão de verificações bcrypt e atraso do event loop
+
+Compara o caminho antigo (bcrypt direto dentro do handler async) com o pool
+limitado de app.core.security. Usa BCRYPT_ROUNDS e PASSWORD_HASH_WORKERS do
+ambiente/.env, então basta mudar as variáveis e rodar de novo:
+
+    cd backend
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=8 python scripts/bench_login.py --logins 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Permite rodar a partir de backend/ ou de backend/scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.security import _checkpw, get_password_hash, verify_password_async
+
+SENHA = "senha-de-benchmark"
+INTERVALO_TICK = 0.005
+
+
+async def _monitorar_loop(parar: asyncio.Event) -> float:
+    """Maior atraso (s) entre o tick agendado e o tick executado"""
+    pior = 0.0
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO_TICK)
+        pior = max(pior, time.perf_counter() - inicio - INTERVALO_TICK)
+    return pior
+
+
+async def _login_inline(hashed: str) -> bool:
+    # Como era antes: bcrypt no próprio event loop
+    return _checkpw(SENHA, hashed)
+
+
+async def _login_pool(hashed: str) -> bool:
+    return await verify_password_async(SENHA, hashed)
+
+
+async def _rodar(login, hashed: str, quantidade: int) -> tuple[float, float]:
+    parar = asyncio.Event()
+    monitor = asyncio.create_task(_monitorar_loop(parar))
+    await asyncio.sleep(0)
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(login(hashed) for _ in range(quantidade)))
+    duracao = time.perf_counter() - inicio
+
+    parar.set()
+    pior_atraso = await monitor
+    assert all(resultados), "senha não conferiu"
+    return duracao, pior_atraso
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=32, help="logins simultâneos (padrão: 32)")
+    parser.add_argument("--sem-inline", action="store_true", help="pula o caminho antigo (bcrypt no event loop)")
+    args = parser.parse_args()
+
+    workers = settings.PASSWORD_HASH_WORKERS
+    print(f"BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS} PASSWORD_HASH_WORKERS={workers} "
+          f"CPUs={os.cpu_count()} logins={args.logins}")
+
+    hashed = get_password_hash(SENHA)
+    assert hashed.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    inicio = time.perf_counter()
+    bcrypt.checkpw(SENHA.encode(), hashed.encode())
+    print(f"1 verificação isolada: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    print()
+
+    caminhos = [("pool", _login_pool, workers)]
+    if not args.sem_inline:
+        caminhos.insert(0, ("inline", _login_inline, 1))
+
+    print(f"{'caminho':<8} {'total (s)':>10} {'logins/s':>10} {'por worker':>11} {'pior atraso loop (ms)':>22}")
+    for nome, login, threads in caminhos:
+        duracao, pior_atraso = asyncio.run(_rodar(login, hashed, args.logins))
+        vazao = args.logins / duracao
+        print(f"{nome:<8} {duracao:>10.2f} {vazao:>10.1f} {vazao / threads:>11.2f} {pior_atraso * 1000:>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
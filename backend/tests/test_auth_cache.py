@@ -0,0 +1,69 @@
+"""
+Cache do usuário autenticado: alterações de acesso feitas em qualquer
+processo (versão de "users") descartam as entradas (PostgreSQL)
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.auth_cache import AuthCache, auth_cache
+from app.core.data_versions import versao
+from app.core.security import create_access_token, get_current_user
+from app.models.organization import Organization
+from app.models.reference_data_version import ReferenceDataVersion
+from app.models.user import User
+
+pytestmark = pytest.mark.postgres_tables(Organization, User, ReferenceDataVersion)
+
+
+@pytest.fixture
+def usuario(postgres_session):
+    user = User(
+        id=uuid.uuid4(), email=f"user-{uuid.uuid4().hex[:8]}@teste",
+        recovery_email=f"rec-{uuid.uuid4().hex[:8]}@teste", full_name="Usuário", is_active=True
+    )
+    postgres_session.add(user)
+    postgres_session.flush()
+    return user
+
+
+def test_versao_muda_so_com_colunas_de_acesso(postgres_session, usuario):
+    db = postgres_session
+    cache = AuthCache()
+    cache.guardar("token", {}, usuario, versao(db, "users"))
+
+    usuario.last_login = "2026-10-19T12:00:00"
+    usuario.full_name = "Outro nome"
+    db.flush()
+    assert cache.obter("token", versao(db, "users")) is not None
+
+    usuario.role = "admin"
+    db.flush()
+    assert cache.obter("token", versao(db, "users")) is None
+
+
+def test_escrita_em_lote_muda_a_versao(postgres_session, usuario):
+    db = postgres_session
+    antes = versao(db, "users")
+
+    db.query(User).filter(User.id == usuario.id).update({"is_active": False}, synchronize_session=False)
+
+    assert versao(db, "users") == antes + 1
+
+
+def test_get_current_user_ve_desativacao_feita_em_outro_worker(postgres_session, usuario):
+    db = postgres_session
+    auth_cache.limpar()
+    token = create_access_token({"sub": usuario.email})
+
+    assert asyncio.run(get_current_user(token=token, db=db)).is_active is True
+    db.expunge_all()
+    assert asyncio.run(get_current_user(token=token, db=db)).is_active is True
+
+    # Outro worker: só o banco muda, o cache deste processo não é tocado
+    db.query(User).filter(User.id == usuario.id).update({"is_active": False}, synchronize_session=False)
+    db.expunge_all()
+
+    assert asyncio.run(get_current_user(token=token, db=db)).is_active is False
+    auth_cache.limpar()
@@ -0,0 +1,130 @@
+"""
+resposta_lista: o JSON com FAST_JSON_RESPONSES ligado (orjson, sem model por
+linha) é o mesmo do caminho validado pelo response_model do FastAPI
+"""
+import enum
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.api.endpoints import appointments, patients
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.fast_json import resposta_lista
+from app.models import Appointment, Organization, Patient
+
+
+class Situacao(str, enum.Enum):
+    ABERTO = "aberto"
+    PAGO = "pago"
+
+
+class Item(BaseModel):
+    id: uuid.UUID
+    nome: str
+    valor: Decimal
+    dia: date
+    criado_em: datetime
+    pago_em: Optional[datetime] = None
+    situacao: Situacao
+    ativo: bool
+    quantidade: int
+    taxa: float
+    tags: List[str]
+
+
+def _json_nos_dois_caminhos(client, monkeypatch, url) -> tuple:
+    respostas = []
+    for fast_json in (True, False):
+        monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", fast_json)
+        resposta = client.get(url)
+        assert resposta.status_code == 200
+        respostas.append(resposta)
+    return respostas
+
+
+def test_tipos_serializados_igual_ao_response_model(monkeypatch):
+    itens = [
+        {
+            "id": uuid.uuid4(),
+            "nome": "Consulta ção",
+            "valor": Decimal("1234.50"),
+            "dia": date(2026, 10, 19),
+            "criado_em": datetime(2026, 10, 19, 12, 30, 15, 123456),
+            "pago_em": datetime(2026, 10, 19, 15, 0, tzinfo=timezone.utc),
+            "situacao": Situacao.PAGO,
+            "ativo": True,
+            "quantidade": 3,
+            "taxa": 0.25,
+            "tags": ["a", "b"],
+        },
+        {
+            "id": uuid.uuid4(),
+            "nome": "Retorno",
+            "valor": Decimal("0.00"),
+            "dia": date(2026, 1, 2),
+            "criado_em": datetime(2026, 1, 2, 8, 0),
+            "pago_em": None,
+            "situacao": Situacao.ABERTO,
+            "ativo": False,
+            "quantidade": 0,
+            "taxa": 1.0,
+            "tags": [],
+        },
+    ]
+    app = FastAPI()
+
+    @app.get("/itens", response_model=List[Item])
+    def listar():
+        return resposta_lista([dict(item) for item in itens])
+
+    rapido, validado = _json_nos_dois_caminhos(TestClient(app), monkeypatch, "/itens")
+
+    assert rapido.headers["content-type"] == validado.headers["content-type"]
+    assert rapido.json() == validado.json()
+    assert rapido.content == validado.content
+
+
+@pytest.fixture
+def client(sqlite_engine, db_session):
+    for modelo in (Organization, Patient, Appointment):
+        modelo.__table__.create(sqlite_engine)
+
+    organizacao = Organization(id=uuid.uuid4(), name="Clínica São José")
+    db_session.add(organizacao)
+    db_session.flush()
+    for numero in range(5):
+        paciente = Patient(
+            id=uuid.uuid4(), organization_id=organizacao.id,
+            full_name=f"Paciente {numero}", is_active=numero % 2 == 0,
+            birth_date=date(1990, 1, numero + 1) if numero else None
+        )
+        db_session.add(paciente)
+        db_session.flush()
+        db_session.add(Appointment(
+            patient_id=paciente.id, healthcare_professional_id=uuid.uuid4(),
+            scheduled_date=datetime(2026, 10, 20, 8 + numero, 30),
+            reason="Dor de cabeça" if numero else None,
+            confirmed_at=datetime(2026, 10, 19, 9, 0, 0, 500) if numero % 2 else None
+        ))
+    db_session.commit()
+
+    app = FastAPI()
+    app.include_router(patients.router, prefix="/patients")
+    app.include_router(appointments.router, prefix="/appointments")
+    app.dependency_overrides[get_db] = lambda: db_session
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("url", ["/patients/", "/appointments/"])
+def test_endpoints_de_listagem(client, monkeypatch, url):
+    rapido, validado = _json_nos_dois_caminhos(client, monkeypatch, url)
+
+    assert len(rapido.json()) == 5
+    assert rapido.json() == validado.json()
@@ -0,0 +1,67 @@
+"""
+list_patients: quantidade de consultas não cresce com o tamanho da página
+(nome da organização vem no mesmo SELECT, sem N+1)
+"""
+import uuid
+
+import pytest
+
+from app.api.endpoints.patients import list_patients
+from app.core.config import settings
+from app.models import Organization, Patient
+
+
+@pytest.fixture
+def pacientes(sqlite_engine, db_session):
+    Organization.__table__.create(sqlite_engine)
+    Patient.__table__.create(sqlite_engine)
+
+    organizacoes = [
+        Organization(id=uuid.uuid4(), name=f"Clínica {numero}")
+        for numero in range(3)
+    ]
+    db_session.add_all(organizacoes)
+    db_session.flush()
+
+    db_session.add_all([
+        Patient(
+            id=uuid.uuid4(),
+            organization_id=organizacoes[numero % len(organizacoes)].id,
+            full_name=f"Paciente {numero:03d}",
+            is_active=True
+        )
+        for numero in range(60)
+    ])
+    db_session.commit()
+    # Página seguinte não pode se aproveitar do identity map
+    db_session.expunge_all()
+
+
+def _listar(db_session, limit):
+    return list_patients(
+        skip=0, limit=limit, organization_id=None,
+        is_active=None, search=None, db=db_session
+    )
+
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_quantidade_de_consultas_constante(pacientes, db_session, contador_statements, monkeypatch, fast_json):
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", fast_json)
+
+    _listar(db_session, limit=1)
+    consultas_uma_linha = len(contador_statements)
+
+    contador_statements.clear()
+    _listar(db_session, limit=50)
+    consultas_cinquenta_linhas = len(contador_statements)
+
+    assert consultas_uma_linha == consultas_cinquenta_linhas == 1
+
+
+def test_nome_da_organizacao_na_listagem(pacientes, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+
+    resultado = _listar(db_session, limit=50)
+
+    assert len(resultado) == 50
+    assert all(paciente["organization_name"].startswith("Clínica") for paciente in resultado)
@@ -0,0 +1,151 @@
+"""
+Partes puras da conciliação bancária: parsers de extrato, conversão de
+valores/datas e casamento de títulos (InstallmentMatcher)
+"""
+import io
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.services.payment_import_service import InstallmentMatcher, PaymentImportService
+
+
+@pytest.fixture
+def servico():
+    return PaymentImportService()
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("150,00", Decimal("150.00")),
+    ("R$ 1.234,56", Decimal("1234.56")),
+    ("1234.5", Decimal("1234.50")),
+    ("-20,00", Decimal("-20.00")),
+    ("10,005", Decimal("10.00")),
+    ("", None),
+    (None, None),
+    ("abc", None),
+])
+def test_parse_amount(servico, valor, esperado):
+    assert servico._parse_amount(valor) == esperado
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("05/10/2026", datetime(2026, 10, 5)),
+    ("2026-10-05", datetime(2026, 10, 5)),
+    ("2026-10-05T14:30:00", datetime(2026, 10, 5)),
+    ("20261005", datetime(2026, 10, 5)),
+    ("20261005120000[-3:BRT]", datetime(2026, 10, 5)),
+    ("", None),
+    ("31/02/2026", None),
+])
+def test_parse_date(servico, valor, esperado):
+    assert servico._parse_date(valor) == esperado
+
+
+def test_parse_csv_ponto_e_virgula(servico):
+    conteudo = (
+        "Data;Valor;Histórico;CPF;Identificador\n"
+        "05/10/2026;1.500,00;PIX Fulano;123.456.789-09;A1\n"
+        "\n"
+        "06/10/2026;-30,00;Tarifa;;A2\n"
+    ).encode("utf-8-sig")
+
+    linhas = list(servico.parse_csv(io.BytesIO(conteudo)))
+
+    assert [linha["fitid"] for linha in linhas] == ["A1", "A2"]
+    assert linhas[0]["line"] == 2
+    assert linhas[0]["amount"] == Decimal("1500.00")
+    assert linhas[0]["payment_date"] == datetime(2026, 10, 5)
+    assert linhas[0]["cpf"] == "12345678909"
+    assert linhas[1]["amount"] == Decimal("-30.00")
+    assert linhas[1]["cpf"] is None
+
+
+def test_parse_csv_virgula(servico):
+    conteudo = b"date,amount,memo,fitid\n2026-10-05,99.90,Boleto,\n"
+
+    (linha,) = servico.parse_csv(io.BytesIO(conteudo))
+
+    assert linha["amount"] == Decimal("99.90")
+    assert linha["description"] == "Boleto"
+    assert linha["fitid"] is None
+
+
+def test_parse_ofx_sgml(servico):
+    conteudo = (
+        b"OFXHEADER:100\n<OFX>\n"
+        b"<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20261001120000[-3:BRT]\n"
+        b"<TRNAMT>150.00\n<FITID>A1\n<MEMO>PIX\n</STMTTRN>\n"
+        b"<stmttrn>\n<TRNAMT>2.5\n<DTPOSTED>20261002\n<FITID>A2\n<NAME>Fulano\n</stmttrn>\n"
+        b"</OFX>\n"
+    )
+
+    linhas = list(servico.parse_ofx(io.BytesIO(conteudo)))
+
+    assert [(linha["fitid"], linha["amount"], linha["description"]) for linha in linhas] == [
+        ("A1", Decimal("150.00"), "PIX"),
+        ("A2", Decimal("2.50"), "Fulano"),
+    ]
+    assert linhas[0]["payment_date"] == datetime(2026, 10, 1)
+
+
+def test_parse_ofx_xml_em_uma_linha(servico, monkeypatch):
+    transacoes = "".join(
+        f"<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>2026100{numero}</DTPOSTED>"
+        f"<TRNAMT>{numero}0.00</TRNAMT><FITID>F{numero}</FITID><MEMO>Pagamento {numero}</MEMO></STMTTRN>"
+        for numero in range(1, 10)
+    )
+    conteudo = f"<?xml version='1.0'?><OFX><BANKTRANLIST>{transacoes}</BANKTRANLIST></OFX>".encode()
+
+    # Leituras pequenas cortam as tags entre um pedaço e outro
+    monkeypatch.setattr("app.services.payment_import_service.OFX_READ_SIZE", 7)
+    linhas = list(servico.parse_ofx(io.BytesIO(conteudo)))
+
+    assert [linha["fitid"] for linha in linhas] == [f"F{numero}" for numero in range(1, 10)]
+    assert linhas[-1]["amount"] == Decimal("90.00")
+    assert linhas[-1]["description"] == "Pagamento 9"
+
+
+def _titulo(chave, valor, vencimento, paciente=None):
+    return {
+        "key": ("installment", chave),
+        "account_receivable_id": uuid.uuid4(),
+        "installment_id": chave,
+        "open_amount": Decimal(valor),
+        "due_date": vencimento,
+        "patient_id": paciente,
+    }
+
+
+def test_matcher_com_paciente_escolhe_vencimento_mais_proximo():
+    paciente = uuid.uuid4()
+    matcher = InstallmentMatcher([
+        _titulo(1, "100.00", datetime(2026, 10, 1), paciente),
+        _titulo(2, "100.00", datetime(2026, 10, 4), paciente),
+        _titulo(3, "100.00", datetime(2026, 10, 5), uuid.uuid4()),
+    ], tolerance_days=5)
+
+    assert matcher.match(Decimal("100.00"), datetime(2026, 10, 5), paciente)["installment_id"] == 2
+    # Título casado é consumido
+    assert matcher.match(Decimal("100.00"), datetime(2026, 10, 5), paciente)["installment_id"] == 1
+    assert matcher.match(Decimal("100.00"), datetime(2026, 10, 5), paciente) is None
+
+
+def test_matcher_sem_paciente_exige_candidato_unico():
+    matcher = InstallmentMatcher([
+        _titulo(1, "50.00", datetime(2026, 10, 1)),
+        _titulo(2, "50.00", datetime(2026, 10, 3)),
+        _titulo(3, "75.00", datetime(2026, 10, 2)),
+    ], tolerance_days=5)
+
+    assert matcher.match(Decimal("50.00"), datetime(2026, 10, 2)) is None
+    assert matcher.match(Decimal("75.00"), datetime(2026, 10, 2))["installment_id"] == 3
+
+
+def test_matcher_respeita_janela_de_tolerancia():
+    matcher = InstallmentMatcher([_titulo(1, "80.00", datetime(2026, 10, 1))], tolerance_days=5)
+
+    assert matcher.match(Decimal("80.00"), datetime(2026, 10, 7)) is None
+    assert matcher.match(Decimal("80.00"), datetime(2026, 10, 6))["installment_id"] == 1
@@ -0,0 +1,120 @@
+"""
+Bitsets de permissões: atribuições feitas em outro worker valem na próxima
+checagem (versões em reference_data_versions) e require_permission /
+require_module protegem as rotas (PostgreSQL)
+"""
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.core.reference_cache  # listener que versiona "permissions"
+from app.api.endpoints import chat, permissions
+from app.core.auth_cache import auth_cache
+from app.core.database import get_db
+from app.core.security import create_access_token
+from app.models.chat import ChatChannel, ChatMessage, ChatParticipant, ChatReadStatus
+from app.models.organization import Organization
+from app.models.permission import Permission, UserPermission
+from app.models.reference_data_version import ReferenceDataVersion
+from app.models.user import User
+from app.services.permission_service import PermissionService
+
+pytestmark = pytest.mark.postgres_tables(
+    Organization, User, Permission, UserPermission, ReferenceDataVersion,
+    ChatChannel, ChatParticipant, ChatMessage, ChatReadStatus
+)
+
+
+def _usuario(db, role="user", allowed_modules='["dashboard"]'):
+    user = User(
+        id=uuid.uuid4(), email=f"user-{uuid.uuid4().hex[:8]}@teste",
+        recovery_email=f"rec-{uuid.uuid4().hex[:8]}@teste", full_name="Usuário",
+        is_active=True, role=role, allowed_modules=allowed_modules
+    )
+    db.add(user)
+    db.flush()
+    return user
+
+
+@pytest.fixture
+def catalogo(postgres_session):
+    db = postgres_session
+    db.add_all([Permission(name="manage_users"), Permission(name="view_reports")])
+    db.flush()
+    return {permissao.name: permissao for permissao in db.query(Permission)}
+
+
+def test_atribuicao_em_outro_worker_vale_na_proxima_checagem(postgres_session, catalogo):
+    db = postgres_session
+    usuario = _usuario(db)
+    worker = PermissionService()
+    assert worker.tem_permissoes(db, usuario, ["view_reports"]) is False
+
+    # Outro worker atribui: este não é avisado, só a versão muda no banco
+    db.add(UserPermission(user_id=usuario.id, permission_id=catalogo["view_reports"].id))
+    db.flush()
+    assert worker.tem_permissoes(db, usuario, ["view_reports"]) is True
+
+    db.query(UserPermission).filter(UserPermission.user_id == usuario.id).delete()
+    assert worker.tem_permissoes(db, usuario, ["view_reports"]) is False
+
+
+def test_catalogo_recarregado_quando_permissions_muda(postgres_session, catalogo):
+    db = postgres_session
+    admin = _usuario(db, role="admin")
+    worker = PermissionService()
+    assert worker.listar_permissoes(db, admin) == ["view_reports"]
+
+    db.add(Permission(name="edit_patients"))
+    db.flush()
+
+    assert worker.listar_permissoes(db, admin) == ["edit_patients", "view_reports"]
+
+
+@pytest.fixture
+def client(postgres_session):
+    auth_cache.limpar()
+    app = FastAPI()
+    app.include_router(permissions.router, prefix="/permissions")
+    app.include_router(chat.router, prefix="/chat")
+    app.dependency_overrides[get_db] = lambda: postgres_session
+    yield TestClient(app)
+    auth_cache.limpar()
+
+
+def _headers(usuario):
+    return {"Authorization": f"Bearer {create_access_token({'sub': usuario.email})}"}
+
+
+def test_atribuir_permissoes_exige_manage_users(client, postgres_session, catalogo):
+    db = postgres_session
+    alvo = _usuario(db)
+    admin = _usuario(db, role="admin")
+    gestor = _usuario(db)
+    db.add(UserPermission(user_id=gestor.id, permission_id=catalogo["manage_users"].id))
+    super_admin = _usuario(db, role="super_admin")
+    url = f"/permissions/user/{alvo.id}"
+    corpo = {"permission_ids": [str(catalogo["view_reports"].id)]}
+
+    assert client.post(url, json=corpo).status_code == 401
+    assert client.post(url, json=corpo, headers=_headers(admin)).status_code == 403
+    assert client.post(url, json=corpo, headers=_headers(gestor)).status_code == 201
+    assert client.delete(url, headers=_headers(super_admin)).status_code == 204
+
+
+def test_chat_exige_modulo(client, postgres_session):
+    db = postgres_session
+    sem_chat = _usuario(db)
+    com_chat = _usuario(db, allowed_modules='["dashboard","chat"]')
+
+    assert client.get("/chat/channels", headers=_headers(sem_chat)).status_code == 403
+    assert client.get("/chat/channels", headers=_headers(com_chat)).status_code == 200
+
+    # Módulo liberado em outro worker: versão de "users" descarta o usuário em cache
+    db.query(User).filter(User.id == sem_chat.id).update(
+        {"allowed_modules": '["chat"]'}, synchronize_session=False
+    )
+    db.expunge_all()
+    assert client.get("/chat/channels", headers=_headers(sem_chat)).status_code == 200
@@ -0,0 +1,147 @@
+"""
+Geração de repasses em lote e consolidado mensal (PostgreSQL)
+"""
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.financial import (
+    AccountReceivable, PaymentStatus, ProfessionalFee, ProfessionalFeeConfiguration,
+    ProfessionalFeeItem, ProfessionalFeeMonthlySummary, ProfessionalFeeType
+)
+from app.models.organization import Organization
+from app.models.user import User
+from app.services.fee_summary_service import fee_summary_service
+from app.services.professional_fee_service import professional_fee_service
+
+pytestmark = pytest.mark.postgres_tables(
+    Organization, User, AccountReceivable, ProfessionalFeeConfiguration,
+    ProfessionalFee, ProfessionalFeeItem, ProfessionalFeeMonthlySummary
+)
+
+
+@pytest.fixture
+def clinica(postgres_session):
+    db = postgres_session
+    organizacao = Organization(id=uuid.uuid4(), name="Clínica")
+    db.add(organizacao)
+    db.flush()
+
+    profissionais = [
+        User(
+            id=uuid.uuid4(), organization_id=organizacao.id, full_name=f"Profissional {numero}",
+            email=f"prof{numero}-{uuid.uuid4().hex[:6]}@teste", recovery_email=f"rec{numero}-{uuid.uuid4().hex[:6]}@teste"
+        )
+        for numero in range(4)
+    ]
+    db.add_all(profissionais)
+    db.flush()
+    percentual, fixo, sem_atendimento, abaixo_minimo = profissionais
+
+    db.add_all([
+        ProfessionalFeeConfiguration(
+            healthcare_professional_id=percentual.id, fee_type=ProfessionalFeeType.PERCENTAGE,
+            percentage=Decimal("40"), apply_inss=True, inss_rate=Decimal("11")
+        ),
+        ProfessionalFeeConfiguration(
+            healthcare_professional_id=fixo.id, fee_type=ProfessionalFeeType.FIXED, fixed_amount=Decimal("50")
+        ),
+        ProfessionalFeeConfiguration(
+            healthcare_professional_id=sem_atendimento.id, fee_type=ProfessionalFeeType.FIXED, fixed_amount=Decimal("50")
+        ),
+        ProfessionalFeeConfiguration(
+            healthcare_professional_id=abaixo_minimo.id, fee_type=ProfessionalFeeType.FIXED,
+            fixed_amount=Decimal("10"), minimum_amount=Decimal("1000")
+        ),
+    ])
+
+    def conta(profissional, valor, pagamento=datetime(2026, 9, 10), situacao=PaymentStatus.PAID):
+        db.add(AccountReceivable(
+            invoice_number=f"FAT-{uuid.uuid4().hex[:8]}", description="Consulta",
+            patient_id=uuid.uuid4(), healthcare_professional_id=profissional.id,
+            original_amount=valor, total_amount=valor, paid_amount=valor, remaining_amount=0,
+            due_date=pagamento, payment_date=pagamento, status=situacao
+        ))
+
+    for valor in ("100", "200", "300"):
+        conta(percentual, Decimal(valor))
+    # Fora do período e não paga: não entram
+    conta(percentual, Decimal("999"), pagamento=datetime(2026, 8, 31, 23, 0))
+    conta(percentual, Decimal("999"), situacao=PaymentStatus.PENDING)
+    for valor in ("80", "120"):
+        conta(fixo, Decimal(valor))
+    conta(abaixo_minimo, Decimal("500"))
+    db.flush()
+
+    return organizacao, profissionais
+
+
+def _resumo(db):
+    return {
+        linha.healthcare_professional_id: linha
+        for linha in db.query(ProfessionalFeeMonthlySummary)
+    }
+
+
+def test_gera_repasses_do_periodo(postgres_session, clinica):
+    db = postgres_session
+    organizacao, (percentual, fixo, sem_atendimento, abaixo_minimo) = clinica
+
+    fee_ids, skipped = professional_fee_service.generate_for_period(
+        db, 2026, 9, organization_id=organizacao.id
+    )
+
+    assert len(fee_ids) == 2
+    assert set(skipped) == {sem_atendimento.id, abaixo_minimo.id}
+
+    repasses = {fee.healthcare_professional_id: fee for fee in db.query(ProfessionalFee)}
+    assert repasses[percentual.id].gross_amount == Decimal("240.00")
+    assert repasses[percentual.id].inss_amount == Decimal("26.40")
+    assert repasses[percentual.id].net_amount == Decimal("213.60")
+    assert repasses[percentual.id].total_appointments == 3
+    assert repasses[percentual.id].total_revenue == Decimal("600.00")
+    assert repasses[fixo.id].gross_amount == Decimal("100.00")
+
+    itens = db.query(ProfessionalFeeItem).filter(
+        ProfessionalFeeItem.professional_fee_id == repasses[percentual.id].id
+    ).all()
+    assert sorted(item.fee_amount for item in itens) == [Decimal("40.00"), Decimal("80.00"), Decimal("120.00")]
+
+    resumo = _resumo(db)
+    assert resumo[percentual.id].total_net == Decimal("213.60")
+    assert resumo[percentual.id].pending_amount == Decimal("213.60")
+
+    # Segunda geração do mesmo mês não duplica
+    fee_ids, skipped = professional_fee_service.generate_for_period(
+        db, 2026, 9, organization_id=organizacao.id
+    )
+    assert fee_ids == []
+    assert skipped[percentual.id] == "Já existe repasse gerado para este período"
+
+
+def test_consolidado_acompanha_pagamento_exclusao_e_rebuild(postgres_session, clinica):
+    db = postgres_session
+    organizacao, (percentual, fixo, _, _) = clinica
+    professional_fee_service.generate_for_period(db, 2026, 9, organization_id=organizacao.id)
+    repasses = {fee.healthcare_professional_id: fee for fee in db.query(ProfessionalFee)}
+
+    repasses[percentual.id].status = PaymentStatus.PAID
+    db.flush()
+    fee_summary_service.refresh_fee(db, repasses[percentual.id])
+
+    repasses[fixo.id].is_deleted = True
+    db.flush()
+    fee_summary_service.refresh_fee(db, repasses[fixo.id])
+
+    resumo = _resumo(db)
+    assert set(resumo) == {percentual.id}
+    assert resumo[percentual.id].paid_amount == Decimal("213.60")
+    assert resumo[percentual.id].pending_amount == Decimal("0.00")
+
+    db.query(ProfessionalFeeMonthlySummary).update({"total_gross": 0})
+    assert fee_summary_service.rebuild(db, 2025) == 0
+    assert fee_summary_service.rebuild(db, 2026) == 1
+    db.expire_all()
+    assert _resumo(db)[percentual.id].total_gross == Decimal("240.00")
@@ -0,0 +1,44 @@
+"""
+Schemas TISS 4.03.00 distribuídos em app/resources/tiss/xsd
+"""
+import io
+
+import pytest
+
+from app.services.tiss_xsd_validator import TISSSchemaIndisponivel, TISSXSDValidator
+
+
+@pytest.fixture(scope="module")
+def validador():
+    return TISSXSDValidator()
+
+
+def test_schema_distribuido_compila(validador):
+    schema = validador.carregar_schema()
+
+    assert schema.target_namespace == "http://www.ans.gov.br/padroes/tiss/schemas"
+    assert "mensagemTISS" in schema.elements
+
+
+def test_erros_com_caminho(validador):
+    documento = (
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<ans:mensagemTISS xmlns:ans="http://www.ans.gov.br/padroes/tiss/schemas">'
+        b'<ans:cabecalho/></ans:mensagemTISS>'
+    )
+
+    erros = validador.validar(io.BytesIO(documento))
+
+    assert erros
+    assert erros[0]["caminho"].startswith("/ans:mensagemTISS")
+
+
+def test_xml_mal_formado(validador):
+    (erro,) = validador.validar(io.BytesIO(b"<ans:mensagemTISS>"))
+
+    assert erro["mensagem"].startswith("XML mal formado")
+
+
+def test_diretorio_sem_schema(tmp_path):
+    with pytest.raises(TISSSchemaIndisponivel):
+        TISSXSDValidator(diretorio=str(tmp_path)).carregar_schema()